@@ -0,0 +1,102 @@
+import json
+from typing import Any, Dict, List, Optional
+from fastapi.responses import Response
+from pydantic_core import to_jsonable_python
+from app.core.formatter import columnar_to_table
+
+try:
+    import orjson
+except ImportError:  # optional fast path
+    orjson = None
+
+JSON = "application/json"
+COLUMNAR_JSON = "application/vnd.phasewise.columnar+json"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+def arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def negotiate(accept: Optional[str]) -> str:
+    """
+    Pick the response encoding from an Accept header.
+    Highest q wins, ties keep header order; anything unknown falls through to JSON.
+    """
+    if not accept:
+        return JSON
+
+    ranges = []
+    for i, part in enumerate(accept.split(",")):
+        media, _, params = part.strip().partition(";")
+        q = 1.0
+        for p in params.split(";"):
+            k, _, v = p.strip().partition("=")
+            if k == "q":
+                try:
+                    q = float(v)
+                except ValueError:
+                    q = 0.0
+        ranges.append((-q, i, media.strip().lower()))
+
+    for neg_q, _, media in sorted(ranges):
+        if neg_q == 0:
+            break
+        if media == ARROW_STREAM and arrow_available():
+            return ARROW_STREAM
+        if media == COLUMNAR_JSON:
+            return COLUMNAR_JSON
+        if media in (JSON, "application/*", "*/*"):
+            return JSON
+
+    return JSON
+
+def dumps(obj: Any) -> bytes:
+    # orjson fast path. Types orjson doesn't know (Decimal, ...) go through
+    # pydantic's JSON conversion, so output matches the ChatResponse model.
+    if orjson is not None:
+        return orjson.dumps(obj, default=to_jsonable_python, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(to_jsonable_python(obj), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _arrow_column(values: List[Any]):
+    import pyarrow as pa
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed/unsupported Python types: ship as strings rather than fail the reply
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+def encode_arrow(session_id: str, reply: str, data: Optional[Dict[str, Any]]) -> bytes:
+    """Arrow IPC stream of the result table; reply/session_id travel in schema metadata"""
+    import pyarrow as pa
+
+    meta = {"session_id": session_id, "reply": reply}
+    if data and data.get("type") == "columnar":
+        tbl = pa.Table.from_arrays([_arrow_column(col) for col in data["data"]], names=data["columns"])
+        if data.get("deferred"):
+            meta["deferred"] = ",".join(data["deferred"])
+        if data.get("shards"):
+            meta["shards"] = dumps(data["shards"]).decode("utf-8")
+    else:
+        tbl = pa.table({})
+        if data is not None:
+            meta["data"] = dumps(data).decode("utf-8")
+    tbl = tbl.replace_schema_metadata(meta)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, tbl.schema) as writer:
+        writer.write_table(tbl)
+    return sink.getvalue().to_pybytes()
+
+def render_chat(session_id: str, out: Dict[str, Any], media_type: str) -> Response:
+    """Encode a handle_message result; table data stays column-oriented unless plain JSON was asked for"""
+    data = out["data"]
+    if media_type == ARROW_STREAM:
+        return Response(encode_arrow(session_id, out["reply"], data), media_type=ARROW_STREAM)
+
+    if media_type == JSON and data and data.get("type") == "columnar":
+        data = columnar_to_table(data)
+    body = {"session_id": session_id, "reply": out["reply"], "data": data}
+    return Response(dumps(body), media_type=media_type)
@@ -1,49 +1,402 @@
-from fastapi import APIRouter, HTTPException, Depends
-from app.types import ConnectRequest, ConnectResponse, ChatRequest, ChatResponse, SchemaResponse, UserContext
+from typing import Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from sqlalchemy import MetaData
+from app.types import ConnectRequest, ConnectResponse, ConnectJobResponse, FanoutRequest, ChatRequest, ChatResponse, ChatBatchRequest, ChatBatchResponse, SchemaResponse, UserContext, BulkCreateRequest, BulkCreateResponse, ValueRequest, ValueResponse
 from app.db.manager import db_manager
-from app.db.introspect import build_catalog, reflect_metadata
+from app.db.introspect import build_catalog, reflect_metadata, metadata_from_catalog
+from app.db.stats import stats_sampler
+from app.db.registry import session_registry, url_ref
+from app.db.schema_watch import schema_watcher
+from app.db.catalog import Catalog, as_plain, intern_profile
 from app.core.chat_engine import handle_message
+from app.core.chat_batch import run_batch
+from app.core.fanout import Fanout, Member
 from app.core.context import get_user_context
+from app.core.state_manager import StateConflictError
+from app.core.admission import AdmissionRejected, session_gate
+from app.core.capture import capture_request, capture_db, capture_vocabulary
+from app.core.warmup import warmup, load_manifest
+from app.core.connect_jobs import ConnectJob, connect_jobs
+from app.core.tracing import stage, render_metrics
+from app.core.audit import audit_message, audit_note
+from app.core.formatter import columnar_to_table
+from app.core.executor import validate_bulk_rows, run_bulk_create, fetch_value, note_schema_change
+from app.api.encoding import JSON, dumps, negotiate, render_chat
+from app.state_store import registry_store, state_store
 from app.config import settings
 
 router = APIRouter()
+# Per-process caches; the shared source of truth is session_registry
 _catalog_by_session = {}
 _metadata_by_session = {}
+_fanout_by_session = {}  # fan-out session_id -> member session_ids (shared copy in the state store)
+
+def _shed(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def _get_session(session_id: str):
+    """
+    (engine, catalog, metadata) for a session. Sessions connected through
+    another worker are rebuilt from the shared registry on first use. For a
+    fan-out session the engine is a Fanout over its members' current sessions.
+    """
+    members = _fanout_by_session.get(session_id)
+    if members is not None:
+        return _get_fanout(session_id, members)
+    catalog = _catalog_by_session.get(session_id)
+    metadata = _metadata_by_session.get(session_id)
+    if not catalog or not metadata:
+        fanout = state_store.get(_fanout_key(session_id))
+        if fanout:
+            _fanout_by_session[session_id] = fanout["members"]
+            return _get_fanout(session_id, fanout["members"])
+        entry = session_registry.load(session_id)
+        db_url = entry and (entry["db_url"] or _manifest_url(session_id, entry["url_ref"]))
+        if not db_url:
+            if connect_jobs.active(session_id):
+                raise HTTPException(status_code=503, detail="Still introspecting the schema; retry shortly.", headers={"Retry-After": "1"})
+            raise HTTPException(status_code=400, detail="Not connected. Call /connect first.")
+        catalog, metadata = _attach(session_id, db_url, entry)
+    elif not session_registry.touch(session_id) and not connect_jobs.active(session_id):
+        # Gone from the registry (idle past its TTL, evicted, or forgotten by
+        # another worker): drop it here too
+        _drop_session(session_id)
+        raise HTTPException(status_code=400, detail="Not connected. Call /connect first.")
+    return db_manager.get_engine(session_id), catalog, metadata
+
+def _drop_session(session_id: str) -> None:
+    """Forget a session in this worker: caches, background sampling/watching and its engine"""
+    _catalog_by_session.pop(session_id, None)
+    _metadata_by_session.pop(session_id, None)
+    stats_sampler.unwatch(session_id)
+    schema_watcher.unwatch(session_id)
+    db_manager.drop(session_id)
+
+def _attach(session_id: str, db_url: str, entry):
+    """Rebuild a session from its registry entry; MetaData comes from the catalog, not the database"""
+    engine = db_manager.attach(session_id, db_url, entry["replica_urls"])
+    catalog = entry["catalog"]
+    metadata = metadata_from_catalog(catalog, engine.dialect)
+    _catalog_by_session[session_id] = catalog
+    _metadata_by_session[session_id] = metadata
+    stats_sampler.watch(session_id, engine, metadata, catalog)
+    schema_watcher.watch(session_id, engine, catalog, metadata)
+    return catalog, metadata
+
+_manifest_urls: Optional[Dict[str, str]] = None
+
+def _manifest_url(session_id: str, ref: str) -> Optional[str]:
+    """The session's DB URL from the local tenant manifest, if it names the registry entry's database"""
+    global _manifest_urls
+    if _manifest_urls is None:
+        tenants = load_manifest(settings.tenant_manifest) if settings.tenant_manifest else []
+        _manifest_urls = {t["session_id"]: t["db_url"] for t in tenants}
+    url = _manifest_urls.get(session_id)
+    return url if url is not None and url_ref(url) == ref else None
+
+def _on_schema_change(session_ids, catalog, metadata, changed_tables) -> None:
+    """
+    New catalog/metadata version from the schema watcher. Requests in flight
+    keep the objects they already hold; later ones get the new version.
+    """
+    for session_id in session_ids:
+        if session_id not in _catalog_by_session:
+            continue
+        engine = db_manager.get_engine(session_id)
+        _metadata_by_session[session_id] = metadata
+        _catalog_by_session[session_id] = catalog
+        note_schema_change(engine)
+        stats_sampler.watch(session_id, engine, metadata, catalog)
+        session_registry.update_catalog(session_id, catalog)
+
+schema_watcher.add_listener(_on_schema_change)
+
+def _fanout_key(session_id: str) -> str:
+    return f"fanout:{session_id}"
+
+def _get_fanout(session_id: str, member_ids):
+    members = []
+    for sid in member_ids:
+        engine, catalog, metadata = _get_session(sid)
+        if isinstance(engine, Fanout):
+            raise HTTPException(status_code=400, detail=f"{sid} is itself a fan-out session.")
+        members.append(Member(sid, engine, catalog, metadata))
+    # Rebuilt per request (a few set checks), so member schema changes show up at once
+    fanout = Fanout(session_id, members)
+    return fanout, fanout.catalog, fanout.metadata
+
+def _forget_fanout(session_id: str) -> None:
+    """A plain /connect replaces a fan-out session of the same id"""
+    _fanout_by_session.pop(session_id, None)
+    state_store.delete(_fanout_key(session_id))
+
+def _open_session(session_id: str, db_url: str, replica_urls: Optional[List[str]] = None):
+    """Connect, introspect and publish a session; returns its catalog"""
+    engine = db_manager.connect(session_id, db_url, replica_urls)
+    _forget_fanout(session_id)
+    catalog = build_catalog(engine)
+    metadata = reflect_metadata(engine, catalog["exposed_tables"])
+
+    _catalog_by_session[session_id] = catalog
+    _metadata_by_session[session_id] = metadata
+    session_registry.publish(session_id, db_url, catalog, replica_urls)
+    # Value stats are sampled in the background and land on the catalog
+    stats_sampler.watch(session_id, engine, metadata, catalog)
+    schema_watcher.watch(session_id, engine, catalog, metadata)
+    return catalog
+
+def warm_session(session_id: str, db_url: str) -> str:
+    """
+    Startup warm-up for one manifest tenant: reuse the catalog published in the
+    registry when it is for the same DB, otherwise introspect; then open
+    WARM_POOL_CONNECTIONS pooled connections so first requests skip the handshake.
+    """
+    entry = session_registry.load(session_id)
+    if entry and entry["url_ref"] == url_ref(db_url):
+        if session_id not in _catalog_by_session:
+            _attach(session_id, db_url, entry)
+        source = "cache"
+    else:
+        _open_session(session_id, db_url)
+        source = "introspected"
+
+    engine = db_manager.get_engine(session_id)
+    conns = []
+    try:
+        for _ in range(settings.warm_pool_connections):
+            conns.append(engine.connect())
+    finally:
+        for conn in conns:
+            conn.close()
+    return source
 
 @router.post("/connect", response_model=ConnectResponse)
 def connect(req: ConnectRequest):
+    with capture_request("connect", req.session_id, db=capture_db(req.db_url)):
+        try:
+            catalog = _open_session(req.session_id, req.db_url, req.replica_urls)
+            return ConnectResponse(status="connected", exposed_tables=list(catalog["exposed_tables"]))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/connect/fanout", response_model=ConnectResponse)
+def connect_fanout(req: FanoutRequest):
+    """
+    Group connected sessions (one per shard) under one session_id; /chat reads
+    on it run on every member and come back merged. Offers the tables all members share.
+    """
+    members = list(dict.fromkeys(req.members))
+    if req.session_id in members:
+        raise HTTPException(status_code=400, detail="A fan-out session can't include itself.")
+    _, catalog, _ = _get_fanout(req.session_id, members)
+    if not catalog["exposed_tables"]:
+        raise HTTPException(status_code=400, detail="The member sessions have no table in common.")
+    _fanout_by_session[req.session_id] = members
+    state_store.set(_fanout_key(req.session_id), {"members": members})
+    return ConnectResponse(status="connected", exposed_tables=list(catalog["exposed_tables"]))
+
+def _open_session_incrementally(job: ConnectJob) -> None:
+    """
+    _open_session for a background job: each chunk of introspected tables is
+    reflected into the session's MetaData and a new partial Catalog is swapped
+    in, so /chat can start on the tables seen so far.
+    """
+    session_id = job.session_id
+    engine = db_manager.connect(session_id, job.db_url, job.replica_urls)
+    _forget_fanout(session_id)
+    metadata = MetaData()
+    tables, exposed = {}, []
+
+    def progress(new_profiles, done, total):
+        if new_profiles:
+            # Tables become visible only after their metadata is reflected
+            metadata.reflect(bind=engine, only=list(new_profiles))
+            for t, profile in new_profiles.items():
+                tables[t] = intern_profile(profile)
+                exposed.append(t)
+            _metadata_by_session[session_id] = metadata
+            _catalog_by_session[session_id] = Catalog(tables, tuple(exposed))
+        job.progress(done, total, len(exposed))
+
     try:
-        engine = db_manager.connect(req.session_id, req.db_url)
-        catalog = build_catalog(engine)
-        metadata = reflect_metadata(engine, catalog["exposed_tables"])
+        build_catalog(engine, progress=progress, every=settings.connect_job_chunk)
+    except Exception:
+        # Don't leave a partial catalog behind for a failed connect
+        _catalog_by_session.pop(session_id, None)
+        _metadata_by_session.pop(session_id, None)
+        raise
+    catalog = Catalog(tables, tuple(exposed))
+    _catalog_by_session[session_id] = catalog
+    _metadata_by_session[session_id] = metadata
+    session_registry.publish(session_id, job.db_url, catalog, job.replica_urls)
+    stats_sampler.watch(session_id, engine, metadata, catalog)
+    schema_watcher.watch(session_id, engine, catalog, metadata)
 
-        _catalog_by_session[req.session_id] = catalog
-        _metadata_by_session[req.session_id] = metadata
+@router.post("/connect/jobs", response_model=ConnectJobResponse, status_code=202)
+def connect_job(req: ConnectRequest):
+    """Start /connect in the background; poll GET /connect/jobs/{job_id} for progress"""
+    job = connect_jobs.submit(req.session_id, req.db_url, _open_session_incrementally, req.replica_urls)
+    return ConnectJobResponse(**job.as_dict())
 
-        return ConnectResponse(status="connected", exposed_tables=catalog["exposed_tables"])
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+@router.get("/connect/jobs/{job_id}", response_model=ConnectJobResponse)
+def connect_job_status(job_id: str):
+    status = connect_jobs.get(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown connect job")
+    return ConnectJobResponse(**status)
 
 @router.get("/schema", response_model=SchemaResponse)
 def schema(session_id: str):
-    if session_id not in _catalog_by_session:
-        raise HTTPException(status_code=400, detail="Not connected. Call /connect first.")
-    cat = _catalog_by_session[session_id]
+    _, cat, _ = _get_session(session_id)
+    cat = as_plain(cat)
     return SchemaResponse(session_id=session_id, exposed_tables=cat["exposed_tables"], tables=cat["tables"])
 
+@router.get("/state/stats")
+def state_stats():
+    """Session state store size and eviction counters, and the registry's when kept apart"""
+    stats = state_store.stats()
+    if registry_store is not state_store:
+        stats["registry"] = registry_store.stats()
+    return stats
+
+@router.get("/ready")
+def ready():
+    """Readiness: 503 until the startup warm-up (TENANT_MANIFEST) is done, with progress"""
+    status = warmup.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of request/stage histograms and LLM counters"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @router.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest, user_context: UserContext = Depends(get_user_context)):
-    try:
-        engine = db_manager.get_engine(req.session_id)
-        catalog = _catalog_by_session.get(req.session_id)
-        metadata = _metadata_by_session.get(req.session_id)
+def chat(req: ChatRequest, user_context: UserContext = Depends(get_user_context), accept: Optional[str] = Header(None)):
+    media_type = negotiate(accept)
+    with capture_request("chat", req.session_id, message=req.message):
+        try:
+            engine, catalog, metadata = _get_session(req.session_id)
+            capture_vocabulary(catalog)
 
-        if not catalog or not metadata:
-            raise HTTPException(status_code=400, detail="Not connected. Call /connect first.")
+            # One message at a time per session; overlapping ones queue briefly or get 429
+            with session_gate.hold(req.session_id):
+                out = handle_message(req.session_id, req.message, engine, catalog, metadata, user_context=user_context.model_dump() if user_context else None)
+            with stage("encode"):
+                return render_chat(req.session_id, out, media_type)
+        except HTTPException:
+            raise
+        except AdmissionRejected as e:
+            raise _shed(e)
+        except StateConflictError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        out = handle_message(req.session_id, req.message, engine, catalog, metadata, user_context=user_context.model_dump() if user_context else None)
-        return ChatResponse(session_id=req.session_id, reply=out["reply"], data=out["data"])
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+@router.post("/chat/batch", response_model=ChatBatchResponse)
+def chat_batch(req: ChatBatchRequest, user_context: UserContext = Depends(get_user_context)):
+    """
+    Many independent questions in one call. Each item is answered from its
+    session's current conversation state without changing it, so items run
+    concurrently; failures are reported per item with the status /chat would return.
+    """
+    if len(req.items) > settings.chat_batch_max_items:
+        raise HTTPException(status_code=400, detail=f"At most {settings.chat_batch_max_items} items per batch.")
+    ctx = user_context.model_dump() if user_context else None
+
+    def answer(session_id: str, message: str):
+        try:
+            engine, catalog, metadata = _get_session(session_id)
+            out = handle_message(session_id, message, engine, catalog, metadata, user_context=ctx, persist_state=False)
+        except HTTPException as e:
+            return {"status": e.status_code, "error": str(e.detail)}
+        except AdmissionRejected as e:
+            return {"status": e.status_code, "error": str(e)}
+        except Exception as e:
+            return {"status": 400, "error": str(e)}
+        data = out["data"]
+        if data and data.get("type") == "columnar":
+            data = columnar_to_table(data)
+        return {"status": 200, "reply": out["reply"], "data": data}
+
+    with stage("chat_batch"):
+        answers, unique = run_batch([(i.session_id, i.message) for i in req.items], answer, settings.chat_batch_concurrency)
+    results = [{"index": n, "session_id": item.session_id, "reply": None, "data": None, "error": None, **a}
+               for n, (item, a) in enumerate(zip(req.items, answers))]
+    with stage("encode"):
+        return Response(dumps({"results": results, "unique": unique}), media_type=JSON)
+
+@router.post("/bulk_create", response_model=BulkCreateResponse)
+def bulk_create(req: BulkCreateRequest, user_context: UserContext = Depends(get_user_context)):
+    """
+    Insert many rows into one entity. Without confirm=true this only validates
+    and previews; with it, all valid rows are inserted in batches in one transaction.
+    """
+    with audit_message(req.session_id, f"/bulk_create {req.entity}", user_context.model_dump() if user_context else None):
+        audit_note(intent="bulk_create", entity=req.entity, plan={"rows": len(req.rows), "confirm": req.confirm})
+        try:
+            engine, catalog, metadata = _get_session(req.session_id)
+            if isinstance(engine, Fanout):
+                raise HTTPException(status_code=400, detail="Fan-out sessions are read-only; write through a member session.")
+            if req.entity not in catalog["tables"]:
+                raise HTTPException(status_code=400, detail="That table isn’t exposed. Please pick another.")
+
+            checked = validate_bulk_rows(metadata, req.entity, req.rows, catalog["tables"][req.entity]["create_fields"])
+            out = BulkCreateResponse(
+                session_id=req.session_id,
+                entity=req.entity,
+                status="preview",
+                valid_rows=len(checked["rows"]),
+                errors=checked["errors"],
+                preview=checked["rows"][:5],
+            )
+            # All-or-nothing: any invalid row blocks the whole insert
+            if checked["errors"]:
+                out.status = "invalid"
+                return out
+            if not req.confirm:
+                return out
+
+            result = run_bulk_create(engine, metadata, req.entity, checked["rows"], req.batch_size or settings.bulk_batch_size)
+            out.status = "inserted"
+            out.inserted = result["inserted"]
+            out.batches = result["batches"]
+            return out
+        except HTTPException:
+            raise
+        except AdmissionRejected as e:
+            raise _shed(e)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+def _fetch_value_fanout(fanout: Fanout, req: ValueRequest):
+    """Rows in merged results don't say which shard they came from: first member that has the key wins"""
+    for m in fanout.members:
+        try:
+            return fetch_value(m.engine, m.metadata, req.entity, req.column, req.pk)
+        except ValueError as e:
+            if str(e) != "Row not found.":
+                raise
+    raise ValueError("Row not found.")
+
+@router.post("/value", response_model=ValueResponse)
+def value(req: ValueRequest, user_context: UserContext = Depends(get_user_context)):
+    """Fetch the full value of a column deferred in /chat read results"""
+    with audit_message(req.session_id, f"/value {req.entity}.{req.column}", user_context.model_dump() if user_context else None):
+        audit_note(intent="value", entity=req.entity, plan={"column": req.column, "pk": req.pk})
+        try:
+            engine, catalog, metadata = _get_session(req.session_id)
+            if req.entity not in catalog["tables"]:
+                raise HTTPException(status_code=400, detail="That table isn’t exposed. Please pick another.")
+
+            if isinstance(engine, Fanout):
+                out = _fetch_value_fanout(engine, req)
+            else:
+                out = fetch_value(engine, metadata, req.entity, req.column, req.pk)
+            return ValueResponse(session_id=req.session_id, entity=req.entity, column=req.column, **out)
+        except HTTPException:
+            raise
+        except AdmissionRejected as e:
+            raise _shed(e)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
@@ -10,6 +10,70 @@ class Settings(BaseModel):
     default_model: str = os.getenv("DEFAULT_MODEL", "gpt-4o")
     state_store: str = os.getenv("STATE_STORE", "inmemory").lower()
     redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    state_ttl_seconds: int = int(os.getenv("STATE_TTL_SECONDS", "86400"))
+    state_shards: int = int(os.getenv("STATE_SHARDS", "16"))
+    state_max_entries: int = int(os.getenv("STATE_MAX_ENTRIES", "100000"))
+    state_max_bytes: int = int(os.getenv("STATE_MAX_BYTES", str(256 * 1024 * 1024)))
+    # In-memory budget for session-registry entries, kept apart from conversation state
+    registry_max_entries: int = int(os.getenv("REGISTRY_MAX_ENTRIES", "10000"))
+    registry_max_bytes: int = int(os.getenv("REGISTRY_MAX_BYTES", str(256 * 1024 * 1024)))
     app_env: str = os.getenv("APP_ENV", "dev")
+    bulk_batch_size: int = int(os.getenv("BULK_BATCH_SIZE", "500"))
+    tracing_enabled: bool = os.getenv("TRACING", "1").lower() not in ("0", "false", "no")
+    # Admission control (0 disables a limit); see app/core/admission.py
+    llm_max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    llm_max_queue: int = int(os.getenv("LLM_MAX_QUEUE", "64"))
+    db_max_concurrency: int = int(os.getenv("DB_MAX_CONCURRENCY", "8"))
+    db_max_queue: int = int(os.getenv("DB_MAX_QUEUE", "32"))
+    session_overlap: str = os.getenv("SESSION_OVERLAP", "queue").lower()
+    session_max_queue: int = int(os.getenv("SESSION_MAX_QUEUE", "2"))
+    admission_wait_seconds: float = float(os.getenv("ADMISSION_WAIT_SECONDS", "10"))
+    single_flight: bool = os.getenv("SINGLE_FLIGHT", "1").lower() not in ("0", "false", "no")
+    # Audit log (app/core/audit.py): AUDIT_SINK = none | file | sqlite
+    audit_sink: str = os.getenv("AUDIT_SINK", "none").lower()
+    audit_path: str = os.getenv("AUDIT_PATH", "")
+    audit_max_queue: int = int(os.getenv("AUDIT_MAX_QUEUE", "10000"))
+    audit_batch_size: int = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+    audit_flush_seconds: float = float(os.getenv("AUDIT_FLUSH_SECONDS", "1.0"))
+    audit_overflow: str = os.getenv("AUDIT_OVERFLOW", "drop_oldest").lower()
+    audit_block_seconds: float = float(os.getenv("AUDIT_BLOCK_SECONDS", "0.05"))
+    # Workload capture for benchmarks/replay.py (empty = off)
+    capture_path: str = os.getenv("CAPTURE_PATH", "")
+    capture_salt: str = os.getenv("CAPTURE_SALT", "")
+    # Signed x-user-context tokens (app/core/tokens.py); unsigned base64 JSON when neither is set
+    user_context_secret: str = os.getenv("USER_CONTEXT_SECRET", "")
+    user_context_jwks: str = os.getenv("USER_CONTEXT_JWKS", "")
+    user_context_jwks_reload_seconds: float = float(os.getenv("USER_CONTEXT_JWKS_RELOAD_SECONDS", "30"))
+    user_context_cache_size: int = int(os.getenv("USER_CONTEXT_CACHE_SIZE", "10000"))
+    user_context_cache_seconds: float = float(os.getenv("USER_CONTEXT_CACHE_SECONDS", "300"))
+    user_context_leeway: float = float(os.getenv("USER_CONTEXT_LEEWAY", "30"))
+    # Warm start (app/core/warmup.py): tenants to pre-connect at startup
+    tenant_manifest: str = os.getenv("TENANT_MANIFEST", "")
+    warm_concurrency: int = int(os.getenv("WARM_CONCURRENCY", "8"))
+    warm_budget_seconds: float = float(os.getenv("WARM_BUDGET_SECONDS", "60"))
+    warm_pool_connections: int = int(os.getenv("WARM_POOL_CONNECTIONS", "2"))
+    # Tables profiled concurrently by build_catalog (1 = sequential)
+    introspect_threads: int = int(os.getenv("INTROSPECT_THREADS", "4"))
+    # Background /connect jobs (app/core/connect_jobs.py)
+    connect_job_workers: int = int(os.getenv("CONNECT_JOB_WORKERS", "4"))
+    connect_job_chunk: int = int(os.getenv("CONNECT_JOB_CHUNK", "50"))
+    # Schema change polling per database (app/db/schema_watch.py; 0 = off)
+    schema_watch_seconds: float = float(os.getenv("SCHEMA_WATCH_SECONDS", "60"))
+    # Read replicas (app/db/replicas.py): round_robin | least_latency
+    replica_policy: str = os.getenv("REPLICA_POLICY", "round_robin").lower()
+    replica_health_seconds: float = float(os.getenv("REPLICA_HEALTH_SECONDS", "10"))
+    read_your_writes_seconds: float = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+    # /chat/batch (app/core/chat_batch.py)
+    chat_batch_concurrency: int = int(os.getenv("CHAT_BATCH_CONCURRENCY", "8"))
+    chat_batch_max_items: int = int(os.getenv("CHAT_BATCH_MAX_ITEMS", "500"))
+    # Fan-out sessions across shards (app/core/fanout.py)
+    fanout_shard_timeout_seconds: float = float(os.getenv("FANOUT_SHARD_TIMEOUT_SECONDS", "10"))
+    # In-process snapshots of small tables (app/core/snapshots.py; 0 rows = off)
+    snapshot_max_rows: int = int(os.getenv("SNAPSHOT_MAX_ROWS", "0"))
+    snapshot_ttl_seconds: float = float(os.getenv("SNAPSHOT_TTL_SECONDS", "300"))
+    snapshot_check_seconds: float = float(os.getenv("SNAPSHOT_CHECK_SECONDS", "30"))
+    # Encrypts DB URLs in the shared session registry (app/db/registry.py; needs cryptography)
+    registry_secret: str = os.getenv("REGISTRY_SECRET", "")
+    stats_refresh_seconds: float = float(os.getenv("STATS_REFRESH_SECONDS", "900"))
 
 settings = Settings()
@@ -0,0 +1,165 @@
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Dict
+from sqlalchemy.engine import Engine
+from app.config import settings
+from app.core.tracing import stage, record_admission_rejected
+
+# Admission control for /chat. Work is admitted through bounded gates:
+#   llm_gate         - process-wide cap on in-flight LLM calls
+#   db_slot(engine)  - per-engine cap on in-flight DB work
+#   session_gate     - one message at a time per session_id
+# Each gate has a bounded wait queue; when it is full (or the wait times out)
+# the request is shed immediately instead of piling into the threadpool.
+# A limit of 0 disables the gate.
+
+class AdmissionRejected(Exception):
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class Overloaded(AdmissionRejected):
+    """Server-side capacity exhausted (503)"""
+    status_code = 503
+
+class SessionBusy(AdmissionRejected):
+    """Another message for the same session is still in progress (429)"""
+    status_code = 429
+
+class Gate:
+    """Counting semaphore with a bounded FIFO-ish wait queue and a wait timeout"""
+    def __init__(self, name: str, limit: int, max_queue: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._inflight = 0
+        self._waiting = 0
+        self.rejected = 0
+
+    def _reject(self, reason: str):
+        self.rejected += 1
+        record_admission_rejected(self.name, reason)
+        raise Overloaded(f"Too many concurrent {self.name} requests ({reason}); retry shortly.")
+
+    def acquire(self) -> None:
+        if self.limit <= 0:
+            return
+        with self._cond:
+            if self._inflight < self.limit and not self._waiting:
+                self._inflight += 1
+                return
+            if self._waiting >= self.max_queue:
+                self._reject("queue_full")
+            self._waiting += 1
+            try:
+                with stage(f"{self.name}_queue"):
+                    deadline = time.monotonic() + self.timeout
+                    while self._inflight >= self.limit:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._reject("timeout")
+                        self._cond.wait(remaining)
+                self._inflight += 1
+            finally:
+                self._waiting -= 1
+
+    def release(self) -> None:
+        if self.limit <= 0:
+            return
+        with self._cond:
+            self._inflight -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {"limit": self.limit, "inflight": self._inflight, "waiting": self._waiting, "rejected": self.rejected}
+
+class SessionGate:
+    """
+    Serializes messages per session_id. With policy "reject" an overlapping
+    message is refused at once; with "queue" up to max_queue messages wait
+    their turn (for at most timeout seconds).
+    """
+    def __init__(self, policy: str, max_queue: int, timeout: float):
+        self.policy = policy
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, dict] = {}
+
+    def _busy(self, reason: str):
+        record_admission_rejected("session", reason)
+        raise SessionBusy("A previous message for this session is still being processed.")
+
+    def acquire(self, session_id: str) -> None:
+        with self._lock:
+            s = self._sessions.get(session_id)
+            if s is None:
+                self._sessions[session_id] = {"busy": True, "waiting": 0, "cond": threading.Condition(self._lock)}
+                return
+            if not s["busy"] and not s["waiting"]:
+                s["busy"] = True
+                return
+            if self.policy == "reject" or s["waiting"] >= self.max_queue:
+                self._busy("overlap")
+            s["waiting"] += 1
+            try:
+                deadline = time.monotonic() + self.timeout
+                while s["busy"]:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._busy("timeout")
+                    s["cond"].wait(remaining)
+                s["busy"] = True
+            finally:
+                s["waiting"] -= 1
+                if not s["busy"] and not s["waiting"]:
+                    self._sessions.pop(session_id, None)
+
+    def release(self, session_id: str) -> None:
+        with self._lock:
+            s = self._sessions[session_id]
+            s["busy"] = False
+            if s["waiting"]:
+                s["cond"].notify()
+            else:
+                del self._sessions[session_id]
+
+    @contextmanager
+    def hold(self, session_id: str):
+        self.acquire(session_id)
+        try:
+            yield
+        finally:
+            self.release(session_id)
+
+llm_gate = Gate("llm", settings.llm_max_concurrency, settings.llm_max_queue, settings.admission_wait_seconds)
+session_gate = SessionGate(settings.session_overlap, settings.session_max_queue, settings.admission_wait_seconds)
+
+_db_gates: "weakref.WeakKeyDictionary[Engine, Gate]" = weakref.WeakKeyDictionary()
+_db_gates_lock = threading.Lock()
+
+def db_gate(engine: Engine) -> Gate:
+    with _db_gates_lock:
+        gate = _db_gates.get(engine)
+        if gate is None:
+            gate = _db_gates[engine] = Gate("db", settings.db_max_concurrency, settings.db_max_queue, settings.admission_wait_seconds)
+        return gate
+
+def db_slot(engine: Engine):
+    """with db_slot(engine): ... -> bounded per-engine DB concurrency"""
+    return db_gate(engine).slot()
@@ -0,0 +1,285 @@
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Phase 9 audit log. Request code only appends to an in-memory queue; a
+# background thread group-commits batches to an append-only JSONL file or a
+# local SQLite database. The queue is bounded (AUDIT_MAX_QUEUE events) and
+# AUDIT_OVERFLOW decides what happens when it is full:
+#   drop_oldest - evict the oldest queued event (default)
+#   drop_new    - discard the incoming event
+#   block       - wait up to AUDIT_BLOCK_SECONDS for space, then discard it
+# Dropped events are counted in stats(). close() drains the queue on shutdown.
+
+MAX_FIELD_CHARS = 4000
+
+def _clip(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > MAX_FIELD_CHARS:
+        return value[:MAX_FIELD_CHARS] + f"…[{len(value)} chars]"
+    return value
+
+def _default(value: Any) -> Any:
+    # Plans are queued as pydantic models and only serialized by the writer thread
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return str(value)
+
+def _json(value: Any) -> Optional[str]:
+    return None if value is None else json.dumps(value, default=_default, ensure_ascii=False)
+
+class JsonlSink:
+    """One JSON object per line; each batch is written and fsynced once"""
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "a", encoding="utf-8")
+
+    def write_batch(self, events: List[Dict[str, Any]]) -> None:
+        self._f.write("".join(_json(e) + "\n" for e in events))
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def close(self) -> None:
+        self._f.close()
+
+class SQLiteSink:
+    """ai_audit_log table; each batch is one executemany + commit"""
+    COLUMNS = (
+        "ts", "session_id", "user_id", "message", "user_context", "intent", "entity",
+        "plan", "statements", "rows", "duration_ms", "error",
+    )
+
+    def __init__(self, path: str):
+        self.path = path
+        # Only the writer thread uses the connection after construction
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ai_audit_log ("
+            "id INTEGER PRIMARY KEY, ts TEXT NOT NULL, session_id TEXT, user_id TEXT, message TEXT, "
+            "user_context TEXT, intent TEXT, entity TEXT, plan TEXT, statements TEXT, rows INTEGER, "
+            "duration_ms REAL, error TEXT)"
+        )
+        self._conn.commit()
+
+    def write_batch(self, events: List[Dict[str, Any]]) -> None:
+        json_cols = {"user_context", "plan", "statements"}
+        rows = [
+            tuple(_json(e.get(c)) if c in json_cols else e.get(c) for c in self.COLUMNS)
+            for e in events
+        ]
+        with self._conn:
+            self._conn.executemany(
+                f"INSERT INTO ai_audit_log ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                rows,
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+class AuditLog:
+    def __init__(self, sink, max_queue: int = 10000, batch_size: int = 200, flush_interval: float = 1.0,
+                 overflow: str = "drop_oldest", block_seconds: float = 0.05):
+        if overflow not in ("drop_oldest", "drop_new", "block"):
+            raise ValueError(f"Unknown audit overflow policy: {overflow}")
+        self.sink = sink
+        self.max_queue = max(1, max_queue)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_seconds = block_seconds
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self._writing = 0
+        self._closed = False
+        self._flush_now = False
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, event: Dict[str, Any]) -> bool:
+        """Queue an event without blocking (except under the "block" policy). False if it was dropped."""
+        with self._cond:
+            if self._closed:
+                self.dropped += 1
+                return False
+            if len(self._queue) >= self.max_queue:
+                if self.overflow == "drop_oldest":
+                    self._queue.popleft()
+                    self.dropped += 1
+                elif self.overflow == "drop_new":
+                    self.dropped += 1
+                    return False
+                else:
+                    deadline = time.monotonic() + self.block_seconds
+                    while len(self._queue) >= self.max_queue:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.dropped += 1
+                            return False
+                        self._cond.wait(remaining)
+            self._queue.append(event)
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+            return True
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while len(self._queue) < self.batch_size and not (self._closed or self._flush_now):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if not self._queue:
+                    self._flush_now = False
+                    self._cond.notify_all()
+                    if self._closed:
+                        return
+                    continue
+                n = min(len(self._queue), self.batch_size)
+                batch = [self._queue.popleft() for _ in range(n)]
+                self._writing = n
+                # Room in the queue for blocked producers
+                self._cond.notify_all()
+            try:
+                self.sink.write_batch(batch)
+                ok = True
+            except Exception as e:
+                logger.warning("audit batch of %d events failed: %s", n, e)
+                ok = False
+            with self._cond:
+                self._writing = 0
+                if ok:
+                    self.written += n
+                else:
+                    self.failed += n
+                self._cond.notify_all()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Write everything queued so far; True if the queue drained in time"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._flush_now = True
+            self._cond.notify_all()
+            while self._queue or self._writing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._thread.is_alive():
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Drain the queue, stop the writer and close the sink (idempotent)"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self._queue:
+            logger.warning("audit log closed with %d unwritten events", len(self._queue))
+        self.sink.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "queued": len(self._queue),
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "overflow": self.overflow,
+            }
+
+def make_audit_log() -> Optional[AuditLog]:
+    if settings.audit_sink in ("", "none", "off"):
+        return None
+    if settings.audit_sink == "sqlite":
+        sink = SQLiteSink(settings.audit_path or "audit.db")
+    elif settings.audit_sink == "file":
+        sink = JsonlSink(settings.audit_path or "audit.jsonl")
+    else:
+        raise ValueError(f"Unknown AUDIT_SINK: {settings.audit_sink}")
+    log = AuditLog(
+        sink,
+        max_queue=settings.audit_max_queue,
+        batch_size=settings.audit_batch_size,
+        flush_interval=settings.audit_flush_seconds,
+        overflow=settings.audit_overflow,
+        block_seconds=settings.audit_block_seconds,
+    )
+    atexit.register(log.close)
+    return log
+
+audit_log = make_audit_log()
+
+# Per-message record, filled in along the chat pipeline
+_current: ContextVar[Optional[Dict[str, Any]]] = ContextVar("phasewise_audit", default=None)
+
+@contextmanager
+def audit_message(session_id: str, message: str, user_context: Optional[Dict[str, Any]] = None) -> Iterator[Optional[Dict[str, Any]]]:
+    """Collects one audit event for a chat message and queues it on exit"""
+    if audit_log is None:
+        yield None
+        return
+    event = {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "session_id": session_id,
+        "user_id": (user_context or {}).get("user_id"),
+        "message": _clip(message),
+        "user_context": user_context,
+        "intent": None,
+        "entity": None,
+        "plan": None,
+        "statements": [],
+        "rows": None,
+        "duration_ms": None,
+        "error": None,
+    }
+    token = _current.set(event)
+    t0 = time.perf_counter()
+    try:
+        yield event
+    except BaseException:
+        event["error"] = _clip(traceback.format_exc())
+        raise
+    finally:
+        _current.reset(token)
+        event["duration_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+        audit_log.record(event)
+
+def audit_note(**fields: Any) -> None:
+    """Set fields (intent, entity, plan, ...) on the current message's audit event"""
+    event = _current.get()
+    if event is not None:
+        event.update(fields)
+
+def auditing() -> bool:
+    """True while the current message's statements are being recorded"""
+    return _current.get() is not None
+
+def audit_statement(sql: str, params: Any, rows: Optional[int], seconds: float) -> None:
+    """Append an executed statement to the current message's audit event"""
+    event = _current.get()
+    if event is None:
+        return
+    if isinstance(params, dict):
+        params = {k: _clip(v) for k, v in params.items()}
+    event["statements"].append({"sql": _clip(sql), "params": params, "rows": rows, "ms": round(seconds * 1000, 3)})
+    if rows is not None:
+        event["rows"] = (event["rows"] or 0) + rows
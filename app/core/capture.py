@@ -0,0 +1,183 @@
+import atexit
+import hashlib
+import hmac
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional
+from app.config import settings
+from app.core.audit import AuditLog, JsonlSink
+from app.core.tracing import current_trace
+
+# Workload capture for replay (benchmarks/replay.py). With CAPTURE_PATH set,
+# /connect and /chat append one JSON line per request: pseudonymous session
+# id, anonymized message, detected intent/plan, the LLM responses it used and
+# server-side timings. Emails, numbers and quoted literals are masked; every
+# other word that is not a table or column name of the session's catalog or a
+# common query word (_STOP_WORDS) is replaced by a keyed pseudonym, the same
+# word always by the same one. That covers every string the LLM returned too
+# (filter values, clarifications). DB URLs are reduced to a keyed hash. Writes
+# go through the same bounded background writer as the audit log.
+
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(\.[\w-]+)+")
+_QUOTED_RE = re.compile(r"'[^']*'|\"[^\"]*\"")
+_NUMBER_RE = re.compile(r"\b\d+(?:[.,]\d+)*\b")
+# Masks and pseudonyms are kept as they are, so masking is idempotent
+_WORD_RE = re.compile(r"<(?:email|str|n|w_[0-9a-f]{8})>|[^\W\d_]+")
+
+# Words kept verbatim besides schema names: function words, query vocabulary
+# and the literals of the LLM output schemas (app/llm/schemas.py)
+_STOP_WORDS = frozenset("""
+    a about above after all an and any are as at be before below between both but by can could did do
+    does each few for from had has have how i if in into is it its me more most my no not of on or
+    other our over per please same should so some such than that the their them then there these
+    they this those through to too under until up was we were what when where which while who whom
+    why will with within without would you your
+    add amount ascending average avg cancel change count create created day days delete descending
+    display earliest every find first get give greatest group highest insert last latest least
+    less like list lowest many max maximum min minimum month months much new newest next number
+    oldest only order ordered previous recent remove set show since sort sorted sum tell top total
+    update updated week weeks year years yesterday today tomorrow
+    read unknown asc desc ilike null true false
+""".split())
+
+def anonymize(text: str) -> str:
+    """Masks literal values; idempotent, so anonymized text maps to itself"""
+    text = _EMAIL_RE.sub("<email>", text)
+    text = _QUOTED_RE.sub("<str>", text)
+    return _NUMBER_RE.sub("<n>", text)
+
+def catalog_vocabulary(catalog) -> frozenset:
+    """Lower-cased words of the catalog's table and column names (and their singulars)"""
+    words = set()
+    for t, profile in catalog["tables"].items():
+        for name in [t] + [c["name"] for c in profile["columns"]]:
+            words.update(w.lower() for w in _WORD_RE.findall(name))
+    return frozenset(words | {w[:-1] for w in words if len(w) > 3 and w.endswith("s")})
+
+def _mask_response(value: Any, mask: Callable[[str], str], key: Optional[str] = None) -> Any:
+    # Every string the LLM returned is masked, keys of "fields" (column names) too; structure is kept
+    if isinstance(value, dict):
+        if key == "fields":
+            return {mask(k): _mask_response(v, mask, "value") for k, v in value.items()}
+        return {k: _mask_response(v, mask, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_mask_response(v, mask, key) for v in value]
+    if isinstance(value, str):
+        return mask(value)
+    if key == "value" and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return 0
+    return value
+
+def llm_key(system: str, user: str) -> str:
+    """Lookup key for a recorded LLM response, stable across capture and replay"""
+    return hashlib.sha1(system.encode()).hexdigest()[:16] + "|" + anonymize(user)
+
+class WorkloadCapture:
+    def __init__(self, path: str, salt: str):
+        self.salt = salt.encode()
+        self.log = AuditLog(JsonlSink(path), max_queue=settings.audit_max_queue, batch_size=settings.audit_batch_size,
+                            flush_interval=settings.audit_flush_seconds, overflow="drop_oldest")
+
+    def pseudonym(self, value: str) -> str:
+        return hmac.new(self.salt, value.encode(), hashlib.sha256).hexdigest()[:16]
+
+    def mask(self, text: str, vocabulary: frozenset = frozenset()) -> str:
+        """anonymize(), then pseudonyms for words outside vocabulary and _STOP_WORDS"""
+        def word(m):
+            w = m.group(0)
+            if w.startswith("<") or w.lower() in vocabulary or w.lower() in _STOP_WORDS:
+                return w
+            return f"<w_{self.pseudonym(w.lower())[:8]}>"
+        return _WORD_RE.sub(word, anonymize(text))
+
+    def record(self, event: Dict[str, Any]) -> None:
+        self.log.record(event)
+
+    def close(self) -> None:
+        self.log.close()
+
+def make_capture() -> Optional[WorkloadCapture]:
+    if not settings.capture_path:
+        return None
+    capture = WorkloadCapture(settings.capture_path, settings.capture_salt or os.urandom(16).hex())
+    atexit.register(capture.close)
+    return capture
+
+workload_capture = make_capture()
+
+_current: ContextVar[Optional[Dict[str, Any]]] = ContextVar("phasewise_capture", default=None)
+_raw: ContextVar[Optional[Dict[str, Any]]] = ContextVar("phasewise_capture_raw", default=None)
+
+def _mask_event(event: Dict[str, Any], kind: str, raw: Dict[str, Any]) -> None:
+    def mask(text: str) -> str:
+        return workload_capture.mask(text, raw["vocabulary"])
+
+    for field in ("message", "entity"):
+        if isinstance(event.get(field), str):
+            event[field] = mask(event[field])
+    if "plan" in event:
+        event["plan"] = _mask_response(event["plan"], mask)
+    if kind == "chat":
+        event["llm"] = []
+        for system, user, response in raw["llm"]:
+            try:
+                body = json.dumps(_mask_response(json.loads(response), mask))
+            except ValueError:
+                body = mask(response)
+            event["llm"].append({"key": llm_key(system, mask(user)), "response": body})
+
+@contextmanager
+def capture_request(kind: str, session_id: str, **fields: Any) -> Iterator[Optional[Dict[str, Any]]]:
+    """Records one /connect or /chat request (status taken from a raised HTTPException)"""
+    if workload_capture is None:
+        yield None
+        return
+    event = {"kind": kind, "t": time.time(), "session": workload_capture.pseudonym(session_id), "status": None, **fields}
+    # Raw LLM calls and the catalog's words; masked and dropped before the event is written
+    raw = {"llm": [], "vocabulary": frozenset()}
+    token, raw_token = _current.set(event), _raw.set(raw)
+    t0 = time.perf_counter()
+    try:
+        yield event
+        event["status"] = 200
+    except BaseException as e:
+        event["status"] = getattr(e, "status_code", 500)
+        raise
+    finally:
+        _current.reset(token)
+        _raw.reset(raw_token)
+        event["ms"] = round((time.perf_counter() - t0) * 1000, 3)
+        _mask_event(event, kind, raw)
+        trace = current_trace()
+        if trace is not None:
+            event["stages"] = {name: round(secs * 1000, 3) for name, (secs, _) in trace.stages.items()}
+        workload_capture.record(event)
+
+def capture_db(db_url: str) -> Optional[str]:
+    """Keyed hash standing in for a DB URL (credentials never leave the process)"""
+    return workload_capture.pseudonym(db_url) if workload_capture is not None else None
+
+def capture_llm(system: str, user: str, response: str) -> None:
+    raw = _raw.get()
+    if raw is not None:
+        raw["llm"].append((system, user, response))
+
+def capture_vocabulary(catalog) -> None:
+    """Keep the words of this session's table and column names verbatim in the capture"""
+    raw = _raw.get()
+    if raw is not None:
+        raw["vocabulary"] = catalog_vocabulary(catalog)
+
+def capture_note(**fields: Any) -> None:
+    event = _current.get()
+    if event is not None:
+        event.update(fields)
+
+def capture_plan(plan: Any) -> None:
+    event = _current.get()
+    if event is not None and hasattr(plan, "model_dump"):
+        event["plan"] = plan.model_dump()
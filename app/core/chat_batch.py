@@ -0,0 +1,43 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+from app.core.tracing import record_coalesced
+
+# /chat/batch. Identical (session_id, message) pairs are answered once and the
+# result is shared; the remaining items run on up to CHAT_BATCH_CONCURRENCY
+# threads, so wall time tracks the slowest item rather than the sum. LLM calls
+# still go through llm_gate, and identical prompts issued at the same time
+# (the same question on several sessions over one schema) are coalesced by
+# llm_flight. Results come back in request order, one entry per item.
+
+Item = Tuple[str, str]  # (session_id, message)
+
+def dedup_key(session_id: str, message: str) -> Item:
+    return session_id, " ".join(message.split())
+
+def run_batch(items: List[Item], answer: Callable[[str, str], Dict[str, Any]], concurrency: int) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    answer(session_id, message) -> result dict; it must not raise (errors are
+    part of the result). Returns (results in item order, unique items answered).
+    """
+    slots: Dict[Item, int] = {}
+    unique: List[Item] = []
+    order: List[int] = []
+    for session_id, message in items:
+        key = dedup_key(session_id, message)
+        if key not in slots:
+            slots[key] = len(unique)
+            unique.append((session_id, message))
+        else:
+            record_coalesced("chat_batch")
+        order.append(slots[key])
+
+    workers = max(1, min(concurrency, len(unique)))
+    if workers == 1:
+        answers = [answer(s, m) for s, m in unique]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chat-batch") as pool:
+            # One context copy per item keeps tracing/audit attached to this request
+            futures = [pool.submit(contextvars.copy_context().run, answer, *item) for item in unique]
+            answers = [f.result() for f in futures]
+    return [answers[i] for i in order], len(unique)
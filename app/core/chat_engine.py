@@ -2,27 +2,39 @@ from typing import Any, Dict
 from sqlalchemy.engine import Engine
 from sqlalchemy import MetaData
 
-from app.core.state_manager import state_manager
+from app.core.state_manager import state_manager, StateUnitOfWork
 from app.core.planner import detect_intent, make_read_plan
-from app.core.executor import run_read
-from app.core.formatter import format_table, short_preview
+from app.core.executor import run_read_columnar
+from app.core.fanout import Fanout, run_read_fanout
+from app.core.formatter import short_preview_columnar
+from app.core.tracing import stage
+from app.core.admission import AdmissionRejected
+from app.core.audit import audit_message, audit_note
+from app.core.capture import capture_note, capture_plan
 
-def handle_message(session_id: str, message: str, engine: Engine, catalog: Dict[str, Any], metadata: MetaData, user_context: Dict[str, Any] = None) -> Dict[str, Any]:
+def handle_message(session_id: str, message: str, engine: Engine, catalog: Dict[str, Any], metadata: MetaData, user_context: Dict[str, Any] = None, persist_state: bool = True) -> Dict[str, Any]:
+    # All state changes for this message are collected in one unit of work:
+    # one state read up front, one (version-checked) write at the end.
+    # persist_state=False answers from the current state without changing it.
+    with audit_message(session_id, message, user_context), stage("handle_message"), state_manager.unit_of_work(session_id, persist=persist_state) as uow:
+        return _handle(uow, message, engine, catalog, metadata, user_context)
+
+def _handle(uow: StateUnitOfWork, message: str, engine: Engine, catalog: Dict[str, Any], metadata: MetaData, user_context: Dict[str, Any] = None) -> Dict[str, Any]:
     # Basic protection: phase-1 is read-only
     # forbid_write_ops(message) # Relaxing this check as we now have state manager to handle intents safely
 
     # Update state with user context if present
     if user_context:
-         state_manager.update_state(session_id, user_context=user_context)
+         uow.update_state(user_context=user_context)
 
-    state = state_manager.get_state(session_id)
+    state = uow.get_state()
     exposed_tables = catalog["exposed_tables"]
     tables_info = catalog["tables"]
 
     # 1. Universal Commands (Rule-based)
     msg_lower = message.strip().lower()
     if msg_lower in ["cancel", "stop", "start over", "reset"]:
-        state_manager.clear_state(session_id)
+        uow.clear_state()
         return {"reply": "♻️ Conversation reset. What would you like to do?", "data": None}
     
     if msg_lower == "show draft":
@@ -36,16 +48,17 @@ def handle_message(session_id: str, message: str, engine: Engine, catalog: Dict[
     
     if state.stage == "idle":
         intent_out = detect_intent(message, exposed_tables)
+        audit_note(intent=intent_out.intent, entity=intent_out.entity)
+        capture_note(intent=intent_out.intent, entity=intent_out.entity)
         
         # Update state with detected intent
-        state = state_manager.update_state(
-            session_id, 
+        state = uow.update_state(
             intent=intent_out.intent, 
             entity=intent_out.entity
         )
 
         if intent_out.intent == "cancel": # LLM detected cancel
-             state_manager.clear_state(session_id)
+             uow.clear_state()
              return {"reply": "Okay — cleared context.", "data": None}
 
     # 3. Handle Intents
@@ -59,17 +72,22 @@ def handle_message(session_id: str, message: str, engine: Engine, catalog: Dict[
         
         if state.entity not in tables_info:
              # Reset entity if invalid
-             state_manager.update_state(session_id, entity=None)
+             uow.update_state(entity=None)
              return {"reply": "That table isn’t exposed. Please pick another.", "data": None}
 
         # Build read plan
         # Note: In a real stateful flow, we'd check if we have filters in state.
         # For Phase 4, we just execute fresh every time for 'read' but store context.
         plan = make_read_plan(message, state.entity, tables_info[state.entity])
+        audit_note(plan=plan)
+        capture_plan(plan)
         
+        deferred_fields = tables_info.get(plan.entity, {}).get("deferred_fields") or {}
+
         # Execute
+        read = run_read_fanout if isinstance(engine, Fanout) else run_read_columnar
         try:
-            rows = run_read(
+            table = read(
                 engine=engine,
                 metadata=metadata,
                 entity=plan.entity,
@@ -78,19 +96,29 @@ def handle_message(session_id: str, message: str, engine: Engine, catalog: Dict[
                 order_by=plan.order_by,
                 order_dir=plan.order_dir,
                 limit=plan.limit,
+                deferred=deferred_fields,
             )
+        except AdmissionRejected:
+            raise
         except Exception as e:
             return {"reply": f"⚠️ Error executing query: {str(e)}", "data": None}
 
-        columns = list(rows[0].keys()) if rows else (plan.columns or [])
-        data = format_table(rows, columns) if rows else {"type": "table", "columns": columns, "rows": [], "count": 0}
-        preview = short_preview(rows, columns)
+        # Column-oriented until the response is encoded (see app/api/encoding.py)
+        deferred = [c for c in deferred_fields if c in table["columns"]]
+        if deferred:
+            # Full values via POST /value
+            table["deferred"] = deferred
+        preview = short_preview_columnar(table)
+        shards = table.get("shards")
+        if shards and any(sh["status"] != "ok" for sh in shards):
+            answered = sum(sh["status"] == "ok" for sh in shards)
+            preview = f"{preview}\n(partial: {answered} of {len(shards)} shards answered)"
         
         # Reset state after successful read (read is usually one-shot)
         # Or keep it for context? Let's keep entity for now but reset stage.
-        state_manager.update_state(session_id, stage="idle")
+        uow.update_state(stage="idle")
         
-        return {"reply": f"Done. {preview}", "data": data}
+        return {"reply": f"Done. {preview}", "data": table}
 
     # If intent is create/update (Phase 5+), we would handle it here.
     # For Phase 4, we just acknowledge receipt of state for now.
@@ -0,0 +1,108 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from app.config import settings
+from app.state_store import state_store
+
+# Background /connect. POST /connect/jobs returns a job id at once; the
+# connect + introspection runs on a bounded worker pool (CONNECT_JOB_WORKERS)
+# and publishes progress as tables are introspected. Job records live in the
+# state store, so any worker can answer GET /connect/jobs/{id}.
+#
+#   queued -> running -> done | failed
+#
+# "usable" turns true once the first chunk of tables is in the session's
+# partial catalog; /chat works from then on with the tables seen so far.
+
+class ConnectJob:
+    def __init__(self, job_id: str, session_id: str, db_url: str, store, replica_urls: Optional[List[str]] = None):
+        self.job_id = job_id
+        self.session_id = session_id
+        self.db_url = db_url
+        self.replica_urls = list(replica_urls or [])
+        self.store = store
+        self.status = "queued"
+        self.tables_done = 0
+        self.tables_total: Optional[int] = None
+        self.exposed_tables = 0
+        self.usable = False
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.finished: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "session_id": self.session_id,
+            "status": self.status,
+            "tables_done": self.tables_done,
+            "tables_total": self.tables_total,
+            "exposed_tables": self.exposed_tables,
+            "usable": self.usable,
+            "error": self.error,
+            "created": self.created,
+            "finished": self.finished,
+        }
+
+    def _save(self) -> None:
+        self.store.set(ConnectJobs._key(self.job_id), self.as_dict())
+
+    def progress(self, tables_done: int, tables_total: int, exposed_tables: int) -> None:
+        self.tables_done, self.tables_total, self.exposed_tables = tables_done, tables_total, exposed_tables
+        self.usable = self.usable or exposed_tables > 0
+        self._save()
+
+class ConnectJobs:
+    def __init__(self, workers: int = 4, store=None):
+        self.store = store if store is not None else state_store
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="connect-job")
+        self._lock = threading.Lock()
+        self._active: Dict[str, ConnectJob] = {}  # session_id -> queued/running job in this process
+
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f"connect_job:{job_id}"
+
+    def submit(self, session_id: str, db_url: str, run: Callable[[ConnectJob], None],
+               replica_urls: Optional[List[str]] = None) -> ConnectJob:
+        """
+        Queue run(job) for a session. A session with a job still in flight for
+        the same URL gets that job back instead of a second introspection.
+        """
+        with self._lock:
+            job = self._active.get(session_id)
+            if job is not None and job.db_url == db_url:
+                return job
+            job = ConnectJob(uuid.uuid4().hex, session_id, db_url, self.store, replica_urls)
+            self._active[session_id] = job
+        job._save()
+        self._pool.submit(self._run, job, run)
+        return job
+
+    def _run(self, job: ConnectJob, run: Callable[[ConnectJob], None]) -> None:
+        job.status = "running"
+        job._save()
+        try:
+            run(job)
+            job.status = "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished = time.time()
+            job._save()
+            with self._lock:
+                if self._active.get(job.session_id) is job:
+                    del self._active[job.session_id]
+
+    def active(self, session_id: str) -> bool:
+        """True while a job for the session is queued or running in this process"""
+        with self._lock:
+            return session_id in self._active
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(self._key(job_id))
+
+connect_jobs = ConnectJobs(settings.connect_job_workers)
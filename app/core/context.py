@@ -3,19 +3,26 @@ import json
 from typing import Optional
 from fastapi import Header, HTTPException
 from pydantic import ValidationError
+from app.core import tokens
 from app.types import UserContext
 
 def get_user_context(x_user_context: Optional[str] = Header(None)) -> Optional[UserContext]:
     """
-    Decodes the x-user-context header (base64 encoded JSON)
-    and returns a UserContext object.
-    
-    In development mode, this allows injecting user identity.
-    WARNING: Unsecured. Phase 10 will replace this with signed tokens.
+    Decodes the x-user-context header and returns a UserContext object.
+
+    With USER_CONTEXT_SECRET or USER_CONTEXT_JWKS configured the header must be
+    a signed token (see app/core/tokens.py); otherwise it is base64 encoded JSON.
+    WARNING: the unsigned form is for development only.
     """
     if not x_user_context:
         return None
 
+    if tokens.token_verifier is not None:
+        try:
+            return tokens.token_verifier.verify(x_user_context)
+        except tokens.TokenError as e:
+            raise HTTPException(status_code=401, detail=f"Invalid x-user-context token: {str(e)}")
+
     try:
         decoded_bytes = base64.b64decode(x_user_context)
         decoded_str = decoded_bytes.decode('utf-8')
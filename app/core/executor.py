@@ -1,7 +1,18 @@
-from typing import Any, Dict, List, Optional
-from sqlalchemy import MetaData, Table, select, insert, update, asc, desc
-from sqlalchemy.engine import Engine
-from app.db.guards import clamp_limit, validate_update_filters, is_system_column, MAX_UPDATE_ROWS
+import base64
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+from sqlalchemy import MetaData, Table, Text, select, insert, update, asc, desc, tuple_, func, cast
+from sqlalchemy.engine import Connection, Engine
+from app.core.tracing import stage, record_rows
+from app.core.admission import db_slot
+from app.core.singleflight import read_flight
+from app.core.audit import audit_statement, auditing
+from app.db.replicas import replica_router
+from app.core.snapshots import snapshot_store
+from app.db.guards import clamp_limit, validate_update_filters, is_system_column, MAX_UPDATE_ROWS, MAX_BULK_ROWS, DEFERRED_PREVIEW_CHARS
 
 ALLOWED_OPS = {"read", "create", "update"}
 
@@ -38,13 +49,40 @@ def _apply_filters(stmt, table: Table, filters: list[dict]):
                 stmt = stmt.where(col.in_(val))
     return stmt
 
-def run_read(engine: Engine, metadata: MetaData, entity: str, columns: Optional[list[str]], filters: list[dict], order_by: Optional[str], order_dir: str, limit: Optional[int]) -> List[Dict[str, Any]]:
+def _deferred_select(table: Table, safe_cols: list[str], deferred: Dict[str, str]) -> list:
+    # Large columns are never shipped whole: text/JSON gets a server-side
+    # substring plus its length, binary gets only its size.
+    sel = []
+    for c in safe_cols:
+        col = table.c[c]
+        kind = deferred.get(c)
+        if kind == "binary":
+            sel.append(func.length(col).label(c))
+        elif kind == "text":
+            txt = cast(col, Text)
+            sel.append(func.substr(txt, 1, DEFERRED_PREVIEW_CHARS).label(c))
+            sel.append(func.length(txt).label(f"{c}__size"))
+        else:
+            sel.append(col)
+    return sel
+
+def _deferred_row(row: Dict[str, Any], deferred: Dict[str, str]) -> Dict[str, Any]:
+    for c, kind in deferred.items():
+        if kind == "binary":
+            if row[c] is not None:
+                row[c] = f"<binary {row[c]} bytes>"
+        else:
+            size = row.pop(f"{c}__size")
+            if size is not None and size > DEFERRED_PREVIEW_CHARS:
+                row[c] = f"{row[c]}… [{size} chars]"
+    return row
+
+def select_columns(metadata: MetaData, entity: str, columns: Optional[list[str]]) -> List[str]:
+    """The columns a read of entity returns for the requested ones"""
     if entity not in metadata.tables:
         raise ValueError("Unknown entity/table (not exposed).")
 
     table = metadata.tables[entity]
-
-    # column selection
     if columns:
         safe_cols = [c for c in columns if c in table.c]
         if not safe_cols:
@@ -54,8 +92,14 @@ def run_read(engine: Engine, metadata: MetaData, entity: str, columns: Optional[
         pk_cols = [c for c in table.primary_key.columns]
         picked = [c.name for c in pk_cols] + [c.name for c in list(table.c) if c.name not in [p.name for p in pk_cols]]
         safe_cols = picked[:8]
+    return safe_cols
+
+def _read_statement(metadata: MetaData, entity: str, columns: Optional[list[str]], filters: list[dict], order_by: Optional[str], order_dir: str, limit: Optional[int], deferred: Optional[Dict[str, str]]):
+    safe_cols = select_columns(metadata, entity, columns)
+    table = metadata.tables[entity]
 
-    stmt = select(*[table.c[c] for c in safe_cols])
+    deferred = {c: k for c, k in (deferred or {}).items() if c in safe_cols}
+    stmt = select(*_deferred_select(table, safe_cols, deferred))
 
     # filters
     stmt = _apply_filters(stmt, table, filters)
@@ -66,10 +110,189 @@ def run_read(engine: Engine, metadata: MetaData, entity: str, columns: Optional[
 
     # limit
     stmt = stmt.limit(clamp_limit(limit))
+    return stmt, deferred
+
+# Identical concurrent reads against the same database share one query.
+# The key includes a per-database write generation, bumped after every write
+# made through this process, so a read issued after a write never joins a
+# flight that started before it.
+_write_gen: Dict[Any, int] = {}
+_write_gen_lock = threading.Lock()
+
+def _bump_generation(engine: Engine) -> None:
+    with _write_gen_lock:
+        _write_gen[engine.url] = _write_gen.get(engine.url, 0) + 1
+
+def _note_write(engine: Engine) -> None:
+    _bump_generation(engine)
+    # Keeps this session's reads on the primary for the read-your-writes window
+    replica_router.note_write(engine)
+    snapshot_store.invalidate(engine)
+
+def note_schema_change(engine: Engine) -> None:
+    """Reads started against the old schema are never shared with later ones"""
+    _bump_generation(engine)
+    snapshot_store.invalidate(engine)
+
+# Deadline for reads in the current context (fan-out shards). It is enforced
+# by the database, so an abandoned read stops and frees its connection and
+# db_slot instead of running on after the caller gave up.
+_deadline: ContextVar[Optional[float]] = ContextVar("phasewise_read_deadline", default=None)
+
+@contextmanager
+def read_deadline(seconds: float) -> Iterator[None]:
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+@contextmanager
+def _bounded(conn: Connection) -> Iterator[None]:
+    deadline = _deadline.get()
+    if deadline is None:
+        yield
+        return
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("Read deadline passed before the query started.")
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        # Checked every 1000 VM instructions; returning 1 interrupts the statement
+        raw = conn.connection.driver_connection
+        raw.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 1000)
+        try:
+            yield
+        finally:
+            raw.set_progress_handler(None, 0)
+    elif dialect == "postgresql":
+        # Scoped to the read's transaction, rolled back when the connection is returned
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {max(1, int(remaining * 1000))}")
+        yield
+    elif dialect in ("mysql", "mariadb"):
+        var, value = ("max_statement_time", f"{remaining:.3f}") if dialect == "mariadb" else ("max_execution_time", str(max(1, int(remaining * 1000))))
+        conn.exec_driver_sql(f"SET SESSION {var} = {value}")
+        try:
+            yield
+        finally:
+            try:
+                conn.exec_driver_sql(f"SET SESSION {var} = 0")
+            except Exception:
+                # Broken connection: the pool discards it along with the setting
+                pass
+    else:
+        yield
+
+def _audit(engine: Engine, stmt, rows: Optional[int], t0: float, compiled=None) -> None:
+    compiled = compiled if compiled is not None else stmt.compile(dialect=engine.dialect)
+    audit_statement(str(compiled), compiled.params, rows, time.perf_counter() - t0)
+
+def _fetch(engine: Engine, stmt) -> tuple:
+    """(column names, rows) for a SELECT, coalesced with identical in-flight reads"""
+    t0 = time.perf_counter()
+    compiled = stmt.compile(dialect=engine.dialect)
+    # Deadline-bound reads don't share a flight with unbounded ones, and reads
+    # held on the primary (no replicas, or inside the read-your-writes window)
+    # don't join one that may be served by a lagging replica
+    primary_only = replica_router.replicas(engine) is None or replica_router.in_window(engine)
+    key = (engine.url, _write_gen.get(engine.url, 0), str(compiled), repr(sorted(compiled.params.items())), _deadline.get() is not None, primary_only)
+
+    def run(target: Engine):
+        with db_slot(target):
+            with stage("pool_wait"):
+                conn = target.connect()
+            with conn, stage("db_read"), _bounded(conn):
+                res = conn.execute(stmt)
+                return list(res.keys()), res.all()
+
+    keys, rows = read_flight.do(key, lambda: replica_router.read(engine, run))
+    _audit(engine, stmt, len(rows), t0, compiled)
+    return keys, rows
+
+def _from_snapshot(engine: Engine, metadata: MetaData, entity: str, columns: Optional[list[str]], filters: list[dict], order_by: Optional[str], order_dir: str, limit: Optional[int], deferred: Optional[Dict[str, str]]) -> Optional[tuple]:
+    """(column names, rows) as _fetch returns them when the table is served from an in-process snapshot, else None"""
+    if snapshot_store.max_rows <= 0:
+        return None
+    cols = select_columns(metadata, entity, columns)
+    table = metadata.tables[entity]
+    deferred = {c: k for c, k in (deferred or {}).items() if c in table.c}
+    return snapshot_store.serve(engine, table, cols, filters, order_by, order_dir, limit, deferred,
+                                lambda: _deferred_select(table, [c.name for c in table.c], deferred))
+
+def _read(engine: Engine, metadata: MetaData, entity: str, columns: Optional[list[str]], filters: list[dict], order_by: Optional[str], order_dir: str, limit: Optional[int], deferred: Optional[Dict[str, str]]) -> tuple:
+    """(column names, rows, deferred columns read) from a snapshot or the database"""
+    t0 = time.perf_counter()
+    stmt, read_deferred = _read_statement(metadata, entity, columns, filters, order_by, order_dir, limit, deferred)
+    # The snapshot holds every deferred column of the table, read or not
+    hit = _from_snapshot(engine, metadata, entity, columns, filters, order_by, order_dir, limit, deferred)
+    if hit is None:
+        return (*_fetch(engine, stmt), read_deferred)
+    keys, rows = hit
+    if auditing():
+        # Audited as the statement it stands in for
+        _audit(engine, stmt, len(rows), t0)
+    return keys, rows, read_deferred
+
+def run_read(engine: Engine, metadata: MetaData, entity: str, columns: Optional[list[str]], filters: list[dict], order_by: Optional[str], order_dir: str, limit: Optional[int], deferred: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+    keys, res, deferred = _read(engine, metadata, entity, columns, filters, order_by, order_dir, limit, deferred)
+    if not deferred:
+        rows = [dict(zip(keys, r)) for r in res]
+    else:
+        rows = [_deferred_row(dict(zip(keys, r)), deferred) for r in res]
+    record_rows(len(rows))
+    return rows
+
+def run_read_columnar(engine: Engine, metadata: MetaData, entity: str, columns: Optional[list[str]], filters: list[dict], order_by: Optional[str], order_dir: str, limit: Optional[int], deferred: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Same guarded SELECT as run_read, but returns column-oriented data straight
+    from the cursor: {"type": "columnar", "columns": [...], "data": [[col values], ...], "count": n}.
+    """
+    keys, rows, deferred = _read(engine, metadata, entity, columns, filters, order_by, order_dir, limit, deferred)
+    record_rows(len(rows))
+
+    data = dict(zip(keys, map(list, zip(*rows)) if rows else ([] for _ in keys)))
+    for c, kind in deferred.items():
+        if kind == "binary":
+            data[c] = [None if v is None else f"<binary {v} bytes>" for v in data[c]]
+        else:
+            sizes = data.pop(f"{c}__size")
+            data[c] = [
+                f"{v}… [{n} chars]" if n is not None and n > DEFERRED_PREVIEW_CHARS else v
+                for v, n in zip(data[c], sizes)
+            ]
+
+    return {"type": "columnar", "columns": list(data), "data": list(data.values()), "count": len(rows)}
+
+def fetch_value(engine: Engine, metadata: MetaData, entity: str, column: str, pk: Dict[str, Any]) -> Dict[str, Any]:
+    """Fetch the full value of one (deferred) column for a single row, by primary key"""
+    if entity not in metadata.tables:
+        raise ValueError("Unknown entity/table (not exposed).")
+
+    table = metadata.tables[entity]
+    if column not in table.c:
+        raise ValueError(f"Unknown column '{column}'.")
 
-    with engine.connect() as conn:
-        res = conn.execute(stmt)
-        return [dict(r._mapping) for r in res]
+    pk_names = [c.name for c in table.primary_key.columns]
+    if not pk_names or set(pk) != set(pk_names):
+        raise ValueError(f"Primary key values required for: {pk_names}")
+
+    stmt = select(table.c[column]).where(*[table.c[k] == v for k, v in pk.items()])
+
+    def run(target: Engine):
+        with db_slot(target), target.connect() as conn:
+            return conn.execute(stmt).all()
+
+    t0 = time.perf_counter()
+    rows = replica_router.read(engine, run)
+    _audit(engine, stmt, len(rows), t0)
+    if not rows:
+        raise ValueError("Row not found.")
+
+    value = rows[0][0]
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        raw = bytes(value)
+        return {"value": base64.b64encode(raw).decode("ascii"), "encoding": "base64", "size": len(raw)}
+    return {"value": value, "encoding": "json", "size": len(value) if isinstance(value, str) else None}
 
 def run_create(engine: Engine, metadata: MetaData, entity: str, fields: Dict[str, Any]) -> Dict[str, Any]:
     """Execute INSERT operation with guardrails"""
@@ -93,10 +316,83 @@ def run_create(engine: Engine, metadata: MetaData, entity: str, fields: Dict[str
     
     stmt = insert(table).values(**safe_fields)
     
-    with engine.connect() as conn:
+    t0 = time.perf_counter()
+    with db_slot(engine), engine.connect() as conn:
         result = conn.execute(stmt)
         conn.commit()
-        return {"inserted": result.rowcount, "fields": safe_fields}
+    _note_write(engine)
+    _audit(engine, stmt, result.rowcount, t0)
+    return {"inserted": result.rowcount, "fields": safe_fields}
+
+def validate_bulk_rows(metadata: MetaData, entity: str, rows: List[Dict[str, Any]], required_fields: List[str]) -> Dict[str, Any]:
+    """
+    Validate many INSERT rows in one pass against the catalog's create_fields.
+    Returns the cleaned rows plus per-row errors (by input index).
+    """
+    if entity not in metadata.tables:
+        raise ValueError("Unknown entity/table (not exposed).")
+    if len(rows) > MAX_BULK_ROWS:
+        raise ValueError(f"Bulk insert has {len(rows)} rows (max: {MAX_BULK_ROWS}).")
+
+    table = metadata.tables[entity]
+
+    # Same rules as run_create, resolved once for the whole batch
+    allowed = {c.name for c in table.c if not (c.primary_key and c.autoincrement)}
+    required = set(required_fields)
+
+    valid: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    for i, row in enumerate(rows):
+        clean = {k: v for k, v in row.items() if k in allowed}
+        missing = required - {k for k, v in clean.items() if v is not None}
+        if missing:
+            errors.append({"row": i, "error": f"Missing required fields: {sorted(missing)}"})
+        elif not clean:
+            errors.append({"row": i, "error": "No valid fields to insert."})
+        else:
+            valid.append(clean)
+    return {"rows": valid, "errors": errors}
+
+def _group_by_columns(rows: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    # executemany needs one column set per statement; rows that omit optional
+    # columns keep their server defaults instead of being padded with NULLs.
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for r in rows:
+        groups.setdefault(tuple(sorted(r)), []).append(r)
+    return list(groups.values())
+
+def run_bulk_create(engine: Engine, metadata: MetaData, entity: str, rows: List[Dict[str, Any]], batch_size: int) -> Dict[str, Any]:
+    """Execute a batched INSERT (executemany) of pre-validated rows in a single transaction"""
+    if entity not in metadata.tables:
+        raise ValueError("Unknown entity/table (not exposed).")
+    if not rows:
+        raise ValueError("No valid rows to insert.")
+
+    table = metadata.tables[entity]
+    batch_size = max(1, int(batch_size))
+
+    batches = []
+    stmt = insert(table)
+    with db_slot(engine), engine.begin() as conn:
+        for start in range(0, len(rows), batch_size):
+            chunk = rows[start:start + batch_size]
+            t0 = time.perf_counter()
+            for group in _group_by_columns(chunk):
+                t1 = time.perf_counter()
+                conn.execute(stmt, group)
+                # One entry per executemany; the rows themselves are not copied into the event
+                compiled = stmt.compile(dialect=engine.dialect, column_keys=list(group[0]))
+                audit_statement(str(compiled), None, len(group), time.perf_counter() - t1)
+            elapsed = time.perf_counter() - t0
+            batches.append({
+                "batch": len(batches) + 1,
+                "rows": len(chunk),
+                "seconds": round(elapsed, 6),
+                "rows_per_sec": round(len(chunk) / elapsed, 1) if elapsed > 0 else None,
+            })
+    _note_write(engine)
+
+    return {"inserted": len(rows), "batches": batches}
 
 def preview_update(engine: Engine, metadata: MetaData, entity: str, filters: list[dict]) -> List[Dict[str, Any]]:
     """Preview rows that would be affected by UPDATE"""
@@ -111,12 +407,19 @@ def preview_update(engine: Engine, metadata: MetaData, entity: str, filters: lis
     stmt = select(table).limit(MAX_UPDATE_ROWS)
     stmt = _apply_filters(stmt, table, filters)
     
-    with engine.connect() as conn:
-        res = conn.execute(stmt)
-        return [dict(r._mapping) for r in res]
+    def run(target: Engine):
+        with db_slot(target), target.connect() as conn:
+            return [dict(r._mapping) for r in conn.execute(stmt)]
+
+    return replica_router.read(engine, run)
 
 def run_update(engine: Engine, metadata: MetaData, entity: str, fields: Dict[str, Any], filters: list[dict]) -> Dict[str, Any]:
-    """Execute UPDATE operation with mandatory WHERE filters"""
+    """
+    Execute UPDATE operation with mandatory WHERE filters.
+    Runs in one transaction: lock + collect target rows, enforce the row cap
+    before writing, then update by primary key. The collected rows are returned
+    as the preview, so a confirmed update needs no separate preview_update scan.
+    """
     if entity not in metadata.tables:
         raise ValueError("Unknown entity/table (not exposed).")
     
@@ -137,18 +440,36 @@ def run_update(engine: Engine, metadata: MetaData, entity: str, fields: Dict[str
     
     if not safe_fields:
         raise ValueError("No valid fields to update.")
-    
-    stmt = update(table).values(**safe_fields)
+
+    pk_cols = list(table.primary_key.columns)
+    if not pk_cols:
+        raise ValueError("UPDATE requires a primary key on the table.")
+
+    # Fetch one past the cap so an oversized match is detected without a COUNT.
+    # FOR UPDATE is dropped by dialects that don't support it (e.g. SQLite).
+    stmt = select(table).limit(MAX_UPDATE_ROWS + 1).with_for_update()
     stmt = _apply_filters(stmt, table, filters)
-    
-    with engine.connect() as conn:
-        result = conn.execute(stmt)
-        conn.commit()
-        affected = result.rowcount
-        
-        # Safety check
-        if affected > MAX_UPDATE_ROWS:
-            conn.rollback()
-            raise ValueError(f"UPDATE would affect {affected} rows (max: {MAX_UPDATE_ROWS}). Aborted.")
-        
-        return {"updated": affected, "fields": safe_fields, "filters": filters}
+
+    t0 = time.perf_counter()
+    with db_slot(engine), engine.begin() as conn:
+        rows = [dict(r._mapping) for r in conn.execute(stmt)]
+
+        # Safety check (before any write; raising rolls the transaction back)
+        if len(rows) > MAX_UPDATE_ROWS:
+            raise ValueError(f"UPDATE would affect more than {MAX_UPDATE_ROWS} rows. Aborted.")
+
+        affected = 0
+        if rows:
+            if len(pk_cols) == 1:
+                where = pk_cols[0].in_([r[pk_cols[0].name] for r in rows])
+            else:
+                where = tuple_(*pk_cols).in_([tuple(r[c.name] for c in pk_cols) for r in rows])
+            upd = update(table).where(where).values(**safe_fields)
+            result = conn.execute(upd)
+            affected = result.rowcount
+    _audit(engine, stmt, len(rows), t0)
+    if affected:
+        _note_write(engine)
+        _audit(engine, upd, affected, t0)
+
+    return {"updated": affected, "fields": safe_fields, "filters": filters, "preview": rows}
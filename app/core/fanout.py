@@ -0,0 +1,115 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, NamedTuple, Optional
+from sqlalchemy import MetaData
+from sqlalchemy.engine import Engine
+from app.config import settings
+from app.core.executor import read_deadline, run_read_columnar, select_columns
+from app.db.catalog import Catalog
+from app.db.guards import clamp_limit
+
+# Fan-out sessions: one session_id over several connected sessions (one
+# database per region/shard). Only tables exposed by every member with the
+# same columns are offered. A read plan runs on all members at once, each
+# under FANOUT_SHARD_TIMEOUT_SECONDS, enforced by the shard's database (see
+# executor.read_deadline) so an abandoned shard frees its thread and db_slot.
+# Each shard returns its top `limit` rows; their union is ordered on order_by
+# and cut to the plan's limit. A shard that fails or times out is left out and
+# reported; the read fails only if every shard does. Fan-out sessions are read-only.
+
+class Member(NamedTuple):
+    session_id: str
+    engine: Engine
+    catalog: Catalog
+    metadata: MetaData
+
+def _columns(catalog: Catalog, table: str) -> List[str]:
+    return [c["name"] for c in catalog["tables"][table]["columns"]]
+
+def common_catalog(members: List[Member]) -> Catalog:
+    """The first member's catalog, narrowed to tables every member exposes with the same columns"""
+    first = members[0].catalog
+    exposed = [
+        t for t in first["exposed_tables"]
+        if all(t in m.catalog["tables"] and t in m.catalog["exposed_tables"]
+               and _columns(m.catalog, t) == _columns(first, t) for m in members[1:])
+    ]
+    return Catalog({t: first["tables"][t] for t in exposed}, tuple(exposed))
+
+class Fanout:
+    """Stands in for the engine of a fan-out session; see run_read_fanout"""
+    def __init__(self, session_id: str, members: List[Member]):
+        self.session_id = session_id
+        self.members = members
+        self.catalog = common_catalog(members)
+        # Each shard reads with its own MetaData; this one only satisfies the session interface
+        self.metadata = members[0].metadata
+
+def _merge(results: List[Dict[str, Any]], order_col: Optional[int], order_dir: str, limit: int) -> List[tuple]:
+    rows = [row for r in results for row in zip(*r["data"])]
+    if order_col is not None:
+        # At most shards x limit rows, so a stable sort rather than a k-way
+        # merge: dialects disagree on where NULLs go, the merged order puts them last
+        if order_dir == "asc":
+            rows.sort(key=lambda r: (r[order_col] is None, r[order_col]))
+        else:
+            rows.sort(key=lambda r: (r[order_col] is not None, r[order_col]), reverse=True)
+    return rows[:limit]
+
+def run_read_fanout(engine: Fanout, metadata: MetaData, entity: str, columns: Optional[list[str]], filters: list[dict], order_by: Optional[str], order_dir: str, limit: Optional[int], deferred: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    run_read_columnar over every member of a fan-out session, merged. The
+    result carries "shards": [{session_id, status, rows, ms, error}] in member order.
+    """
+    first = engine.members[0].metadata
+    cols = select_columns(first, entity, columns)
+    # The merge needs the sort column even when the plan doesn't return it
+    extra = order_by is not None and order_by in first.tables[entity].c and order_by not in cols
+    shard_cols = cols + [order_by] if extra else cols
+    limit = clamp_limit(limit)
+    timeout = settings.fanout_shard_timeout_seconds
+
+    def read(m: Member):
+        t0 = time.perf_counter()
+        with read_deadline(timeout):
+            table = run_read_columnar(m.engine, m.metadata, entity, shard_cols, filters, order_by, order_dir, limit, deferred)
+        return table, time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    # A pool per call: a shard still winding down never delays another fan-out
+    pool = ThreadPoolExecutor(max_workers=len(engine.members), thread_name_prefix="fanout")
+    try:
+        # One context copy per shard keeps tracing/audit attached to this request
+        futures = [pool.submit(contextvars.copy_context().run, read, m) for m in engine.members]
+        wait(futures, timeout=timeout)
+    finally:
+        pool.shutdown(wait=False)
+
+    shards, results, errors = [], [], []
+    for m, f in zip(engine.members, futures):
+        shard = {"session_id": m.session_id, "status": "ok", "rows": 0, "ms": None, "error": None}
+        if not f.done():
+            shard.update(status="timeout", ms=round((time.perf_counter() - t0) * 1000, 3))
+        elif f.exception() is not None:
+            errors.append(f.exception())
+            shard.update(status="error", error=str(f.exception()))
+        else:
+            table, seconds = f.result()
+            results.append(table)
+            shard.update(rows=table["count"], ms=round(seconds * 1000, 3))
+        shards.append(shard)
+
+    if not results:
+        if errors:
+            raise errors[0]
+        raise TimeoutError(f"No shard answered within {timeout}s.")
+
+    names = results[0]["columns"]
+    order_col = names.index(order_by) if order_by in names else None
+    rows = _merge(results, order_col, order_dir, limit)
+    if extra:
+        names = names[:-1]
+        rows = [r[:-1] for r in rows]
+    data = [list(c) for c in zip(*rows)] if rows else [[] for _ in names]
+    return {"type": "columnar", "columns": names, "data": data, "count": len(rows), "shards": shards}
@@ -20,3 +20,29 @@ def short_preview(rows: List[Dict[str, Any]], columns: List[str], max_rows: int
     if len(rows) > max_rows:
         lines.append(f"...and {len(rows) - max_rows} more rows.")
     return "\n".join(lines)
+
+def columnar_to_table(table: Dict[str, Any]) -> Dict[str, Any]:
+    """Row-oriented view of a run_read_columnar result (the default JSON shape)"""
+    out = {
+        "type": "table",
+        "columns": table["columns"],
+        "rows": [list(r) for r in zip(*table["data"])],
+        "count": table["count"],
+    }
+    if table.get("deferred"):
+        out["deferred"] = table["deferred"]
+    if table.get("shards"):
+        out["shards"] = table["shards"]
+    return out
+
+def short_preview_columnar(table: Dict[str, Any], max_rows: int = 5) -> str:
+    if not table["count"]:
+        return "No rows found."
+    lines = []
+    lines.append("Preview:")
+    lines.append(" | ".join(table["columns"]))
+    for r in zip(*[col[:max_rows] for col in table["data"]]):
+        lines.append(" | ".join(["" if v is None else str(v) for v in r]))
+    if table["count"] > max_rows:
+        lines.append(f"...and {table['count'] - max_rows} more rows.")
+    return "\n".join(lines)
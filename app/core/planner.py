@@ -4,19 +4,24 @@ from app.llm.prompts import detect_intent_prompt, read_plan_prompt, create_plan_
 from app.llm.schemas import DetectIntentOut, ReadPlanOut, CreatePlanOut, UpdatePlanOut
 from app.llm.utils import parse_with_retry
 from app.db.guards import forbid_write_ops
+from app.core.tracing import stage
 
 def detect_intent(message: str, exposed_tables: list[str]) -> DetectIntentOut:
     sys = detect_intent_prompt(exposed_tables)
-    return parse_with_retry(settings.default_model, sys, message, DetectIntentOut)
+    with stage("detect_intent"):
+        return parse_with_retry(settings.default_model, sys, message, DetectIntentOut)
 
 def make_read_plan(message: str, entity: str, entity_profile: dict) -> ReadPlanOut:
     sys = read_plan_prompt(entity_profile)
-    return parse_with_retry(settings.default_model, sys, message, ReadPlanOut)
+    with stage("read_plan"):
+        return parse_with_retry(settings.default_model, sys, message, ReadPlanOut)
 
 def make_create_plan(message: str, entity: str, entity_profile: dict) -> CreatePlanOut:
     sys = create_plan_prompt(entity_profile)
-    return parse_with_retry(settings.default_model, sys, message, CreatePlanOut)
+    with stage("create_plan"):
+        return parse_with_retry(settings.default_model, sys, message, CreatePlanOut)
 
 def make_update_plan(message: str, entity: str, entity_profile: dict) -> UpdatePlanOut:
     sys = update_plan_prompt(entity_profile)
-    return parse_with_retry(settings.default_model, sys, message, UpdatePlanOut)
+    with stage("update_plan"):
+        return parse_with_retry(settings.default_model, sys, message, UpdatePlanOut)
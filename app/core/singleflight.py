@@ -0,0 +1,60 @@
+import threading
+from typing import Any, Callable, Dict, Hashable
+from app.config import settings
+from app.core.tracing import record_coalesced
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: the first caller for a key runs fn,
+    callers arriving while it is in flight wait and share its result (or its
+    exception). The key is dropped as soon as the call finishes, so nothing
+    is reused afterwards - this is deduplication, not a cache.
+
+    Shared results must be treated as read-only by callers.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        if not settings.single_flight:
+            return fn()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            record_coalesced(self.name)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def inflight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+llm_flight = SingleFlight("llm")
+read_flight = SingleFlight("db_read")
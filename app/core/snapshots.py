@@ -0,0 +1,299 @@
+import datetime
+import operator
+import re
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import Table, func, select
+from sqlalchemy.engine import Engine
+from app.config import settings
+from app.core.admission import db_slot
+from app.core.tracing import stage, record_snapshot_read
+from app.db.guards import clamp_limit, DEFERRED_PREVIEW_CHARS
+from app.db.replicas import replica_router
+
+# In-process snapshots of small tables (statuses, countries, currencies...).
+# With SNAPSHOT_MAX_ROWS > 0, the first read of a table loads it whole; if it
+# has at most that many rows, later reads (filters, order_by, limit) are
+# answered from the in-memory copy, with lazily built per-column hash indexes
+# for = and in. A snapshot is reloaded after SNAPSHOT_TTL_SECONDS, when its
+# change fingerprint (row count + max updated_at or primary key, checked at
+# most every SNAPSHOT_CHECK_SECONDS) moves, and dropped on any write made
+# through this process. Deferred (large) columns are held as the preview and
+# size a read would select, so they can be returned but only filtered or
+# sorted on when every value fits in the preview. Anything the copy can't
+# answer exactly as the database would (unknown op, a filter value that
+# doesn't fit the column type, string ordering under a locale collation,
+# uncomparable values) goes to the database instead.
+#
+# Snapshots are shared by every session on the same database URL, so they are
+# loaded and checked on the primary, never a (possibly lagging) replica. A
+# session inside its read-your-writes window reads from the database.
+
+# Dialects that order strings by codepoint by default, as Python does;
+# elsewhere the collation decides (ICU/locale, case- and accent-insensitive)
+_BINARY_COLLATION = {"sqlite"}
+# Dialects whose default collation also decides string equality and LIKE
+_COLLATED_EQUALITY = {"mysql", "mariadb", "mssql"}
+# Dialects that sort NULL above every value (last in ASC)
+_NULLS_HIGH = {"postgresql", "oracle"}
+
+_COMPARE: Dict[str, Callable[[Any, Any], bool]] = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+
+class _Fallback(Exception):
+    """The snapshot can't answer this read exactly; ask the database"""
+
+def _coerce(value: Any, column) -> Any:
+    """A filter value as the database would compare it against column"""
+    try:
+        py = column.type.python_type
+    except NotImplementedError:
+        py = None
+    if value is None or py is None:
+        return value
+    if py is bool:
+        if isinstance(value, str) and value.lower() in ("true", "false"):
+            return value.lower() == "true"
+        if isinstance(value, (bool, int)):
+            return bool(value)
+        raise _Fallback
+    if py in (int, float, Decimal):
+        if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+            return value
+        if isinstance(value, str):
+            try:
+                return int(value)
+            except ValueError:
+                try:
+                    return Decimal(value)
+                except InvalidOperation:
+                    raise _Fallback
+        raise _Fallback
+    if py in (datetime.datetime, datetime.date, datetime.time) and isinstance(value, str):
+        try:
+            return py.fromisoformat(value)
+        except ValueError:
+            raise _Fallback
+    if py is str:
+        return value if isinstance(value, str) else str(value)
+    if isinstance(value, py):
+        return value
+    raise _Fallback
+
+def _is_string(column) -> bool:
+    try:
+        return column.type.python_type is str
+    except NotImplementedError:
+        return False
+
+def _like(pattern: str, flags: int) -> "re.Pattern":
+    rx = "".join(".*" if ch == "%" else "." if ch == "_" else re.escape(ch) for ch in pattern)
+    return re.compile(rx, re.S | flags)
+
+def _like_flags(dialect: str, op: str) -> int:
+    # SQLite's LIKE (and the lower() behind its ILIKE) only folds ASCII letters
+    if dialect == "sqlite":
+        return re.I | re.A
+    return re.I if op == "ilike" else 0
+
+class Snapshot:
+    __slots__ = ("columns", "rows", "fingerprint", "deferred", "complete", "loaded", "checked", "_indexes", "_lock")
+
+    def __init__(self, columns: List[str], rows: Optional[List[tuple]], fingerprint: tuple, deferred: Dict[str, str]):
+        self.columns = columns
+        self.rows = rows  # None: table is over SNAPSHOT_MAX_ROWS, read from the DB until the TTL
+        self.fingerprint = fingerprint
+        self.deferred = deferred
+        # Deferred text columns whose previews are the whole values
+        self.complete = set()
+        if rows is not None:
+            pos = {c: i for i, c in enumerate(columns)}
+            self.complete = {
+                c for c, kind in deferred.items()
+                if kind == "text" and all(r[pos[f"{c}__size"]] is None or r[pos[f"{c}__size"]] <= DEFERRED_PREVIEW_CHARS for r in rows)
+            }
+        self.loaded = self.checked = time.monotonic()
+        self._indexes: Dict[int, Dict[Any, List[int]]] = {}
+        self._lock = threading.Lock()
+
+    def index(self, col: int) -> Dict[Any, List[int]]:
+        """value -> row positions, built on first use"""
+        ix = self._indexes.get(col)
+        if ix is None:
+            with self._lock:
+                ix = self._indexes.get(col)
+                if ix is None:
+                    ix = {}
+                    for pos, row in enumerate(self.rows):
+                        ix.setdefault(row[col], []).append(pos)
+                    self._indexes[col] = ix
+        return ix
+
+    def _comparable(self, column) -> None:
+        """Raise _Fallback if column's values in the copy aren't the ones the database compares"""
+        kind = self.deferred.get(column.name)
+        if kind is not None and (kind != "text" or column.name not in self.complete or not _is_string(column)):
+            raise _Fallback
+
+    def query(self, table: Table, dialect: str, cols: List[str], filters: List[dict],
+              order_by: Optional[str], order_dir: str, limit: Optional[int]) -> Tuple[List[str], List[tuple]]:
+        """
+        Same rows as the guarded SELECT for these arguments. Raises _Fallback
+        (or TypeError for values Python can't hash or compare) if unsure.
+        """
+        pos = {c: i for i, c in enumerate(self.columns)}
+        ordered = dialect in _BINARY_COLLATION
+        collated = dialect in _COLLATED_EQUALITY
+        matches: Optional[set] = None
+        preds: List[Callable[[tuple], bool]] = []
+
+        def narrow(hits):
+            nonlocal matches
+            matches = set(hits) if matches is None else matches & set(hits)
+
+        # Mirrors _apply_filters: unknown columns and empty "in" lists are ignored
+        for f in filters:
+            name, op, value = f["field"], f["op"], f["value"]
+            if name not in table.c or name not in pos:
+                continue
+            column = table.c[name]
+            self._comparable(column)
+            string = _is_string(column)
+            i = pos[name]
+            if string and (collated or (op in _COMPARE and not ordered)):
+                raise _Fallback
+            if op in ("like", "ilike"):
+                rx = _like(str(value), _like_flags(dialect, op))
+                preds.append(lambda r, i=i, rx=rx: r[i] is not None and rx.fullmatch(str(r[i])) is not None)
+                continue
+            if op == "in":
+                if isinstance(value, list) and value:
+                    ix = self.index(i)
+                    keys = {v for v in (_coerce(v, column) for v in value) if v is not None}
+                    narrow(p for k in keys for p in ix.get(k, ()))
+                continue
+            value = _coerce(value, column)
+            if op == "=":
+                # = None is IS NULL, as in SQLAlchemy
+                narrow(self.index(i).get(value, ()))
+            elif op == "!=":
+                if value is None:
+                    preds.append(lambda r, i=i: r[i] is not None)
+                else:
+                    preds.append(lambda r, i=i, k=value: r[i] is not None and r[i] != k)
+            elif op in _COMPARE:
+                if value is None:
+                    return self._project(cols, [])
+                cmp = _COMPARE[op]
+                preds.append(lambda r, i=i, k=value, cmp=cmp: r[i] is not None and cmp(r[i], k))
+            else:
+                raise _Fallback
+
+        rows = self.rows if matches is None else [self.rows[p] for p in sorted(matches)]
+        if preds:
+            rows = [r for r in rows if all(p(r) for p in preds)]
+        if order_by and order_by in table.c and order_by in pos:
+            column = table.c[order_by]
+            self._comparable(column)
+            if _is_string(column) and not ordered:
+                raise _Fallback
+            i = pos[order_by]
+            high = dialect in _NULLS_HIGH
+            rows = sorted(rows, key=lambda r: ((r[i] is None) == high, r[i]), reverse=order_dir != "asc")
+
+        return self._project(cols, rows[:clamp_limit(limit)])
+
+    def _project(self, cols: List[str], rows: List[tuple]) -> Tuple[List[str], List[tuple]]:
+        # Deferred text columns keep their __size next to them, as in the SELECT
+        keys = []
+        for c in cols:
+            keys.append(c)
+            if self.deferred.get(c) == "text":
+                keys.append(f"{c}__size")
+        pos = {c: i for i, c in enumerate(self.columns)}
+        picked = [pos[k] for k in keys]
+        return keys, [tuple(r[j] for j in picked) for r in rows]
+
+def _fingerprint_select(table: Table):
+    for name in ("updated_at", "modified_at"):
+        if name in table.c:
+            return select(func.count(), func.max(table.c[name]))
+    pk = list(table.primary_key.columns)
+    return select(func.count(), func.max(pk[0])) if pk else select(func.count())
+
+class SnapshotStore:
+    """
+    max_rows <= 0 disables snapshots (serve() always returns None).
+    """
+    def __init__(self, max_rows: int, ttl: float, check_interval: float):
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._entries: Dict[Tuple[Any, str], Snapshot] = {}
+        self._gen: Dict[Any, int] = {}  # per database; bumped by invalidate()
+        self._lock = threading.Lock()
+
+    def invalidate(self, engine: Engine) -> None:
+        """Drop every snapshot of the database behind engine (after a write or a schema change)"""
+        if self.max_rows <= 0:
+            return
+        with self._lock:
+            self._gen[engine.url] = self._gen.get(engine.url, 0) + 1
+            for key in [k for k in self._entries if k[0] == engine.url]:
+                del self._entries[key]
+
+    def _load(self, engine: Engine, table: Table, deferred: Dict[str, str], load_columns: Callable[[], list]) -> Snapshot:
+        with self._lock:
+            gen = self._gen.get(engine.url, 0)
+        stmt = select(*load_columns()).order_by(*table.primary_key.columns).limit(self.max_rows + 1)
+        fp_stmt = _fingerprint_select(table)
+
+        with stage("snapshot_load"), db_slot(engine), engine.connect() as conn:
+            res = conn.execute(stmt)
+            keys, rows = list(res.keys()), res.all()
+            fingerprint = tuple(conn.execute(fp_stmt).one())
+        snap = Snapshot(keys, [tuple(r) for r in rows] if len(rows) <= self.max_rows else None, fingerprint, deferred)
+        with self._lock:
+            # A write that landed while loading may not be in these rows
+            if self._gen.get(engine.url, 0) == gen:
+                self._entries[(engine.url, table.name)] = snap
+        return snap
+
+    def _changed(self, engine: Engine, table: Table, snap: Snapshot) -> bool:
+        with stage("snapshot_check"), db_slot(engine), engine.connect() as conn:
+            return tuple(conn.execute(_fingerprint_select(table)).one()) != snap.fingerprint
+
+    def serve(self, engine: Engine, table: Table, cols: List[str], filters: List[dict],
+              order_by: Optional[str], order_dir: str, limit: Optional[int],
+              deferred: Dict[str, str], load_columns: Callable[[], list]) -> Optional[Tuple[List[str], List[tuple]]]:
+        """
+        (column names, rows) from the snapshot of table, or None to read from
+        the database. deferred is the table's {column: kind} of large columns
+        and load_columns() the SELECT list that loads every column with them
+        as preview (+ __size) or size; the names returned follow that list.
+        """
+        if self.max_rows <= 0 or replica_router.in_window(engine):
+            return None
+        now = time.monotonic()
+        snap = self._entries.get((engine.url, table.name))
+        if snap is None or now - snap.loaded >= self.ttl or snap.deferred != deferred:
+            snap = self._load(engine, table, deferred, load_columns)
+        elif snap.rows is not None and now - snap.checked >= self.check_interval:
+            snap.checked = now  # one request checks, the others keep serving
+            if self._changed(engine, table, snap):
+                snap = self._load(engine, table, deferred, load_columns)
+        if snap.rows is None:
+            record_snapshot_read("too_large")
+            return None
+        try:
+            with stage("snapshot_read"):
+                out = snap.query(table, engine.dialect.name, cols, filters, order_by, order_dir, limit)
+        except (_Fallback, TypeError):
+            # TypeError: unhashable or uncomparable values, left to the database's own rules
+            record_snapshot_read("fallback")
+            return None
+        record_snapshot_read("hit")
+        return out
+
+snapshot_store = SnapshotStore(settings.snapshot_max_rows, settings.snapshot_ttl_seconds, settings.snapshot_check_seconds)
@@ -1,4 +1,5 @@
-from typing import Any, Dict, List, Optional, Literal
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Literal
 from pydantic import BaseModel, Field
 from app.state_store import state_store
 
@@ -13,6 +14,8 @@ class ConversationState(BaseModel):
     draft_payload: Dict[str, Any] = Field(default_factory=dict)
     filters: List[Dict[str, Any]] = Field(default_factory=list)
     user_context: Optional[Dict[str, Any]] = None
+    # Bumped on every unit-of-work flush (optimistic concurrency)
+    version: int = 0
     # Could add more context like:
     # missing_fields: List[str] = []
 
@@ -31,20 +34,77 @@ class StateManager:
     def update_state(self, session_id: str, **kwargs) -> ConversationState:
         """
         Updates the current state with provided kwargs.
-        Persists the updated state to storage.
+        Only the changed fields are written; the store merges them atomically,
+        so overlapping requests for a session don't overwrite each other's fields.
         """
-        current = self.get_state(session_id)
-        updated_data = current.model_dump()
-        updated_data.update(kwargs)
-        
-        # Validate effectively by re-creating model
-        new_state = ConversationState(**updated_data)
-        
-        # Persist
-        state_store.set(f"state:{session_id}", new_state.model_dump())
-        return new_state
+        # Validate the changed fields on their own (every field has a default)
+        changed = ConversationState(**kwargs).model_dump(include=set(kwargs))
+
+        # Persist + read back the merged state in one store call
+        merged = state_store.update(f"state:{session_id}", changed)
+        return ConversationState(**merged)
 
     def clear_state(self, session_id: str) -> None:
         state_store.delete(f"state:{session_id}")
 
+    @contextmanager
+    def unit_of_work(self, session_id: str, persist: bool = True) -> Iterator["StateUnitOfWork"]:
+        """
+        Request-scoped state: one read on entry, one write on successful exit.
+        On an exception nothing is written. persist=False never writes
+        (a scratch copy of the state, for /chat/batch).
+        """
+        uow = StateUnitOfWork(session_id, self.get_state(session_id))
+        yield uow
+        if persist:
+            uow.flush()
+
+class StateConflictError(Exception):
+    """Another request changed the session state since this one loaded it."""
+
+class StateUnitOfWork:
+    """
+    Same get/update/clear surface as StateManager, but for a single session and
+    held in memory until flush(), which writes once if the stored version is
+    still the one that was loaded.
+    """
+    def __init__(self, session_id: str, state: ConversationState):
+        self.session_id = session_id
+        self._state = state
+        self._loaded_version = state.version
+        self._changes: Dict[str, Any] = {}
+        self._cleared = False
+
+    def get_state(self) -> ConversationState:
+        return self._state
+
+    def update_state(self, **kwargs) -> ConversationState:
+        changed = ConversationState(**kwargs).model_dump(include=set(kwargs))
+        self._changes.update(changed)
+        self._state = self._state.model_copy(update=changed)
+        return self._state
+
+    def clear_state(self) -> None:
+        self._changes = {}
+        self._cleared = True
+        self._state = ConversationState(version=self._loaded_version)
+
+    @property
+    def dirty(self) -> bool:
+        return self._cleared or bool(self._changes)
+
+    def flush(self) -> None:
+        if not self.dirty:
+            return
+        fields = dict(self._changes, version=self._loaded_version + 1)
+        if self._cleared:
+            # A clear replaces the whole value (keeping the version chain) instead of deleting it
+            fields = dict(ConversationState().model_dump(), **fields)
+        ok = state_store.commit(f"state:{self.session_id}", self._loaded_version, fields, replace=self._cleared)
+        if not ok:
+            raise StateConflictError("Conversation state changed by a concurrent request. Please retry.")
+        self._loaded_version += 1
+        self._changes = {}
+        self._cleared = False
+
 state_manager = StateManager()
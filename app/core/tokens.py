@@ -0,0 +1,279 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional
+from app.config import settings
+from app.core.tracing import record_token_verify, stage
+from app.types import UserContext
+
+logger = logging.getLogger(__name__)
+
+# Phase 10 signed user context. x-user-context carries a compact JWS
+# (header.payload.signature) signed with HS256/384/512 using
+# USER_CONTEXT_SECRET or a JWKS "oct" key, or with RS*/ES*/EdDSA using public
+# keys from the local JWKS file at USER_CONTEXT_JWKS (asymmetric algorithms
+# need the optional `cryptography` package).
+#
+# Keys live in memory; the JWKS file is re-read when its mtime changes (checked
+# at most every USER_CONTEXT_JWKS_RELOAD_SECONDS, or early on an unknown kid),
+# so rotation is "add the new key, start signing with it, drop the old one".
+# Verified tokens are kept in a bounded LRU keyed by their SHA-256 digest until
+# they expire (capped at USER_CONTEXT_CACHE_SECONDS), so a repeated token costs
+# one hash and a dict lookup. A cached token stops being accepted as soon as
+# the key that verified it is removed or replaced.
+
+class TokenError(ValueError):
+    pass
+
+def _b64decode(part: str) -> bytes:
+    return base64.urlsafe_b64decode(part + "=" * (-len(part) % 4))
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def _b64int(part: str) -> int:
+    return int.from_bytes(_b64decode(part), "big")
+
+_HASHES = {"256": hashlib.sha256, "384": hashlib.sha384, "512": hashlib.sha512}
+_CURVES = {"P-256": ("SECP256R1", 32), "P-384": ("SECP384R1", 48), "P-521": ("SECP521R1", 66)}
+# JWK key type each algorithm family may be verified with (no HS/RS confusion)
+_ALG_KTY = {"HS": "oct", "RS": "RSA", "ES": "EC", "Ed": "OKP"}
+
+class Key(NamedTuple):
+    kid: str
+    kty: str
+    alg: Optional[str]
+    key: Any  # bytes for oct, a cryptography public key otherwise
+    size: int = 0  # EC coordinate size in bytes
+
+def _load_jwk(jwk: Dict[str, Any], kid: str) -> Key:
+    kty = jwk.get("kty")
+    alg = jwk.get("alg")
+    if kty == "oct":
+        return Key(kid, kty, alg, _b64decode(jwk["k"]))
+    try:
+        from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+    except ImportError:
+        raise TokenError(f"JWK {kid}: {kty} keys need the 'cryptography' package")
+    if kty == "RSA":
+        return Key(kid, kty, alg, rsa.RSAPublicNumbers(_b64int(jwk["e"]), _b64int(jwk["n"])).public_key())
+    if kty == "EC" and jwk.get("crv") in _CURVES:
+        curve, size = _CURVES[jwk["crv"]]
+        numbers = ec.EllipticCurvePublicNumbers(_b64int(jwk["x"]), _b64int(jwk["y"]), getattr(ec, curve)())
+        return Key(kid, kty, alg, numbers.public_key(), size)
+    if kty == "OKP" and jwk.get("crv") == "Ed25519":
+        return Key(kid, kty, alg, ed25519.Ed25519PublicKey.from_public_bytes(_b64decode(jwk["x"])))
+    raise TokenError(f"JWK {kid}: unsupported key type {kty}/{jwk.get('crv')}")
+
+def _verify_signature(key: Key, alg: str, signing_input: bytes, signature: bytes) -> bool:
+    if alg.startswith("HS"):
+        digest = hmac.new(key.key, signing_input, _HASHES[alg[2:]]).digest()
+        return hmac.compare_digest(digest, signature)
+
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import ec, padding
+    from cryptography.hazmat.primitives.asymmetric.utils import encode_dss_signature
+    try:
+        if alg.startswith("RS"):
+            key.key.verify(signature, signing_input, padding.PKCS1v15(), getattr(hashes, f"SHA{alg[2:]}")())
+        elif alg.startswith("ES"):
+            # JWS carries raw r || s; cryptography expects DER
+            if len(signature) != 2 * key.size:
+                return False
+            r = int.from_bytes(signature[:key.size], "big")
+            s = int.from_bytes(signature[key.size:], "big")
+            key.key.verify(encode_dss_signature(r, s), signing_input, ec.ECDSA(getattr(hashes, f"SHA{alg[2:]}")()))
+        else:
+            key.key.verify(signature, signing_input)
+    except InvalidSignature:
+        return False
+    return True
+
+class KeySet:
+    """HMAC secret + JWKS file, swapped atomically on reload"""
+    def __init__(self, secret: str = "", jwks_path: str = "", reload_seconds: float = 30.0):
+        self.secret = secret
+        self.jwks_path = jwks_path
+        self.reload_seconds = reload_seconds
+        self._keys: Dict[str, Key] = {}
+        self._mtime: Optional[float] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self._load()
+
+    def _load(self) -> None:
+        keys: Dict[str, Key] = {}
+        if self.secret:
+            keys["env"] = Key("env", "oct", None, self.secret.encode())
+        if self.jwks_path:
+            mtime = os.stat(self.jwks_path).st_mtime
+            with open(self.jwks_path) as f:
+                doc = json.load(f)
+            for i, jwk in enumerate(doc.get("keys", [])):
+                kid = jwk.get("kid") or f"#{i}"
+                if jwk.get("use", "sig") != "sig":
+                    continue
+                try:
+                    keys[kid] = _load_jwk(jwk, kid)
+                except (TokenError, KeyError, ValueError) as e:
+                    logger.warning("skipping JWK %s: %s", kid, e)
+            self._mtime = mtime
+        self._keys = keys
+        self.reloads += 1
+
+    def _maybe_reload(self, force: bool = False) -> None:
+        if not self.jwks_path:
+            return
+        now = time.monotonic()
+        if not force and now - self._checked < self.reload_seconds:
+            return
+        with self._lock:
+            if now - self._checked < (1.0 if force else self.reload_seconds):
+                return
+            self._checked = now
+            try:
+                if os.stat(self.jwks_path).st_mtime != self._mtime:
+                    self._load()
+            except (OSError, ValueError) as e:
+                # Keep serving the last good key set
+                logger.warning("JWKS reload from %s failed: %s", self.jwks_path, e)
+
+    def current(self, kid: str) -> Optional[Key]:
+        """The key now registered under kid (cache revalidation)"""
+        self._maybe_reload()
+        return self._keys.get(kid)
+
+    def candidates(self, kid: Optional[str], alg: str) -> List[Key]:
+        self._maybe_reload()
+        kty = _ALG_KTY.get(alg[:2])
+        if kid is not None:
+            key = self._keys.get(kid)
+            if key is None:
+                # Possibly a freshly rotated key
+                self._maybe_reload(force=True)
+                key = self._keys.get(kid)
+            keys = [key] if key is not None else []
+        else:
+            keys = list(self._keys.values())
+        return [k for k in keys if k.kty == kty and k.alg in (None, alg)]
+
+class TokenVerifier:
+    def __init__(self, keys: KeySet, cache_size: int = 10000, cache_seconds: float = 300.0, leeway: float = 30.0):
+        self.keys = keys
+        self.cache_size = max(0, cache_size)
+        self.cache_seconds = cache_seconds
+        self.leeway = leeway
+        # sha256(token) -> (expires_at, kid, key, context)
+        self._cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def verify(self, token: str) -> UserContext:
+        digest = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(digest)
+            if entry is not None:
+                expires_at, kid, key, context = entry
+                if expires_at > now and self.keys.current(kid) is key:
+                    self._cache.move_to_end(digest)
+                    self.hits += 1
+                    record_token_verify("hit")
+                    return context
+                del self._cache[digest]
+            self.misses += 1
+
+        try:
+            with stage("verify_token"):
+                key, claims = self._verify(token, now)
+            context = UserContext(**claims)
+        except (TokenError, ValueError) as e:
+            record_token_verify("invalid")
+            raise TokenError(str(e)) from None
+        record_token_verify("miss")
+
+        expires_at = now + self.cache_seconds
+        if "exp" in claims:
+            expires_at = min(expires_at, claims["exp"] + self.leeway)
+        if self.cache_size:
+            with self._lock:
+                self._cache[digest] = (expires_at, key.kid, key, context)
+                self._cache.move_to_end(digest)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return context
+
+    def _verify(self, token: str, now: float):
+        parts = token.split(".")
+        if len(parts) != 3:
+            raise TokenError("not a signed token")
+        try:
+            header = json.loads(_b64decode(parts[0]))
+            claims = json.loads(_b64decode(parts[1]))
+            signature = _b64decode(parts[2])
+        except (ValueError, UnicodeDecodeError):
+            raise TokenError("malformed token")
+        if not isinstance(header, dict) or not isinstance(claims, dict):
+            raise TokenError("malformed token")
+        alg = header.get("alg")
+        if not isinstance(alg, str) or alg[:2] not in _ALG_KTY or (alg[:2] != "Ed" and alg[2:] not in _HASHES):
+            raise TokenError(f"unsupported alg {alg}")
+
+        signing_input = f"{parts[0]}.{parts[1]}".encode()
+        for key in self.keys.candidates(header.get("kid"), alg):
+            if _verify_signature(key, alg, signing_input, signature):
+                break
+        else:
+            raise TokenError("bad signature or unknown key")
+
+        exp, nbf = claims.get("exp"), claims.get("nbf")
+        if exp is not None and (not isinstance(exp, (int, float)) or exp + self.leeway <= now):
+            raise TokenError("token expired")
+        if nbf is not None and (not isinstance(nbf, (int, float)) or nbf - self.leeway > now):
+            raise TokenError("token not yet valid")
+        if "user_id" not in claims and "sub" in claims:
+            claims = {**claims, "user_id": claims["sub"]}
+        return key, claims
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"cached": len(self._cache), "hits": self.hits, "misses": self.misses, "key_reloads": self.keys.reloads}
+
+def sign_token(claims: Dict[str, Any], key: Any, alg: str = "HS256", kid: Optional[str] = None) -> str:
+    """Issue a token (tests, benchmarks, dev tooling). key: secret bytes for HS*, a private key otherwise."""
+    header = {"alg": alg, "typ": "JWT"}
+    if kid is not None:
+        header["kid"] = kid
+    signing_input = f"{_b64encode(json.dumps(header).encode())}.{_b64encode(json.dumps(claims).encode())}".encode()
+    if alg.startswith("HS"):
+        signature = hmac.new(key, signing_input, _HASHES[alg[2:]]).digest()
+    else:
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import ec, padding
+        from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature
+        if alg.startswith("RS"):
+            signature = key.sign(signing_input, padding.PKCS1v15(), getattr(hashes, f"SHA{alg[2:]}")())
+        elif alg.startswith("ES"):
+            size = (key.curve.key_size + 7) // 8
+            r, s = decode_dss_signature(key.sign(signing_input, ec.ECDSA(getattr(hashes, f"SHA{alg[2:]}")())))
+            signature = r.to_bytes(size, "big") + s.to_bytes(size, "big")
+        else:
+            signature = key.sign(signing_input)
+    return f"{signing_input.decode()}.{_b64encode(signature)}"
+
+def make_verifier() -> Optional[TokenVerifier]:
+    if not (settings.user_context_secret or settings.user_context_jwks):
+        return None
+    keys = KeySet(settings.user_context_secret, settings.user_context_jwks, settings.user_context_jwks_reload_seconds)
+    return TokenVerifier(keys, settings.user_context_cache_size, settings.user_context_cache_seconds, settings.user_context_leeway)
+
+token_verifier = make_verifier()
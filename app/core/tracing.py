@@ -0,0 +1,233 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+
+# Lightweight per-request tracing + process-wide Prometheus metrics.
+# With TRACING disabled every entry point returns immediately.
+enabled = settings.tracing_enabled
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ROW_BUCKETS = (0, 1, 5, 10, 25, 50, 100)
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(pairs: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in pairs]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name, self.help = name, help
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, v in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(key)} {v}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name, self.help, self.buckets = name, help, buckets
+        # labels -> [per-bucket counts..., sum, count]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, s in sorted(self._series.items()):
+                for b, n in zip(self.buckets, s):
+                    le = 'le="%s"' % b
+                    lines.append(f"{self.name}_bucket{_labels(key, le)} {n}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_labels(key, le)} {s[-1]}")
+                lines.append(f"{self.name}_sum{_labels(key)} {s[-2]}")
+                lines.append(f"{self.name}_count{_labels(key)} {s[-1]}")
+        return lines
+
+REQUEST_SECONDS = Histogram("phasewise_request_seconds", "HTTP request duration")
+STAGE_SECONDS = Histogram("phasewise_stage_seconds", "Duration of pipeline stages (detect_intent, read_plan, llm, pool_wait, db_read, ...)")
+ROWS_RETURNED = Histogram("phasewise_rows_returned", "Rows returned per read", ROW_BUCKETS)
+LLM_TOKENS = Counter("phasewise_llm_tokens_total", "LLM tokens used")
+LLM_RETRIES = Counter("phasewise_llm_retries_total", "LLM validation retries")
+ADMISSION_REJECTED = Counter("phasewise_admission_rejected_total", "Requests shed by admission control")
+COALESCED = Counter("phasewise_coalesced_total", "Calls served by joining an identical in-flight call")
+TOKEN_VERIFY = Counter("phasewise_user_context_tokens_total", "Signed user-context tokens by result (hit = verified-token cache)")
+SNAPSHOT_READS = Counter("phasewise_snapshot_reads_total", "Reads of snapshot-eligible tables by result (hit = answered in process)")
+METRICS = [REQUEST_SECONDS, STAGE_SECONDS, ROWS_RETURNED, LLM_TOKENS, LLM_RETRIES, ADMISSION_REJECTED, COALESCED, TOKEN_VERIFY, SNAPSHOT_READS]
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for m in METRICS:
+        lines += m.render()
+    return "\n".join(lines) + "\n"
+
+class Trace:
+    """Per-request record behind the Server-Timing header"""
+    __slots__ = ("stages", "values", "lock")
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}  # name -> [total seconds, calls]
+        self.values: Dict[str, float] = {}
+        # Fan-out and batch work share the request's trace across threads
+        self.lock = threading.Lock()
+
+    def server_timing(self, total: float) -> str:
+        parts = []
+        for name, (secs, calls) in self.stages.items():
+            desc = f';desc="{calls} calls"' if calls > 1 else ""
+            parts.append(f"{name};dur={secs * 1000:.1f}{desc}")
+        for name, v in self.values.items():
+            parts.append(f'{name};desc="{v:g}"')
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+_current: ContextVar[Optional[Trace]] = ContextVar("phasewise_trace", default=None)
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+class _Stage:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        dt = time.perf_counter() - self.t0
+        STAGE_SECONDS.observe(dt, stage=self.name)
+        trace = _current.get()
+        if trace is not None:
+            with trace.lock:
+                s = trace.stages.get(self.name)
+                if s is None:
+                    trace.stages[self.name] = [dt, 1]
+                else:
+                    s[0] += dt
+                    s[1] += 1
+        return False
+
+class _NoopStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP = _NoopStage()
+
+def stage(name: str):
+    """with stage("db_read"): ... -> stage histogram + Server-Timing entry"""
+    return _Stage(name) if enabled else _NOOP
+
+def add_value(name: str, value: float) -> None:
+    """Per-request value shown in Server-Timing (summed within a request)"""
+    if not enabled:
+        return
+    trace = _current.get()
+    if trace is not None:
+        with trace.lock:
+            trace.values[name] = trace.values.get(name, 0) + value
+
+def record_llm_usage(prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+    if not enabled:
+        return
+    for kind, n in (("prompt", prompt_tokens), ("completion", completion_tokens)):
+        if n:
+            LLM_TOKENS.inc(n, kind=kind)
+            add_value(f"llm_{kind}_tokens", n)
+
+def record_llm_retry() -> None:
+    if not enabled:
+        return
+    LLM_RETRIES.inc()
+    add_value("llm_retries", 1)
+
+def record_admission_rejected(gate: str, reason: str) -> None:
+    if not enabled:
+        return
+    ADMISSION_REJECTED.inc(gate=gate, reason=reason)
+
+def record_coalesced(kind: str) -> None:
+    if not enabled:
+        return
+    COALESCED.inc(kind=kind)
+    add_value(f"{kind}_coalesced", 1)
+
+def record_token_verify(result: str) -> None:
+    if not enabled:
+        return
+    TOKEN_VERIFY.inc(result=result)
+
+def record_snapshot_read(result: str) -> None:
+    if not enabled:
+        return
+    SNAPSHOT_READS.inc(result=result)
+
+def record_rows(n: int) -> None:
+    if not enabled:
+        return
+    ROWS_RETURNED.observe(n)
+    add_value("rows", n)
+
+class TimingMiddleware:
+    """ASGI middleware: opens a Trace per HTTP request and emits Server-Timing"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not enabled:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace()
+        token = _current.set(trace)
+        t0 = time.perf_counter()
+        status = [500]
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", trace.server_timing(time.perf_counter() - t0).encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            # Route template (set on the scope by the router) keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(time.perf_counter() - t0, path=route, status=str(status[0]))
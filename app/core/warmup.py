@@ -0,0 +1,106 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Warm start. TENANT_MANIFEST points at a local JSON file listing the tenants
+# to prepare at startup:
+#   {"tenants": [{"session_id": "acme", "db_url": "postgresql://..."}, ...]}
+# (a bare list works too). Tenants are prepared WARM_CONCURRENCY at a time in
+# the background; whatever has not started within WARM_BUDGET_SECONDS is
+# skipped and connects lazily on first use, as without a manifest. GET /ready
+# reports progress and turns 200 once the run has finished or run out of time.
+# A failing tenant is reported but does not hold readiness back.
+
+def load_manifest(path: str) -> List[Dict[str, str]]:
+    with open(path) as f:
+        doc = json.load(f)
+    tenants = doc.get("tenants", []) if isinstance(doc, dict) else doc
+    out = []
+    for t in tenants:
+        if not t.get("session_id") or not t.get("db_url"):
+            raise ValueError(f"manifest entry needs session_id and db_url: {t}")
+        out.append({"session_id": t["session_id"], "db_url": t["db_url"]})
+    return out
+
+class Warmup:
+    def __init__(self, concurrency: int = 8, budget_seconds: float = 60.0):
+        self.concurrency = max(1, concurrency)
+        self.budget_seconds = budget_seconds
+        self._tenants: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, tenants: List[Dict[str, str]], prepare: Callable[[str, str], str]) -> None:
+        """
+        Prepare tenants in a background thread. prepare(session_id, db_url)
+        returns how the session was set up ("cache" or "introspected").
+        """
+        with self._lock:
+            self._tenants = {t["session_id"]: {"state": "pending"} for t in tenants}
+            self._started = time.monotonic()
+            self._finished = None
+        self._thread = threading.Thread(target=self._run, args=(tenants, prepare), name="warmup", daemon=True)
+        self._thread.start()
+
+    def _run(self, tenants: List[Dict[str, str]], prepare: Callable[[str, str], str]) -> None:
+        deadline = self._started + self.budget_seconds
+        pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="warmup")
+        futures = [pool.submit(self._prepare_one, t["session_id"], t["db_url"], prepare, deadline) for t in tenants]
+        wait(futures, timeout=self.budget_seconds)
+        # Out of budget: queued tenants are dropped, in-flight ones finish on their own
+        pool.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            for status in self._tenants.values():
+                if status["state"] == "pending":
+                    status["state"] = "skipped"
+            self._finished = time.monotonic()
+        s = self.status()
+        logger.info("warm-up finished in %.1fs: %d ready, %d failed, %d skipped, %d still warming",
+                    s["elapsed_seconds"], s["ready_tenants"], s["failed"], s["skipped"], s["warming"])
+
+    def _prepare_one(self, session_id: str, db_url: str, prepare: Callable[[str, str], str], deadline: float) -> None:
+        with self._lock:
+            if time.monotonic() >= deadline:
+                self._tenants[session_id]["state"] = "skipped"
+                return
+            self._tenants[session_id]["state"] = "warming"
+        t0 = time.perf_counter()
+        try:
+            source = prepare(session_id, db_url)
+            update = {"state": "ready", "source": source}
+        except Exception as e:
+            logger.warning("warm-up of %s failed: %s", session_id, e)
+            update = {"state": "failed", "error": str(e)}
+        update["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        with self._lock:
+            self._tenants[session_id] = update
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            states = [t["state"] for t in self._tenants.values()]
+            now = self._finished if self._finished is not None else time.monotonic()
+            return {
+                "ready": self._started is None or self._finished is not None,
+                "total": len(states),
+                "ready_tenants": states.count("ready"),
+                "failed": states.count("failed"),
+                "skipped": states.count("skipped"),
+                "warming": states.count("warming"),
+                "pending": states.count("pending"),
+                "elapsed_seconds": round(now - self._started, 3) if self._started is not None else 0.0,
+                "errors": {sid: t["error"] for sid, t in self._tenants.items() if t["state"] == "failed"},
+            }
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+warmup = Warmup(settings.warm_concurrency, settings.warm_budget_seconds)
@@ -0,0 +1,146 @@
+import json
+import sys
+import threading
+import weakref
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Optional
+
+_EMPTY = MappingProxyType({})
+
+class _Slotted(Mapping):
+    """
+    Immutable __slots__ record with read-only dict-style access, so catalog
+    consumers keep working with profile["create_fields"] / .get(...).
+    """
+    __slots__ = ()
+    _fields: tuple = ()
+
+    def __init__(self, *values):
+        for f, v in zip(self._fields, values):
+            object.__setattr__(self, f, v)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __getitem__(self, key):
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.as_dict()!r})"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {f: as_plain(getattr(self, f)) for f in self._fields}
+
+def as_plain(obj: Any) -> Any:
+    """JSON-ready dict/list view of catalog objects (plain dicts pass through)"""
+    if isinstance(obj, _Slotted):
+        return obj.as_dict()
+    if isinstance(obj, (Mapping, MappingProxyType)):
+        return {k: as_plain(v) for k, v in obj.items()}
+    if isinstance(obj, tuple):
+        return [as_plain(v) for v in obj]
+    return obj
+
+def _names(names: Optional[Iterable[str]]) -> tuple:
+    return tuple(sys.intern(n) if isinstance(n, str) else n for n in (names or ()))
+
+class Column(_Slotted):
+    __slots__ = ("name", "type", "nullable", "default", "__weakref__")
+    _fields = ("name", "type", "nullable", "default")
+
+    def __hash__(self):
+        return hash((self.name, self.type, self.nullable, repr(self.default)))
+
+class Index(_Slotted):
+    __slots__ = ("name", "column_names")
+    _fields = ("name", "column_names")
+
+class ForeignKey(_Slotted):
+    __slots__ = ("constrained_columns", "referred_schema", "referred_table", "referred_columns")
+    _fields = ("constrained_columns", "referred_schema", "referred_table", "referred_columns")
+
+class TableProfile(_Slotted):
+    __slots__ = (
+        "table", "primary_key", "columns", "indexes", "foreign_keys",
+        "create_fields", "update_fields", "filter_fields", "read_fields",
+        "deferred_fields", "value_stats", "row_estimate", "__weakref__",
+    )
+    _fields = (
+        "table", "primary_key", "columns", "indexes", "foreign_keys",
+        "create_fields", "update_fields", "filter_fields", "read_fields",
+        "deferred_fields", "value_stats", "row_estimate",
+    )
+
+    @classmethod
+    def from_dict(cls, d: Mapping) -> "TableProfile":
+        return cls(
+            sys.intern(d["table"]),
+            _names(d["primary_key"]),
+            tuple(_column(c["name"], c["type"], c["nullable"], c.get("default")) for c in d["columns"]),
+            tuple(Index(i.get("name"), _names(i.get("column_names"))) for i in d.get("indexes", ())),
+            tuple(
+                ForeignKey(_names(fk.get("constrained_columns")), fk.get("referred_schema"), fk.get("referred_table"), _names(fk.get("referred_columns")))
+                for fk in d.get("foreign_keys", ())
+            ),
+            _names(d.get("create_fields")),
+            _names(d.get("update_fields")),
+            _names(d.get("filter_fields")),
+            _names(d.get("read_fields")),
+            MappingProxyType({sys.intern(k): v for k, v in (d.get("deferred_fields") or {}).items()}),
+            MappingProxyType(dict(d.get("value_stats") or {})),
+            d.get("row_estimate"),
+        )
+
+    def with_stats(self, value_stats: Dict[str, Any], row_estimate: Optional[int]) -> "TableProfile":
+        """New profile with sampled stats; the schema parts are shared, not copied"""
+        values = [getattr(self, f) for f in self._fields]
+        values[-2:] = [MappingProxyType(dict(value_stats)), row_estimate]
+        return TableProfile(*values)
+
+class Catalog(_Slotted):
+    """
+    Exposed-schema catalog. Profiles are immutable; entries of `tables` are
+    only ever replaced whole (e.g. when stats are refreshed).
+    """
+    __slots__ = ("tables", "exposed_tables")
+    _fields = ("tables", "exposed_tables")
+
+    @classmethod
+    def from_dict(cls, d: Mapping) -> "Catalog":
+        return cls({sys.intern(t): intern_profile(p) for t, p in d["tables"].items()}, _names(d["exposed_tables"]))
+
+# Interning pools: identical columns/tables (e.g. several sessions on the same
+# database) resolve to one shared object for as long as any catalog uses it.
+_pool_lock = threading.Lock()
+_column_pool: "weakref.WeakValueDictionary[tuple, Column]" = weakref.WeakValueDictionary()
+_profile_pool: "weakref.WeakValueDictionary[str, TableProfile]" = weakref.WeakValueDictionary()
+
+def _column(name: str, type_: str, nullable: bool, default: Any) -> Column:
+    key = (name, type_, nullable, repr(default))
+    with _pool_lock:
+        col = _column_pool.get(key)
+        if col is None:
+            col = Column(sys.intern(name), sys.intern(type_), bool(nullable), default)
+            _column_pool[key] = col
+        return col
+
+def intern_profile(d: Mapping) -> TableProfile:
+    if isinstance(d, TableProfile):
+        return d
+    key = json.dumps(as_plain(d), sort_keys=True, default=str)
+    with _pool_lock:
+        profile = _profile_pool.get(key)
+    if profile is None:
+        profile = TableProfile.from_dict(d)
+        with _pool_lock:
+            profile = _profile_pool.setdefault(key, profile)
+    return profile
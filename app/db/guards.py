@@ -29,6 +29,26 @@ def clamp_limit(limit: Optional[int]) -> int:
         return DEFAULT_LIMIT
     return max(1, min(int(limit), MAX_SELECT_ROWS))
 
+# Large-object columns are deferred in reads: previews/size placeholders only,
+# full values are fetched on demand by primary key.
+DEFERRED_PREVIEW_CHARS = 120
+LARGE_TEXT_TYPES = ("TEXT", "CLOB", "JSON", "XML")
+LARGE_BINARY_TYPES = ("BLOB", "BYTEA", "BINARY", "IMAGE")
+SMALL_SIZED_TYPE_MAX = 255
+
+def large_object_kind(type_name: str) -> Optional[str]:
+    """Classify a catalog type string as 'text', 'binary' or None (not deferred)"""
+    name = type_name.upper()
+    # Explicitly short types (VARBINARY(16), TEXT(100)) are cheap to ship
+    m = re.search(r"\((\d+)\)", name)
+    if m and int(m.group(1)) <= SMALL_SIZED_TYPE_MAX:
+        return None
+    if any(t in name for t in LARGE_BINARY_TYPES):
+        return "binary"
+    if any(t in name for t in LARGE_TEXT_TYPES):
+        return "text"
+    return None
+
 def forbid_write_ops(user_message: str) -> None:
     # Lightweight safety net (real enforcement is in planner/executor)
     banned = ["delete ", "drop ", "truncate "]
@@ -38,6 +58,7 @@ def forbid_write_ops(user_message: str) -> None:
 
 # Phase 7: Write operation guardrails
 MAX_UPDATE_ROWS = 100
+MAX_BULK_ROWS = 5000
 SYSTEM_COLUMNS = {"id", "created_at", "updated_at", "created_by", "updated_by"}
 
 def validate_update_filters(filters: List[dict]) -> None:
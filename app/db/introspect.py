@@ -1,123 +1,283 @@
-from sqlalchemy import inspect, MetaData
-from sqlalchemy.engine import Engine
-from typing import Any, Dict, List, Tuple
-from app.db.guards import is_blocked_table
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import inspect, Column, ForeignKeyConstraint, MetaData, Table, text
+from sqlalchemy import types as sqltypes
+from sqlalchemy.engine import Dialect, Engine
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from app.config import settings
+from app.db.guards import is_blocked_table, large_object_kind
+from app.db.catalog import Catalog
 
-def build_catalog(engine: Engine) -> Dict[str, Any]:
+# progress(new_profiles, tables_done, tables_total): called as tables are
+# introspected, with the profiles exposed since the previous call
+ProgressFn = Callable[[Dict[str, Any], int, int], None]
+
+def build_catalog(engine: Engine, progress: Optional[ProgressFn] = None, every: int = 50, threads: Optional[int] = None) -> Catalog:
     """
     Build an "exposed schema catalog" used to ground the LLM and whitelist execution.
+    Returned as a compact, immutable Catalog (dict-style access still works).
+    With progress, reports every `every` tables (and once at the end).
+    threads > 1 (default INTROSPECT_THREADS) profiles tables concurrently; the
+    result and the progress order are the same as the sequential walk.
     """
     insp = inspect(engine)
-    table_names = insp.get_table_names()
+    table_names = [t for t in insp.get_table_names() if not is_blocked_table(t)]
+    threads = settings.introspect_threads if threads is None else threads
+
+    if threads > 1 and len(table_names) > 1 and _can_parallelize(engine):
+        profiles = _profile_parallel(engine, table_names, threads)
+    else:
+        profiles = (_profile_table(insp, t) for t in table_names)
 
     tables: Dict[str, Any] = {}
     exposed: List[str] = []
+    pending: Dict[str, Any] = {}
+
+    try:
+        for i, (t, profile) in enumerate(zip(table_names, profiles), 1):
+            if profile is not None:
+                tables[t] = profile
+                exposed.append(t)
+                pending[t] = profile
+            if progress is not None and (i % every == 0 or i == len(table_names)):
+                progress(pending, i, len(table_names))
+                pending = {}
+    finally:
+        profiles.close()
+
+    if progress is not None and not table_names:
+        progress({}, 0, 0)
+    return Catalog.from_dict({"tables": tables, "exposed_tables": exposed})
+
+def profile_tables(engine: Engine, table_names: List[str], threads: Optional[int] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Catalog entries for just these tables (None = not exposed); used for partial re-introspection"""
+    names = [t for t in table_names if not is_blocked_table(t)]
+    threads = settings.introspect_threads if threads is None else threads
+    if threads > 1 and len(names) > 1 and _can_parallelize(engine):
+        profiles = _profile_parallel(engine, names, threads)
+    else:
+        insp = inspect(engine)
+        profiles = (_profile_table(insp, t) for t in names)
+    try:
+        return dict(zip(names, profiles))
+    finally:
+        profiles.close()
+
+def _can_parallelize(engine: Engine) -> bool:
+    # These pools hand each thread its own (in-memory) database or share one
+    # connection, so per-thread connections would not see the same schema
+    return not isinstance(engine.pool, (SingletonThreadPool, StaticPool))
+
+def _profile_parallel(engine: Engine, table_names: List[str], threads: int) -> Iterator[Optional[Dict[str, Any]]]:
+    """
+    Profiles in table_names order, computed by up to `threads` workers, each
+    with its own pooled connection and Inspector (Inspectors cache per instance
+    and are not shared across threads).
+    """
+    local = threading.local()
+    conns = []
+    lock = threading.Lock()
+
+    def work(t: str) -> Optional[Dict[str, Any]]:
+        insp = getattr(local, "insp", None)
+        if insp is None:
+            conn = engine.connect()
+            with lock:
+                conns.append(conn)
+            insp = local.insp = inspect(conn)
+        return _profile_table(insp, t)
+
+    pool = ThreadPoolExecutor(max_workers=min(threads, len(table_names)), thread_name_prefix="introspect")
+    try:
+        # map() yields in submission order: a deterministic merge for free
+        yield from pool.map(work, table_names)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        for conn in conns:
+            conn.close()
+
+def _profile_table(insp, t: str) -> Optional[Dict[str, Any]]:
+    """Catalog entry for one table, or None if it is not exposed"""
+    cols = insp.get_columns(t)
+    pk = insp.get_pk_constraint(t) or {}
+    pk_cols = pk.get("constrained_columns", []) if pk else []
+
+    # Phase 2: Filter out tables without a primary key
+    if not pk_cols:
+        return None
+
+    indexes = insp.get_indexes(t) or []
+    fks = insp.get_foreign_keys(t) or []
 
-    for t in table_names:
-        if is_blocked_table(t):
+    
+    # Phase 3: Infer conversational form metadata
+    # 1. create_fields: required for INSERT (non-nullable, no default, not PK)
+    create_fields = []
+    for c in cols:
+        name = c["name"]
+        if name in pk_cols:
             continue
+        # Logic: if nullable=False and default is None, user MUST provide it.
+        # (In SQLAlchemy, default=None means no server default, verify autoincrement context though)
+        # We treat 'autoincrement' usually for PKs. 
+        if not c.get("nullable", True) and c.get("default") is None:
+            # Also exclude system columns if any passed through guards (e.g. created_at handled by DB?)
+            # For now, strict rule: if DB says not null & no default -> user must give it.
+            create_fields.append(name)
 
-        cols = insp.get_columns(t)
-        pk = insp.get_pk_constraint(t) or {}
-        pk_cols = pk.get("constrained_columns", []) if pk else []
-        
-        # Phase 2: Filter out tables without a primary key
-        if not pk_cols:
+    # 2. updateable_fields: everything except PK and audit columns
+    update_fields = []
+    audit_cols = ["created_at", "created_by", "updated_at", "updated_by"]
+    for c in cols:
+        name = c["name"]
+        if name in pk_cols or name in audit_cols:
             continue
+        update_fields.append(name)
 
-        indexes = insp.get_indexes(t) or []
-        fks = insp.get_foreign_keys(t) or []
-
-        
-        # Phase 3: Infer conversational form metadata
-        # 1. create_fields: required for INSERT (non-nullable, no default, not PK)
-        create_fields = []
-        for c in cols:
-            name = c["name"]
-            if name in pk_cols:
-                continue
-            # Logic: if nullable=False and default is None, user MUST provide it.
-            # (In SQLAlchemy, default=None means no server default, verify autoincrement context though)
-            # We treat 'autoincrement' usually for PKs. 
-            if not c.get("nullable", True) and c.get("default") is None:
-                # Also exclude system columns if any passed through guards (e.g. created_at handled by DB?)
-                # For now, strict rule: if DB says not null & no default -> user must give it.
-                create_fields.append(name)
-
-        # 2. updateable_fields: everything except PK and audit columns
-        update_fields = []
-        audit_cols = ["created_at", "created_by", "updated_at", "updated_by"]
-        for c in cols:
-            name = c["name"]
-            if name in pk_cols or name in audit_cols:
-                continue
-            update_fields.append(name)
-
-        # 3. filterable_fields: PKs + indexed columns + common descriptors
-        # Start with PKs
-        filter_candidates = set(pk_cols)
-        # Add indexed columns
-        for idx in indexes:
-            for cname in idx.get("column_names", []):
-                # sometimes column_names might be None or expressions, skip if not string
-                if isinstance(cname, str):
-                    filter_candidates.add(cname)
-        
-        # Add common business keys
-        common_keys = ["status", "type", "category", "email", "name", "date", "created_at"]
-        for c in cols:
-             name = c["name"]
-             if any(k in name.lower() for k in common_keys):
-                 filter_candidates.add(name)
-        
-        # 4. read_fields: PKs + first 5-6 interesting columns
-        # Start with PK
-        read_fields = list(pk_cols)
-        # Fill up to 8 columns total
-        for c in cols:
-            if len(read_fields) >= 8:
-                break
-            name = c["name"]
-            if name not in read_fields:
-                read_fields.append(name)
-
-
-        tables[t] = {
-            "table": t,
-            "primary_key": pk_cols,
-            "columns": [
-                {
-                    "name": c["name"],
-                    "type": str(c["type"]),
-                    "nullable": bool(c.get("nullable", True)),
-                    "default": c.get("default"),
-                }
-                for c in cols
-            ],
-            "indexes": [
-                {"name": i.get("name"), "column_names": i.get("column_names", [])}
-                for i in indexes
-            ],
-            "foreign_keys": [
-                {
-                    "constrained_columns": fk.get("constrained_columns", []),
-                    "referred_schema": fk.get("referred_schema"),
-                    "referred_table": fk.get("referred_table"),
-                    "referred_columns": fk.get("referred_columns", []),
-                }
-                for fk in fks
-            ],
-            # Phase 3 Fields
-            "create_fields": create_fields,
-            "update_fields": update_fields,
-            "filter_fields": list(filter_candidates),
-            "read_fields": read_fields,
-        }
-        exposed.append(t)
-
-    return {"tables": tables, "exposed_tables": exposed}
-
-def reflect_metadata(engine: Engine, exposed_tables: List[str]) -> MetaData:
+    # 3. filterable_fields: PKs + indexed columns + common descriptors
+    # Start with PKs
+    filter_candidates = set(pk_cols)
+    # Add indexed columns
+    for idx in indexes:
+        for cname in idx.get("column_names", []):
+            # sometimes column_names might be None or expressions, skip if not string
+            if isinstance(cname, str):
+                filter_candidates.add(cname)
+    
+    # Add common business keys
+    common_keys = ["status", "type", "category", "email", "name", "date", "created_at"]
+    for c in cols:
+         name = c["name"]
+         if any(k in name.lower() for k in common_keys):
+             filter_candidates.add(name)
+    
+    # 4. read_fields: PKs + first 5-6 interesting columns
+    # Start with PK
+    read_fields = list(pk_cols)
+    # Fill up to 8 columns total
+    for c in cols:
+        if len(read_fields) >= 8:
+            break
+        name = c["name"]
+        if name not in read_fields:
+            read_fields.append(name)
+
+    # 5. deferred_fields: large TEXT/JSON/BLOB columns, previewed in reads
+    deferred_fields = {}
+    for c in cols:
+        kind = large_object_kind(str(c["type"]))
+        if kind and c["name"] not in pk_cols:
+            deferred_fields[c["name"]] = kind
+
+    return {
+        "table": t,
+        "primary_key": pk_cols,
+        "columns": [
+            {
+                "name": c["name"],
+                "type": str(c["type"]),
+                "nullable": bool(c.get("nullable", True)),
+                "default": c.get("default"),
+            }
+            for c in cols
+        ],
+        "indexes": [
+            {"name": i.get("name"), "column_names": i.get("column_names", [])}
+            for i in indexes
+        ],
+        "foreign_keys": [
+            {
+                "constrained_columns": fk.get("constrained_columns", []),
+                "referred_schema": fk.get("referred_schema"),
+                "referred_table": fk.get("referred_table"),
+                "referred_columns": fk.get("referred_columns", []),
+            }
+            for fk in fks
+        ],
+        # Phase 3 Fields
+        "create_fields": create_fields,
+        "update_fields": update_fields,
+        "filter_fields": list(filter_candidates),
+        "read_fields": read_fields,
+        "deferred_fields": deferred_fields,
+    }
+
+def reflect_metadata(engine: Engine, exposed_tables: List[str], threads: Optional[int] = None) -> MetaData:
+    threads = settings.introspect_threads if threads is None else threads
+    threads = min(threads, len(exposed_tables))
+    if threads <= 1 or not _can_parallelize(engine):
+        md = MetaData()
+        md.reflect(bind=engine, only=exposed_tables)
+        return md
+
+    # Contiguous slices reflected concurrently, FKs left unresolved, then
+    # copied into one MetaData in table order
+    size = -(-len(exposed_tables) // threads)
+    slices = [exposed_tables[i:i + size] for i in range(0, len(exposed_tables), size)]
+
+    def reflect_slice(names: List[str]) -> MetaData:
+        part = MetaData()
+        with engine.connect() as conn:
+            part.reflect(bind=conn, only=names, resolve_fks=False)
+        return part
+
+    md = MetaData()
+    with ThreadPoolExecutor(max_workers=len(slices), thread_name_prefix="introspect") as pool:
+        for names, part in zip(slices, pool.map(reflect_slice, slices)):
+            for name in names:
+                part.tables[name].to_metadata(md)
+
+    # Tables referenced from exposed ones but not exposed themselves, which
+    # the sequential reflect pulls in while resolving FKs
+    referred = {fk.target_fullname.rsplit(".", 1)[0] for t in md.tables.values() for fk in t.foreign_keys}
+    missing = sorted(referred - set(md.tables))
+    if missing:
+        md.reflect(bind=engine, only=missing)
+    return md
+
+_TYPE_SPEC = re.compile(r"^\s*([A-Za-z_][\w ]*?)\s*(?:\((.*)\))?\s*(?:COLLATE .*)?$", re.S)
+
+def _type_from_string(spec: str, dialect: Dialect) -> sqltypes.TypeEngine:
+    """A column type from its catalog string ("VARCHAR(20)", "NUMERIC(10, 2)"); NullType if unknown"""
+    m = _TYPE_SPEC.match(spec)
+    if not m:
+        return sqltypes.NullType()
+    name, args = m.group(1).strip(), m.group(2)
+    names = getattr(dialect, "ischema_names", {})
+    cls = (names.get(name) or names.get(name.lower()) or names.get(name.upper())
+           or getattr(sqltypes, name.upper().replace(" ", "_"), None))
+    if not isinstance(cls, type) or not issubclass(cls, sqltypes.TypeEngine):
+        return sqltypes.NullType()
+    params = [a.strip().strip("'\"") for a in args.split(",")] if args else []
+    try:
+        return cls(*[int(a) if a.isdigit() else a for a in params])
+    except Exception:
+        try:
+            return cls()
+        except Exception:
+            return sqltypes.NullType()
+
+def metadata_from_catalog(catalog: Catalog, dialect: Dialect) -> MetaData:
+    """
+    MetaData for the exposed tables, built from the catalog alone (no database
+    round trip). Foreign keys are kept between exposed tables only.
+    """
     md = MetaData()
-    md.reflect(bind=engine, only=exposed_tables)
+    tables = catalog["tables"]
+    for name in catalog["exposed_tables"]:
+        profile = tables[name]
+        pk = set(profile["primary_key"])
+        cols = [
+            Column(c["name"], _type_from_string(c["type"], dialect), primary_key=c["name"] in pk, nullable=c["nullable"],
+                   server_default=text(str(c["default"])) if c["default"] is not None else None)
+            for c in profile["columns"]
+        ]
+        fks = [
+            ForeignKeyConstraint(list(fk["constrained_columns"]), [f"{fk['referred_table']}.{r}" for r in fk["referred_columns"]])
+            for fk in profile["foreign_keys"]
+            if fk["referred_table"] in tables and not fk["referred_schema"]
+        ]
+        Table(name, md, *cols, *fks)
     return md
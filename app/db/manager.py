@@ -1,5 +1,7 @@
+from typing import List, Optional
 from sqlalchemy import create_engine
 from sqlalchemy.engine import Engine
+from app.db.replicas import replica_router
 
 class DBManager:
     """
@@ -9,13 +11,31 @@ class DBManager:
     def __init__(self):
         self._engines: dict[str, Engine] = {}
 
-    def connect(self, session_id: str, db_url: str) -> Engine:
+    def connect(self, session_id: str, db_url: str, replica_urls: Optional[List[str]] = None) -> Engine:
         engine = create_engine(db_url, pool_pre_ping=True, future=True)
         with engine.connect() as conn:
             conn.exec_driver_sql("SELECT 1")
+        # Replicas are optional: one that is down now is skipped until it answers
+        replica_router.register(engine, replica_urls or [])
         self._engines[session_id] = engine
         return engine
 
+    def attach(self, session_id: str, db_url: str, replica_urls: Optional[List[str]] = None) -> Engine:
+        """
+        Recreate the engine for a session connected by another worker.
+        No connection test: the URL already passed one, and pool_pre_ping covers staleness.
+        """
+        engine = create_engine(db_url, pool_pre_ping=True, future=True)
+        replica_router.register(engine, replica_urls or [])
+        self._engines[session_id] = engine
+        return engine
+
+    def drop(self, session_id: str) -> None:
+        """Forget a session's engine and close its pooled connections"""
+        engine = self._engines.pop(session_id, None)
+        if engine is not None:
+            engine.dispose()
+
     def get_engine(self, session_id: str) -> Engine:
         if session_id not in self._engines:
             raise RuntimeError("Not connected. Call /connect first.")
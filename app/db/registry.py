@@ -0,0 +1,107 @@
+import base64
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from sqlalchemy.engine import make_url
+from app.config import settings
+from app.db.catalog import Catalog, as_plain
+from app.state_store import registry_store
+
+def url_ref(db_url: str) -> str:
+    """The URL with its password masked: names the database without granting access"""
+    return make_url(db_url).render_as_string(hide_password=True)
+
+def _cipher(secret: str):
+    if not secret:
+        return None
+    try:
+        from cryptography.fernet import Fernet
+    except ImportError:
+        raise RuntimeError("REGISTRY_SECRET needs the 'cryptography' package")
+    return Fernet(base64.urlsafe_b64encode(hashlib.sha256(secret.encode()).digest()))
+
+class SessionRegistry:
+    """
+    Shared record of connected sessions in the registry store, so any
+    worker process can serve any session. Each entry holds the catalog
+    snapshot, from which another worker rebuilds MetaData without re-running
+    introspection, and a password-masked URL reference.
+
+    Credentials never reach the store in the clear: with a secret (REGISTRY_SECRET)
+    the DB and replica URLs are stored encrypted, and workers sharing the
+    secret can attach the session. Without one, a worker only finds the URL
+    locally (the tenant manifest); other sessions need a /connect on that worker.
+
+    Entries expire after the store's idle TTL; touch() keeps the entries of
+    sessions served from per-process caches alive, and tells a worker when an
+    entry is gone so it can drop the session too.
+    """
+    def __init__(self, store=None, secret: str = "", touch_interval: Optional[float] = None):
+        self.store = store if store is not None else registry_store
+        self._cipher = _cipher(secret)
+        if touch_interval is None:
+            touch_interval = settings.state_ttl_seconds / 4 if settings.state_ttl_seconds > 0 else 0
+        self.touch_interval = touch_interval
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"session:{session_id}"
+
+    def publish(self, session_id: str, db_url: str, catalog: Dict[str, Any], replica_urls: Optional[List[str]] = None) -> None:
+        urls = None
+        if self._cipher is not None:
+            plain = json.dumps({"db_url": db_url, "replica_urls": list(replica_urls or [])})
+            urls = self._cipher.encrypt(plain.encode()).decode("ascii")
+        self.store.set(self._key(session_id), {"url_ref": url_ref(db_url), "urls": urls, "catalog": as_plain(catalog)})
+        with self._lock:
+            self._touched[session_id] = time.monotonic()
+
+    def update_catalog(self, session_id: str, catalog: Dict[str, Any]) -> None:
+        """Swap in a new catalog version, keeping the stored URLs as they are"""
+        if self.store.get(self._key(session_id)):
+            self.store.update(self._key(session_id), {"catalog": as_plain(catalog)})
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        {"url_ref", "db_url", "replica_urls", "catalog": Catalog} or None if
+        unknown; db_url is None when this worker can't decrypt the URLs.
+        """
+        entry = self.store.get(self._key(session_id))
+        if not entry:
+            return None
+        with self._lock:
+            self._touched[session_id] = time.monotonic()  # the read refreshed the TTL
+        out = {"url_ref": entry["url_ref"], "db_url": None, "replica_urls": [], "catalog": Catalog.from_dict(entry["catalog"])}
+        if entry.get("urls") and self._cipher is not None:
+            from cryptography.fernet import InvalidToken
+            try:
+                out.update(json.loads(self._cipher.decrypt(entry["urls"].encode())))
+            except InvalidToken:
+                pass
+        return out
+
+    def touch(self, session_id: str) -> bool:
+        """
+        Refresh the entry's idle TTL, at most once per touch_interval per
+        session. False if the entry is gone (expired, evicted or forgotten
+        through another worker); between refreshes it is assumed to be there.
+        """
+        now = time.monotonic()
+        with self._lock:
+            # Only entries this worker published or loaded are tracked
+            last = self._touched.get(session_id)
+            if self.touch_interval <= 0 or last is None or now - last < self.touch_interval:
+                return True
+            self._touched[session_id] = now
+        return self.store.touch(self._key(session_id))
+
+    def forget(self, session_id: str) -> None:
+        with self._lock:
+            self._touched.pop(session_id, None)
+        self.store.delete(self._key(session_id))
+
+session_registry = SessionRegistry(secret=settings.registry_secret)
@@ -0,0 +1,163 @@
+import itertools
+import logging
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Read replicas. /connect may pass replica_urls; reads (run_read, previews,
+# /value) then go to a healthy replica and writes stay on the primary. After
+# a write through a primary engine (one engine per session), that session's
+# reads stay on the primary for READ_YOUR_WRITES_SECONDS so it sees its own
+# changes despite replica lag. Replicas are pinged every REPLICA_HEALTH_SECONDS
+# by a background thread, never inside a request: a new replica is pending
+# (reads stay on the primary) until its first ping answers. A replica that fails
+# a ping or a read is skipped until it answers again, and the failed read is
+# retried on the primary. With no healthy replica, reads go to the primary.
+# With REPLICA_HEALTH_SECONDS <= 0 there is no checker: replicas start healthy
+# and a failed read takes one out for good.
+#
+# REPLICA_POLICY: round_robin (default) or least_latency (EWMA of ping and read times)
+
+class Replica:
+    __slots__ = ("engine", "healthy", "latency", "error")
+
+    def __init__(self, engine: Engine, healthy: Optional[bool] = None):
+        self.engine = engine
+        self.healthy = healthy  # None: not probed yet
+        self.latency: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def observe(self, seconds: float) -> None:
+        self.latency = seconds if self.latency is None else 0.8 * self.latency + 0.2 * seconds
+
+class ReplicaSet:
+    def __init__(self, replicas: List[Engine], policy: str = "round_robin", healthy: Optional[bool] = None):
+        if policy not in ("round_robin", "least_latency"):
+            raise ValueError(f"Unknown replica policy: {policy}")
+        self.replicas = [Replica(e, healthy) for e in replicas]
+        self.policy = policy
+        self._rr = itertools.count()
+        self.last_write = 0.0
+        self.checked = threading.Event()  # set after the first health check
+
+    def pick(self) -> Optional[Replica]:
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            return None
+        if self.policy == "least_latency":
+            return min(healthy, key=lambda r: r.latency if r.latency is not None else 0.0)
+        return healthy[next(self._rr) % len(healthy)]
+
+    def mark_down(self, replica: Replica, error: Exception) -> None:
+        if replica.healthy is not False:
+            logger.warning("replica %s marked down: %s", replica.engine.url, error)
+        replica.healthy = False
+        replica.error = str(error)
+
+    def check(self) -> None:
+        for r in self.replicas:
+            t0 = time.perf_counter()
+            try:
+                with r.engine.connect() as conn:
+                    conn.exec_driver_sql("SELECT 1")
+            except Exception as e:
+                self.mark_down(r, e)
+                continue
+            r.observe(time.perf_counter() - t0)
+            if r.healthy is False:
+                logger.info("replica %s is back", r.engine.url)
+            r.healthy, r.error = True, None
+        self.checked.set()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [
+            {"url": r.engine.url.render_as_string(hide_password=True), "healthy": r.healthy,
+             "latency_ms": round(r.latency * 1000, 3) if r.latency is not None else None, "error": r.error}
+            for r in self.replicas
+        ]
+
+class ReplicaRouter:
+    """Replica sets keyed by primary engine, plus the background health checker"""
+    def __init__(self, policy: str = "round_robin", health_interval: float = 10.0, read_your_writes: float = 5.0):
+        self.policy = policy
+        self.health_interval = health_interval
+        self.read_your_writes = read_your_writes
+        self._sets: "weakref.WeakKeyDictionary[Engine, ReplicaSet]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, primary: Engine, replica_urls: List[str]) -> Optional[ReplicaSet]:
+        """
+        Attach replicas to a primary engine. Runs inside /connect and on a
+        cold /chat, so nothing is probed here: the health thread is woken to
+        ping the new replicas, and reads use the primary until they answer.
+        """
+        if not replica_urls:
+            return None
+        checker = self.health_interval > 0
+        rs = ReplicaSet([create_engine(u, pool_pre_ping=True, future=True) for u in replica_urls], self.policy,
+                        healthy=None if checker else True)
+        with self._lock:
+            self._sets[primary] = rs
+            if checker and self._thread is None:
+                # Its first pass includes this set
+                self._thread = threading.Thread(target=self._run, name="replica-health", daemon=True)
+                self._thread.start()
+            elif checker:
+                self._wake.set()
+        return rs
+
+    def replicas(self, primary: Engine) -> Optional[ReplicaSet]:
+        return self._sets.get(primary)
+
+    def note_write(self, primary: Engine) -> None:
+        rs = self._sets.get(primary)
+        if rs is not None:
+            rs.last_write = time.monotonic()
+
+    def in_window(self, primary: Engine) -> bool:
+        """True while primary's reads stay on it after a write through it (read-your-writes)"""
+        rs = self._sets.get(primary)
+        return rs is not None and time.monotonic() - rs.last_write < self.read_your_writes
+
+    def read(self, primary: Engine, fn: Callable[[Engine], T]) -> T:
+        """
+        fn(engine) on a replica when one is usable, else on the primary. A
+        replica that fails with a connection-level error is marked down and
+        the read is retried on the primary.
+        """
+        rs = self._sets.get(primary)
+        if rs is None or self.in_window(primary):
+            return fn(primary)
+        replica = rs.pick()
+        if replica is None:
+            return fn(primary)
+        t0 = time.perf_counter()
+        try:
+            out = fn(replica.engine)
+        except OperationalError as e:
+            rs.mark_down(replica, e)
+            return fn(primary)
+        replica.observe(time.perf_counter() - t0)
+        return out
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                sets = list(self._sets.values())
+            for rs in sets:
+                rs.check()
+            self._wake.wait(self.health_interval)
+            self._wake.clear()
+
+replica_router = ReplicaRouter(settings.replica_policy, settings.replica_health_seconds, settings.read_your_writes_seconds)
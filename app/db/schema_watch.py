@@ -0,0 +1,176 @@
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set
+from sqlalchemy import MetaData, text
+from sqlalchemy.engine import Connection, Engine
+from app.config import settings
+from app.db.catalog import Catalog, intern_profile
+from app.db.introspect import profile_tables
+
+logger = logging.getLogger(__name__)
+
+# Schema change watcher. One entry per database URL, shared by every session
+# connected to it. Every SCHEMA_WATCH_SECONDS a background thread reads a
+# per-table DDL fingerprint (one catalog query) and, when it differs from the
+# last one, re-introspects only the added/altered tables and builds a new
+# Catalog + MetaData version. Unchanged profiles and tables are carried over.
+# Nothing is mutated in place: requests already holding the old catalog and
+# metadata finish on them, and listeners swap the new version in for later ones.
+
+_FINGERPRINT_SQL = {
+    # Table and index DDL as stored by SQLite
+    "sqlite": "SELECT tbl_name, group_concat(sql, ';') FROM "
+              "(SELECT tbl_name, sql FROM sqlite_master WHERE type IN ('table', 'index') AND sql IS NOT NULL ORDER BY name) "
+              "GROUP BY tbl_name",
+    "postgresql": "SELECT c.relname, md5(string_agg(a.attname || ':' || format_type(a.atttypid, a.atttypmod) || ':' || a.attnotnull, ',' ORDER BY a.attnum) "
+                  "|| coalesce((SELECT string_agg(i.indexrelid::regclass::text, ',' ORDER BY i.indexrelid) FROM pg_index i WHERE i.indrelid = c.oid), '')) "
+                  "FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+                  "JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped "
+                  "WHERE n.nspname = current_schema() AND c.relkind IN ('r', 'p') GROUP BY c.oid, c.relname",
+    "mysql": "SELECT TABLE_NAME, MD5(GROUP_CONCAT(COLUMN_NAME, ':', COLUMN_TYPE, ':', IS_NULLABLE, ':', COLUMN_KEY ORDER BY ORDINAL_POSITION)) "
+             "FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() GROUP BY TABLE_NAME",
+}
+_FINGERPRINT_SQL["mariadb"] = _FINGERPRINT_SQL["mysql"]
+
+def ddl_fingerprint(conn: Connection) -> Optional[Dict[str, str]]:
+    """table -> digest of its DDL; None if the dialect is not supported"""
+    sql = _FINGERPRINT_SQL.get(conn.dialect.name)
+    if sql is None:
+        return None
+    return {name: hashlib.sha1(str(ddl).encode()).hexdigest() for name, ddl in conn.execute(text(sql))}
+
+# listener(session_ids, catalog, metadata, changed_tables)
+Listener = Callable[[List[str], Catalog, MetaData, Set[str]], None]
+
+class SchemaWatcher:
+    """
+    interval <= 0 disables background polling (check() can still be called directly).
+    """
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._targets: Dict[str, Dict[str, Any]] = {}
+        self._listeners: List[Listener] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_listener(self, fn: Listener) -> None:
+        self._listeners.append(fn)
+
+    def watch(self, session_id: str, engine: Engine, catalog: Catalog, metadata: MetaData) -> None:
+        if self.interval <= 0:
+            return
+        key = engine.url.render_as_string(hide_password=False)
+        with self._lock:
+            # A reconnected session leaves its old database; nobody left, no more polling
+            for other in [k for k in self._targets if k != key]:
+                sessions = self._targets[other]["sessions"]
+                sessions.discard(session_id)
+                if not sessions:
+                    del self._targets[other]
+            target = self._targets.get(key)
+            if target is not None:
+                target["sessions"].add(session_id)
+                return
+        with engine.connect() as conn:
+            fingerprint = ddl_fingerprint(conn)
+        if fingerprint is None:
+            return
+        with self._lock:
+            target = self._targets.setdefault(key, {
+                "engine": engine, "catalog": catalog, "metadata": metadata,
+                "fingerprint": fingerprint, "version": 1, "sessions": set(),
+            })
+            target["sessions"].add(session_id)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="schema-watcher", daemon=True)
+                self._thread.start()
+
+    def unwatch(self, session_id: str) -> None:
+        with self._lock:
+            for key in list(self._targets):
+                sessions = self._targets[key]["sessions"]
+                sessions.discard(session_id)
+                if not sessions:
+                    del self._targets[key]
+
+    def version(self, engine: Engine) -> int:
+        target = self._targets.get(engine.url.render_as_string(hide_password=False))
+        return target["version"] if target else 0
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(timeout=self.interval)
+            self._wake.clear()
+            self.check()
+
+    def check(self) -> int:
+        """Poll every watched database once; returns how many changed"""
+        with self._lock:
+            targets = list(self._targets.values())
+        changed = 0
+        for target in targets:
+            try:
+                changed += self._check(target)
+            except Exception as e:
+                # Keep the old fingerprint so the change is retried next poll
+                logger.warning("schema check failed for %s: %s", target["engine"].url, e)
+        return changed
+
+    def _check(self, target: Dict[str, Any]) -> int:
+        engine = target["engine"]
+        with engine.connect() as conn:
+            fingerprint = ddl_fingerprint(conn)
+        old = target["fingerprint"]
+        if fingerprint == old:
+            return 0
+        touched = {t for t in fingerprint if old.get(t) != fingerprint[t]} | (set(old) - set(fingerprint))
+
+        catalog, metadata = target["catalog"], target["metadata"]
+        profiles = profile_tables(engine, sorted(t for t in touched if t in fingerprint))
+        relevant = {t for t in touched if t in catalog["tables"] or t in metadata.tables or profiles.get(t)}
+        if relevant:
+            target["catalog"], target["metadata"] = self._rebuild(engine, catalog, metadata, relevant, profiles, set(fingerprint))
+            target["version"] += 1
+        target["fingerprint"] = fingerprint
+        if not relevant:
+            return 0
+
+        logger.info("schema change in %s: %s (catalog version %d)", engine.url, sorted(relevant), target["version"])
+        with self._lock:
+            sessions = sorted(target["sessions"])
+        for fn in self._listeners:
+            try:
+                fn(sessions, target["catalog"], target["metadata"], relevant)
+            except Exception as e:
+                logger.warning("schema change listener failed: %s", e)
+        return 1
+
+    @staticmethod
+    def _rebuild(engine: Engine, catalog: Catalog, metadata: MetaData, touched: Set[str],
+                 profiles: Dict[str, Optional[Dict[str, Any]]], existing: Set[str]):
+        tables = {t: p for t, p in catalog["tables"].items() if t not in touched}
+        exposed = [t for t in catalog["exposed_tables"] if t not in touched or profiles.get(t)]
+        for t in sorted(touched):
+            if profiles.get(t):
+                tables[t] = intern_profile(profiles[t])
+                if t not in exposed:
+                    exposed.append(t)
+
+        # Unchanged tables are copied, changed ones reflected afresh
+        md = MetaData()
+        for name, table in metadata.tables.items():
+            if name not in touched:
+                table.to_metadata(md)
+        refresh = [t for t in exposed if t in touched]
+        if refresh:
+            md.reflect(bind=engine, only=refresh)
+        # FK targets that are not exposed, as reflect_metadata pulls them in
+        referred = {fk.target_fullname.rsplit(".", 1)[0] for t in md.tables.values() for fk in t.foreign_keys}
+        missing = sorted((referred - set(md.tables)) & existing)
+        if missing:
+            md.reflect(bind=engine, only=missing)
+        return Catalog(tables, tuple(exposed)), md
+
+schema_watcher = SchemaWatcher(settings.schema_watch_seconds)
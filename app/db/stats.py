@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from sqlalchemy import MetaData, Table, select, text
+from sqlalchemy.engine import Connection, Engine
+from app.config import settings
+from app.core.admission import db_slot
+from app.db.replicas import replica_router
+
+logger = logging.getLogger(__name__)
+
+# Sampling is always bounded: at most STATS_SAMPLE_ROWS rows are read per column,
+# never a full table scan. Columns with more distinct values than
+# STATS_MAX_VALUES (or long values) are treated as high-cardinality and skipped.
+STATS_SAMPLE_ROWS = 10000
+STATS_MAX_VALUES = 20
+STATS_MAX_VALUE_LEN = 64
+LOW_CARDINALITY_TYPES = ("CHAR", "TEXT", "ENUM", "BOOL")
+
+def stats_candidates(profile: Dict[str, Any]) -> List[str]:
+    """filter_fields that could plausibly hold a small set of values (status, type, ...)"""
+    types = {c["name"]: c["type"].upper() for c in profile["columns"]}
+    binary = {c for c, k in (profile.get("deferred_fields") or {}).items() if k == "binary"}
+    return [
+        f for f in sorted(profile["filter_fields"])
+        if f not in profile["primary_key"]
+        and f not in binary
+        and any(t in types.get(f, "") for t in LOW_CARDINALITY_TYPES)
+    ]
+
+def sample_column(conn: Connection, table: Table, column: str) -> Optional[Dict[str, Any]]:
+    sample = select(table.c[column].label("v")).limit(STATS_SAMPLE_ROWS).subquery()
+    stmt = select(sample.c.v).where(sample.c.v.isnot(None)).distinct().limit(STATS_MAX_VALUES + 1)
+    values = [r[0] for r in conn.execute(stmt)]
+    if len(values) > STATS_MAX_VALUES or any(len(str(v)) > STATS_MAX_VALUE_LEN for v in values):
+        return None
+    return {"values": sorted(values, key=str), "distinct": len(values)}
+
+def estimate_rows(conn: Connection, table_name: str) -> Optional[int]:
+    """Row-count estimate from dialect statistics (no COUNT(*))"""
+    dialect = conn.dialect.name
+    try:
+        if dialect == "postgresql":
+            n = conn.execute(text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:t)"), {"t": table_name}).scalar()
+        elif dialect in ("mysql", "mariadb"):
+            n = conn.execute(
+                text("SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t"),
+                {"t": table_name},
+            ).scalar()
+        elif dialect == "sqlite":
+            # Only populated after ANALYZE; the first field of stat is the row count
+            has_stat = conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").scalar()
+            stat = conn.execute(text("SELECT stat FROM sqlite_stat1 WHERE tbl = :t LIMIT 1"), {"t": table_name}).scalar() if has_stat else None
+            n = int(stat.split()[0]) if stat else None
+        else:
+            return None
+    except Exception as e:
+        logger.debug("row estimate failed for %s: %s", table_name, e)
+        return None
+    # Postgres reports -1 for never-analyzed tables
+    return int(n) if n is not None and n >= 0 else None
+
+def collect_stats(engine: Engine, metadata: MetaData, catalog: Dict[str, Any]) -> None:
+    """
+    Sample value stats for every exposed table and store them on the catalog
+    entries ("value_stats", "row_estimate"). Each entry is swapped whole, so
+    concurrent readers see either the old or the new stats. Samples are reads
+    like any other: they wait for a db_slot and go to a replica when one is usable.
+    """
+    for t, profile in list(catalog["tables"].items()):
+        if t not in metadata.tables:
+            continue
+        table = metadata.tables[t]
+
+        def run(target: Engine):
+            # One table per slot: sampling never holds the gate for a whole catalog
+            with db_slot(target), target.connect() as conn:
+                value_stats = {}
+                for col in stats_candidates(profile):
+                    if col in table.c:
+                        s = sample_column(conn, table, col)
+                        if s:
+                            value_stats[col] = s
+                return value_stats, estimate_rows(conn, t)
+
+        try:
+            value_stats, row_estimate = replica_router.read(engine, run)
+        except Exception as e:
+            logger.warning("stats sampling failed for %s: %s", t, e)
+            continue
+        catalog["tables"][t] = profile.with_stats(value_stats, row_estimate)
+
+class StatsSampler:
+    """
+    Background thread that refreshes value stats for connected catalogs.
+    interval <= 0 disables background refresh (collect_stats can still be called directly).
+    """
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._targets: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, key: str, engine: Engine, metadata: MetaData, catalog: Dict[str, Any]) -> None:
+        if self.interval <= 0:
+            return
+        with self._lock:
+            self._targets[key] = {"engine": engine, "metadata": metadata, "catalog": catalog, "due": 0.0}
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stats-sampler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def unwatch(self, key: str) -> None:
+        with self._lock:
+            self._targets.pop(key, None)
+
+    def _run(self) -> None:
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                due = [(k, t) for k, t in self._targets.items() if t["due"] <= now]
+            for key, t in due:
+                collect_stats(t["engine"], t["metadata"], t["catalog"])
+                t["due"] = time.monotonic() + self.interval
+            self._wake.wait(timeout=min(self.interval, 60))
+            self._wake.clear()
+
+stats_sampler = StatsSampler(settings.stats_refresh_seconds)
@@ -1,3 +1,20 @@
+from app.db.catalog import as_plain
+
+def profile_block(entity_profile: dict) -> str:
+    """
+    Table profile for the prompt. Sampled value stats are pulled out of the
+    profile and rendered compactly so filter values match the data exactly.
+    """
+    profile = {k: v for k, v in as_plain(entity_profile).items() if k not in ("value_stats", "row_estimate")}
+    out = f"TABLE PROFILE:\n{profile}"
+    if entity_profile.get("row_estimate") is not None:
+        out += f"\n\nAPPROX ROWS: {entity_profile['row_estimate']}"
+    stats = entity_profile.get("value_stats") or {}
+    if stats:
+        lines = [f"- {col}: {', '.join(repr(v) for v in s['values'])}" for col, s in stats.items()]
+        out += "\n\nKNOWN VALUES (use these exact spellings/case in filters):\n" + "\n".join(lines)
+    return out
+
 def detect_intent_prompt(exposed_tables: list[str]) -> str:
     return f"""
 You are an admin database assistant for a transactional application.
@@ -25,8 +42,7 @@ RULES:
 - Filters must use existing columns.
 - If you cannot confidently decide entity or required filters, return an empty filters list.
 
-TABLE PROFILE:
-{entity_profile}
+{profile_block(entity_profile)}
 
 Return JSON ONLY:
 {{
@@ -50,8 +66,7 @@ RULES:
 - If a required column is missing, do NOT invent data unless it's a timestamp (use "now" or ISO) or obvious status default.
 - If you cannot extract sufficient fields, output what you can.
 
-TABLE PROFILE:
-{entity_profile}
+{profile_block(entity_profile)}
 
 Return JSON ONLY:
 {{
@@ -70,8 +85,7 @@ RULES:
 - UPDATES WITHOUT FILTERS ARE DANGEROUS. Always try to find a filter (e.g. ID, email).
 - Use only columns that exist in the table profile.
 
-TABLE PROFILE:
-{entity_profile}
+{profile_block(entity_profile)}
 
 Return JSON ONLY:
 {{
@@ -1,28 +1,48 @@
 import json
+import re
 from pydantic import BaseModel, ValidationError
 from app.config import settings
 from app.llm.client import get_client
+from app.core.tracing import stage, record_llm_usage, record_llm_retry
+from app.core.admission import llm_gate
+from app.core.singleflight import llm_flight
+from app.core.capture import capture_llm
 
 def call_llm_json(model: str, system: str, user: str) -> dict:
     """
     Calls LLM and asks for JSON object output.
     Uses Chat Completions API with response_format json_object.
+    Identical concurrent prompts share one call (see app/core/singleflight.py).
     """
-    client = get_client()
-    resp = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": system},
-            {"role": "user", "content": user},
-        ],
-        response_format={"type": "json_object"},
-    )
-    txt = resp.choices[0].message.content
+    key = (model, _normalize(system), _normalize(user))
+    txt = llm_flight.do(key, lambda: _complete(model, system, user))
+    capture_llm(system, user, txt)
     return json.loads(txt)
 
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+def _complete(model: str, system: str, user: str) -> str:
+    client = get_client()
+    with llm_gate.slot(), stage("llm"):
+        resp = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": user},
+            ],
+            response_format={"type": "json_object"},
+        )
+    usage = getattr(resp, "usage", None)
+    if usage is not None:
+        record_llm_usage(usage.prompt_tokens, usage.completion_tokens)
+    return resp.choices[0].message.content
+
 def parse_with_retry(model: str, system: str, user: str, schema: type[BaseModel], retries: int = 2) -> BaseModel:
     last_err = None
     for i in range(retries + 1):
+        if i:
+            record_llm_retry()
         data = call_llm_json(model=model, system=system, user=user)
         try:
             return schema(**data)
@@ -1,8 +1,27 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.api.routes import router
+from app.api.routes import router, warm_session
+from app.core.tracing import TimingMiddleware
+from app.core.audit import audit_log
+from app.core.capture import workload_capture
+from app.core.warmup import warmup, load_manifest
+from app.config import settings
 
-app = FastAPI(title="AI DB Agent - Phase 1 (Read Only)")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pre-connect manifest tenants in the background; GET /ready tracks progress
+    if settings.tenant_manifest:
+        warmup.start(load_manifest(settings.tenant_manifest), warm_session)
+    yield
+    # Flush queued audit/capture events before the process exits
+    if audit_log is not None:
+        audit_log.close()
+    if workload_capture is not None:
+        workload_capture.close()
+
+app = FastAPI(title="AI DB Agent - Phase 1 (Read Only)", lifespan=lifespan)
+app.add_middleware(TimingMiddleware)
 app.include_router(router)
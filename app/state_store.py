@@ -1,38 +1,310 @@
 import json
-from typing import Any, Dict, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 from app.config import settings
 
-class InMemoryStateStore:
+class _Shard:
+    __slots__ = ("lock", "data", "bytes", "counters")
+
     def __init__(self):
-        self._store: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        # key -> (serialized value, last access); order = LRU (oldest first)
+        self.data: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self.bytes = 0
+        self.counters = {"hits": 0, "misses": 0, "evicted_lru": 0, "expired": 0}
+
+class InMemoryStateStore:
+    """
+    Process-local store, sharded with one lock per shard (lock striping).
+    Values are kept as serialized JSON bytes. Bounded by max_entries and/or
+    max_bytes (LRU eviction) and idle_ttl seconds since last access; 0 = unbounded.
+    """
+    def __init__(self, shards: int = 16, max_entries: int = 0, max_bytes: int = 0, idle_ttl: float = 0):
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        n = len(self._shards)
+        # Budgets are enforced per shard so eviction never needs a global lock
+        self._max_entries = -(-max_entries // n) if max_entries > 0 else 0
+        self._max_bytes = -(-max_bytes // n) if max_bytes > 0 else 0
+        self._idle_ttl = idle_ttl
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    @staticmethod
+    def _encode(value: Dict[str, Any]) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    def _expired(self, last: float, now: float) -> bool:
+        return self._idle_ttl > 0 and now - last > self._idle_ttl
+
+    def _read(self, sh: _Shard, key: str, now: float) -> Optional[bytes]:
+        # Caller holds sh.lock
+        entry = sh.data.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry[1], now):
+            self._drop(sh, key)
+            sh.counters["expired"] += 1
+            return None
+        return entry[0]
+
+    def _write(self, sh: _Shard, key: str, raw: bytes, now: float) -> None:
+        # Caller holds sh.lock
+        self._drop(sh, key)
+        sh.data[key] = (raw, now)
+        sh.bytes += len(raw)
+        # Idle entries sit at the LRU front, so expiry is swept from there too
+        while sh.data:
+            oldest, (oraw, olast) = next(iter(sh.data.items()))
+            if oldest == key:
+                break
+            if self._expired(olast, now):
+                sh.counters["expired"] += 1
+            elif (self._max_entries and len(sh.data) > self._max_entries) or (self._max_bytes and sh.bytes > self._max_bytes):
+                sh.counters["evicted_lru"] += 1
+            else:
+                break
+            self._drop(sh, oldest)
+
+    @staticmethod
+    def _drop(sh: _Shard, key: str) -> None:
+        entry = sh.data.pop(key, None)
+        if entry is not None:
+            sh.bytes -= len(entry[0])
 
     def get(self, key: str) -> Optional[Dict[str, Any]]:
-        return self._store.get(key)
+        sh = self._shard(key)
+        now = time.monotonic()
+        with sh.lock:
+            raw = self._read(sh, key, now)
+            if raw is None:
+                sh.counters["misses"] += 1
+                return None
+            sh.data[key] = (raw, now)
+            sh.data.move_to_end(key)
+            sh.counters["hits"] += 1
+        return json.loads(raw)
 
     def set(self, key: str, value: Dict[str, Any]) -> None:
-        self._store[key] = value
+        raw = self._encode(value)
+        sh = self._shard(key)
+        with sh.lock:
+            self._write(sh, key, raw, time.monotonic())
+
+    def update(self, key: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge fields into the stored value and return the merged result"""
+        sh = self._shard(key)
+        now = time.monotonic()
+        with sh.lock:
+            raw = self._read(sh, key, now)
+            merged = json.loads(raw) if raw else {}
+            merged.update(fields)
+            self._write(sh, key, self._encode(merged), now)
+        return merged
+
+    def commit(self, key: str, expected_version: int, fields: Dict[str, Any], replace: bool = False) -> bool:
+        """Write fields only if the stored "version" still equals expected_version"""
+        sh = self._shard(key)
+        now = time.monotonic()
+        with sh.lock:
+            raw = self._read(sh, key, now)
+            current = json.loads(raw) if raw else {}
+            if current.get("version", 0) != expected_version:
+                return False
+            merged = {} if replace else current
+            merged.update(fields)
+            self._write(sh, key, self._encode(merged), now)
+            return True
+
+    def touch(self, key: str) -> bool:
+        """Mark key as just used (idle TTL and LRU position) without reading it; False if it is gone"""
+        sh = self._shard(key)
+        now = time.monotonic()
+        with sh.lock:
+            raw = self._read(sh, key, now)
+            if raw is None:
+                return False
+            sh.data[key] = (raw, now)
+            sh.data.move_to_end(key)
+            return True
 
     def delete(self, key: str) -> None:
-        self._store.pop(key, None)
+        sh = self._shard(key)
+        with sh.lock:
+            self._drop(sh, key)
+
+    def stats(self) -> Dict[str, Any]:
+        entries = total = 0
+        counters: Dict[str, int] = {}
+        for sh in self._shards:
+            with sh.lock:
+                entries += len(sh.data)
+                total += sh.bytes
+                for k, v in sh.counters.items():
+                    counters[k] = counters.get(k, 0) + v
+        return {
+            "backend": "inmemory",
+            "entries": entries,
+            "bytes": total,
+            "shards": len(self._shards),
+            "max_entries": self._max_entries * len(self._shards),
+            "max_bytes": self._max_bytes * len(self._shards),
+            "idle_ttl": self._idle_ttl,
+            **counters,
+        }
+
+# KEYS[1] = key, ARGV[1] = ttl seconds (<= 0: no expiry), ARGV[2..] = field, value pairs
+_MERGE_SCRIPT = """
+for i = 2, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+if tonumber(ARGV[1]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return redis.call('HGETALL', KEYS[1])
+"""
+
+# KEYS[1] = key, ARGV[1] = ttl, ARGV[2] = expected version, ARGV[3] = "1" to replace,
+# ARGV[4..] = field, value pairs. Returns 0 on version mismatch.
+_COMMIT_SCRIPT = """
+local cur = redis.call('HGET', KEYS[1], 'version')
+if (tonumber(cur) or 0) ~= tonumber(ARGV[2]) then
+    return 0
+end
+if ARGV[3] == '1' then
+    redis.call('DEL', KEYS[1])
+end
+for i = 4, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+if tonumber(ARGV[1]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return 1
+"""
 
 class RedisStateStore:
-    def __init__(self, redis_url: str):
+    """
+    Each value is a Redis hash with one JSON-encoded field per top-level key.
+    update() merges fields atomically server-side (Lua) and returns the merged
+    value in the same round trip; every read and write refreshes the per-key TTL.
+    """
+    def __init__(self, redis_url: str, ttl_seconds: int = 0, client=None):
         import redis
-        self.r = redis.Redis.from_url(redis_url, decode_responses=True)
+        self.r = client if client is not None else redis.Redis.from_url(redis_url, decode_responses=True)
+        self.ttl = ttl_seconds
+        self._merge = self.r.register_script(_MERGE_SCRIPT)
+        self._commit = self.r.register_script(_COMMIT_SCRIPT)
 
-    def get(self, key: str) -> Optional[Dict[str, Any]]:
+    @staticmethod
+    def _decode(raw) -> Dict[str, Any]:
+        if isinstance(raw, list):  # HGETALL via Lua comes back as a flat list
+            raw = dict(zip(raw[::2], raw[1::2]))
+        return {k: json.loads(v) for k, v in raw.items()}
+
+    def _is_legacy(self, err: Exception) -> bool:
+        # Values written by the old JSON-blob store are plain strings
+        return "WRONGTYPE" in str(err)
+
+    def _migrate(self, key: str) -> None:
         val = self.r.get(key)
-        return json.loads(val) if val else None
+        self.r.delete(key)
+        if val:
+            self.set(key, json.loads(val))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        import redis
+        try:
+            # Reads refresh the TTL too, so it acts as an idle timeout (same round trip)
+            pipe = self.r.pipeline(transaction=False)
+            pipe.hgetall(key)
+            if self.ttl > 0:
+                pipe.expire(key, self.ttl)
+            raw = pipe.execute()[0]
+        except redis.ResponseError as e:
+            if not self._is_legacy(e):
+                raise
+            val = self.r.get(key)
+            return json.loads(val) if val else None
+        return self._decode(raw) if raw else None
 
     def set(self, key: str, value: Dict[str, Any]) -> None:
-        self.r.set(key, json.dumps(value))
+        pipe = self.r.pipeline(transaction=True)
+        pipe.delete(key)
+        if value:
+            pipe.hset(key, mapping={k: json.dumps(v) for k, v in value.items()})
+            if self.ttl > 0:
+                pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def update(self, key: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Atomic field-level merge; returns the merged value"""
+        import redis
+        args = [self.ttl]
+        for k, v in fields.items():
+            args += [k, json.dumps(v)]
+        try:
+            return self._decode(self._merge(keys=[key], args=args))
+        except redis.ResponseError as e:
+            if not self._is_legacy(e):
+                raise
+            self._migrate(key)
+            return self._decode(self._merge(keys=[key], args=args))
+
+    def commit(self, key: str, expected_version: int, fields: Dict[str, Any], replace: bool = False) -> bool:
+        """Atomic compare-and-write on the "version" field; one round trip"""
+        import redis
+        args = [self.ttl, expected_version, "1" if replace else "0"]
+        for k, v in fields.items():
+            args += [k, json.dumps(v)]
+        try:
+            return bool(self._commit(keys=[key], args=args))
+        except redis.ResponseError as e:
+            if not self._is_legacy(e):
+                raise
+            self._migrate(key)
+            return bool(self._commit(keys=[key], args=args))
+
+    def touch(self, key: str) -> bool:
+        """Refresh the key's TTL without reading it; False if it is gone"""
+        if self.ttl > 0:
+            return bool(self.r.expire(key, self.ttl))
+        return bool(self.r.exists(key))
 
     def delete(self, key: str) -> None:
         self.r.delete(key)
 
+    def stats(self) -> Dict[str, Any]:
+        mem = self.r.info("memory")
+        return {"backend": "redis", "used_memory": mem.get("used_memory"), "ttl": self.ttl}
+
 def make_state_store():
     if settings.state_store == "redis":
-        return RedisStateStore(settings.redis_url)
-    return InMemoryStateStore()
+        return RedisStateStore(settings.redis_url, ttl_seconds=settings.state_ttl_seconds)
+    return InMemoryStateStore(
+        shards=settings.state_shards,
+        max_entries=settings.state_max_entries,
+        max_bytes=settings.state_max_bytes,
+        idle_ttl=settings.state_ttl_seconds,
+    )
+
+def make_registry_store():
+    """
+    Store for session-registry entries. In memory it gets its own budget, so
+    large catalog snapshots never evict conversation state (and vice versa);
+    one shard, since a single catalog may be a sizeable share of the budget.
+    Redis has no LRU budget of its own here, so the state store is shared.
+    """
+    if settings.state_store == "redis":
+        return state_store
+    return InMemoryStateStore(
+        shards=1,
+        max_entries=settings.registry_max_entries,
+        max_bytes=settings.registry_max_bytes,
+        idle_ttl=settings.state_ttl_seconds,
+    )
 
 state_store = make_state_store()
+registry_store = make_registry_store()
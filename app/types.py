@@ -4,11 +4,26 @@ from typing import Any, Dict, List, Optional
 class ConnectRequest(BaseModel):
     session_id: str = Field(..., min_length=1)
     db_url: str = Field(..., min_length=8)
+    replica_urls: List[str] = Field(default_factory=list)  # reads are routed here; writes stay on db_url
+
+class FanoutRequest(BaseModel):
+    session_id: str = Field(..., min_length=1)
+    members: List[str] = Field(..., min_length=2)  # session_ids already connected
 
 class ConnectResponse(BaseModel):
     status: str
     exposed_tables: List[str]
 
+class ConnectJobResponse(BaseModel):
+    job_id: str
+    session_id: str
+    status: str  # queued | running | done | failed
+    tables_done: int = 0
+    tables_total: Optional[int] = None
+    exposed_tables: int = 0
+    usable: bool = False  # /chat works on the tables introspected so far
+    error: Optional[str] = None
+
 class ChatRequest(BaseModel):
     session_id: str = Field(..., min_length=1)
     message: str = Field(..., min_length=1)
@@ -18,6 +33,56 @@ class ChatResponse(BaseModel):
     reply: str
     data: Optional[Dict[str, Any]] = None
 
+class ChatBatchItem(BaseModel):
+    session_id: str = Field(..., min_length=1)
+    message: str = Field(..., min_length=1)
+
+class ChatBatchRequest(BaseModel):
+    items: List[ChatBatchItem] = Field(..., min_length=1)
+
+class ChatBatchResult(BaseModel):
+    index: int
+    session_id: str
+    status: int  # HTTP status /chat would have returned for this item
+    reply: Optional[str] = None
+    data: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class ChatBatchResponse(BaseModel):
+    results: List[ChatBatchResult]
+    unique: int  # items actually answered after deduplication
+
+class BulkCreateRequest(BaseModel):
+    session_id: str = Field(..., min_length=1)
+    entity: str = Field(..., min_length=1)
+    rows: List[Dict[str, Any]] = Field(..., min_length=1)
+    confirm: bool = False
+    batch_size: Optional[int] = Field(default=None, ge=1)
+
+class BulkCreateResponse(BaseModel):
+    session_id: str
+    entity: str
+    status: str  # preview | invalid | inserted
+    valid_rows: int
+    errors: List[Dict[str, Any]] = Field(default_factory=list)
+    preview: List[Dict[str, Any]] = Field(default_factory=list)
+    inserted: int = 0
+    batches: List[Dict[str, Any]] = Field(default_factory=list)
+
+class ValueRequest(BaseModel):
+    session_id: str = Field(..., min_length=1)
+    entity: str = Field(..., min_length=1)
+    column: str = Field(..., min_length=1)
+    pk: Dict[str, Any] = Field(..., min_length=1)
+
+class ValueResponse(BaseModel):
+    session_id: str
+    entity: str
+    column: str
+    value: Any = None
+    encoding: str  # json | base64
+    size: Optional[int] = None
+
 class SchemaResponse(BaseModel):
     session_id: str
     exposed_tables: List[str]
@@ -0,0 +1,74 @@
+"""
+Catalog memory benchmark: legacy nested-dict catalog vs the slotted Catalog.
+
+    python benchmarks/bench_catalog_memory.py [--tables 1000] [--cols 12] [--sessions 4]
+
+Each "session" gets its own catalog built from a fresh JSON copy of the schema
+(as independent introspection would produce). Reports retained bytes measured
+with tracemalloc, per 1,000 tables.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine
+from app.db.catalog import Catalog, as_plain
+from app.db.introspect import build_catalog
+
+def make_schema_json(n_tables: int, n_cols: int) -> str:
+    engine = create_engine("sqlite:///:memory:")
+    with engine.begin() as conn:
+        for t in range(n_tables):
+            cols = ", ".join(
+                f"{name}_{i} {typ}"
+                for i, (name, typ) in enumerate(
+                    [("status", "VARCHAR(20) NOT NULL"), ("name", "VARCHAR(120)"), ("created_at", "TIMESTAMP"), ("amount", "NUMERIC(12,2)")] * n_cols
+                )
+                if i < n_cols
+            )
+            conn.exec_driver_sql(f"CREATE TABLE t{t} (id INTEGER PRIMARY KEY, {cols})")
+            conn.exec_driver_sql(f"CREATE INDEX ix_t{t} ON t{t} (status_0)")
+    return json.dumps(as_plain(build_catalog(engine)))
+
+def retained(build, n):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    held = [build() for _ in range(n)]
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(s.size_diff for s in after.compare_to(before, "filename"))
+    del held
+    return size
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tables", type=int, default=1000)
+    ap.add_argument("--cols", type=int, default=12)
+    ap.add_argument("--sessions", type=int, default=4)
+    ap.add_argument("--json", action="store_true")
+    a = ap.parse_args()
+
+    raw = make_schema_json(a.tables, a.cols)
+    per_1k = 1000 / a.tables
+    results = {}
+    for n in (1, a.sessions):
+        results[f"legacy_dict_x{n}"] = retained(lambda: json.loads(raw), n)
+        results[f"slotted_x{n}"] = retained(lambda: Catalog.from_dict(json.loads(raw)), n)
+
+    results = {k: round(v * per_1k / 1024 / 1024, 2) for k, v in results.items()}
+    if a.json:
+        print(json.dumps({"tables": a.tables, "cols": a.cols + 1, "mib_per_1000_tables": results}))
+        return
+    print(f"tables={a.tables} cols={a.cols + 1}  (MiB retained per 1,000 tables)")
+    for k, v in results.items():
+        print(f"{k:<20}{v:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Serialization benchmark: current row path vs columnar encodings for one /chat read.
+
+    python benchmarks/bench_encoding.py [--rows 100] [--cols 8] [--iterations 500]
+
+"current" mirrors the pre-columnar pipeline: run_read (dict per row) ->
+format_table -> ChatResponse -> FastAPI JSON encoding. The other paths start
+from run_read_columnar and go through app.api.encoding.render_chat.
+Reports CPU time per request and peak traced allocation.
+"""
+import argparse
+import datetime
+import decimal
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, MetaData, text
+from app.api.encoding import render_chat, arrow_available, orjson, JSON, COLUMNAR_JSON, ARROW_STREAM
+from app.core.executor import run_read, run_read_columnar
+from app.core.formatter import format_table
+from app.types import ChatResponse
+
+def make_db(n_rows: int, n_cols: int):
+    engine = create_engine("sqlite:///:memory:")
+    cols = ", ".join(f"c{i} {t}" for i, t in zip(range(n_cols), ["TEXT", "NUMERIC", "TIMESTAMP", "INTEGER"] * n_cols))
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"CREATE TABLE bench (id INTEGER PRIMARY KEY, {cols})")
+        names = [f"c{i}" for i in range(n_cols)]
+        rows = []
+        for r in range(n_rows):
+            rows.append({n: [f"value-{r}", float(r) / 7, datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=r), r][i % 4] for i, n in enumerate(names)})
+        conn.execute(text(f"INSERT INTO bench ({', '.join(names)}) VALUES ({', '.join(':' + n for n in names)})"), rows)
+    md = MetaData()
+    md.reflect(bind=engine)
+    return engine, md
+
+def path_current(engine, md, args):
+    rows = run_read(engine, md, **args)
+    columns = list(rows[0].keys())
+    resp = ChatResponse(session_id="bench", reply="Done.", data=format_table(rows, columns))
+    return json.dumps(jsonable_encoder(resp), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def make_columnar_path(media_type):
+    def run(engine, md, args):
+        table = run_read_columnar(engine, md, **args)
+        return render_chat("bench", {"reply": "Done.", "data": table}, media_type).body
+    return run
+
+def measure(fn, engine, md, args, iterations):
+    fn(engine, md, args)  # warm up
+    t0 = time.process_time()
+    for _ in range(iterations):
+        body = fn(engine, md, args)
+    cpu = (time.process_time() - t0) / iterations
+
+    tracemalloc.start()
+    fn(engine, md, args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"cpu_ms": round(cpu * 1000, 3), "peak_kib": round(peak / 1024, 1), "bytes": len(body)}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100)
+    ap.add_argument("--cols", type=int, default=8)
+    ap.add_argument("--iterations", type=int, default=500)
+    ap.add_argument("--json", action="store_true", help="print machine-readable results")
+    a = ap.parse_args()
+
+    engine, md = make_db(a.rows, a.cols)
+    args = dict(entity="bench", columns=[c.name for c in md.tables["bench"].c], filters=[], order_by=None, order_dir="asc", limit=a.rows)
+
+    paths = {"current": path_current, "json": make_columnar_path(JSON), "columnar_json": make_columnar_path(COLUMNAR_JSON)}
+    if arrow_available():
+        paths["arrow"] = make_columnar_path(ARROW_STREAM)
+
+    results = {name: measure(fn, engine, md, args, a.iterations) for name, fn in paths.items()}
+    if a.json:
+        print(json.dumps({"rows": a.rows, "cols": a.cols + 1, "orjson": orjson is not None, "results": results}))
+        return
+
+    print(f"rows={a.rows} cols={a.cols + 1} orjson={'yes' if orjson else 'no'}")
+    print(f"{'path':<15}{'cpu ms/req':>12}{'peak KiB':>12}{'bytes':>10}")
+    for name, r in results.items():
+        print(f"{name:<15}{r['cpu_ms']:>12}{r['peak_kib']:>12}{r['bytes']:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+/connect introspection time vs INTROSPECT_THREADS on a latency-injected database.
+
+    python benchmarks/bench_introspect.py [--tables 200] [--latency-ms 2] [--threads 1,2,4,8,16]
+
+A generated SQLite schema (benchmarks/fixtures.py) stands in for a remote
+database: every statement sleeps --latency-ms before executing, roughly one
+network round trip. Each run does what /connect does (connection test,
+build_catalog, reflect_metadata) on a fresh engine and checks that the
+catalog is identical to the sequential one.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import create_engine, event
+from app.db.catalog import as_plain
+from app.db.introspect import build_catalog, reflect_metadata
+from fixtures import make_sqlite_schema
+
+def slow_engine(url, latency):
+    # Pool sized so every introspection thread gets its own connection
+    engine = create_engine(url, pool_size=32, max_overflow=0)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _rtt(*args):
+        time.sleep(latency)
+
+    return engine
+
+def run(url, threads, latency):
+    engine = slow_engine(url, latency)
+    t0 = time.perf_counter()
+    with engine.connect() as conn:
+        conn.exec_driver_sql("SELECT 1")
+    catalog = build_catalog(engine, threads=threads)
+    t1 = time.perf_counter()
+    reflect_metadata(engine, catalog["exposed_tables"], threads=threads)
+    t2 = time.perf_counter()
+    engine.dispose()
+    return as_plain(catalog), t1 - t0, t2 - t1
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--tables", type=int, default=200)
+    p.add_argument("--latency-ms", type=float, default=2.0)
+    p.add_argument("--threads", default="1,2,4,8,16")
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        url = make_sqlite_schema(os.path.join(d, "schema.db"), args.tables, rows=10)
+        latency = args.latency_ms / 1000
+        baseline = None
+        print(f"{args.tables} tables, {args.latency_ms} ms per statement")
+        print(f"{'threads':>7} {'catalog_s':>10} {'reflect_s':>10} {'connect_s':>10} {'speedup':>8}")
+        for n in (int(x) for x in args.threads.split(",")):
+            catalog, t_cat, t_ref = run(url, n, latency)
+            if baseline is None:
+                baseline = (catalog, t_cat + t_ref)
+            assert catalog == baseline[0], f"catalog differs with {n} threads"
+            total = t_cat + t_ref
+            print(f"{n:>7} {t_cat:>10.2f} {t_ref:>10.2f} {total:>10.2f} {baseline[1] / total:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
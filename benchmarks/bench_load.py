@@ -0,0 +1,266 @@
+"""
+Offline load test: the real app under uvicorn, a stub LLM and generated SQLite schemas.
+
+    python benchmarks/bench_load.py [--tables 20,200,1000] [--users 8] [--requests 20]
+                                    [--llm-latency-ms 50] [--json out.json] [--compare baseline.json]
+
+Scenarios, per schema size:
+- connect:     POST /connect (introspection + reflection) on a fresh session
+- single_read: one user, sequential "show tN" reads
+- multi_turn:  sessions of read / show draft / read / reset turns
+- concurrent:  --users sessions issuing --requests reads each, in parallel
+
+Reports p50/p95/p99 latency, throughput and process RSS. --json writes the
+results with the git commit so runs can be compared; --compare prints the
+relative change against an earlier --json file. Everything runs in one
+process (stub LLM included), so numbers are for regression tracking rather
+than absolute capacity.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from fixtures import make_sqlite_schema
+from stub_llm import StubLLM
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        # Peak instead of current outside Linux (ru_maxrss is bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+def summarize(latencies, wall, errors):
+    s = sorted(latencies)
+    ms = lambda v: round(v * 1000, 2) if v is not None else None
+    return {
+        "requests": len(s),
+        "errors": errors,
+        "p50_ms": ms(percentile(s, 50)),
+        "p95_ms": ms(percentile(s, 95)),
+        "p99_ms": ms(percentile(s, 99)),
+        "mean_ms": ms(statistics.fmean(s)) if s else None,
+        "max_ms": ms(s[-1]) if s else None,
+        "throughput_rps": round(len(s) / wall, 2) if wall > 0 else None,
+        "rss_mb": round(rss_mb(), 1),
+    }
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_app(port):
+    import uvicorn
+    from app.main import app
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    threading.Thread(target=server.run, name="uvicorn", daemon=True).start()
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("app did not start")
+        time.sleep(0.05)
+    return server
+
+class Runner:
+    def __init__(self, client):
+        self.client = client
+        self._n = 0
+        self._lock = threading.Lock()
+
+    def session_id(self, prefix):
+        with self._lock:
+            self._n += 1
+            return f"{prefix}-{self._n}"
+
+    def timed(self, method, path, **kwargs):
+        """(seconds, ok)"""
+        t0 = time.perf_counter()
+        try:
+            resp = self.client.request(method, path, **kwargs)
+            ok = resp.status_code < 400
+        except Exception:
+            ok = False
+        return time.perf_counter() - t0, ok
+
+    def connect(self, db_url, prefix="s"):
+        sid = self.session_id(prefix)
+        dt, ok = self.timed("POST", "/connect", json={"session_id": sid, "db_url": db_url})
+        if not ok:
+            raise RuntimeError(f"/connect failed for {db_url}")
+        return sid, dt
+
+    def chat(self, sid, message):
+        return self.timed("POST", "/chat", json={"session_id": sid, "message": message})
+
+def run_connect(r, db_url, repeats):
+    lat = []
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        lat.append(r.connect(db_url, "connect")[1])
+    return summarize(lat, time.perf_counter() - t0, 0)
+
+def run_single_read(r, db_url, n_tables, requests):
+    sid, _ = r.connect(db_url, "single")
+    lat, errors = [], 0
+    t0 = time.perf_counter()
+    for i in range(requests):
+        dt, ok = r.chat(sid, f"show t{i % n_tables}")
+        lat.append(dt)
+        errors += not ok
+    return summarize(lat, time.perf_counter() - t0, errors)
+
+def run_multi_turn(r, db_url, n_tables, sessions, users):
+    turns = ["show t0", "show draft", f"list the latest t{n_tables - 1} rows", "reset"]
+    sids = [r.connect(db_url, "multi")[0] for _ in range(sessions)]
+    lat, errors = [], [0]
+    lock = threading.Lock()
+
+    def converse(sid):
+        for msg in turns:
+            dt, ok = r.chat(sid, msg)
+            with lock:
+                lat.append(dt)
+                errors[0] += not ok
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(converse, sids))
+    return summarize(lat, time.perf_counter() - t0, errors[0])
+
+def run_concurrent(r, db_url, n_tables, users, requests):
+    sids = [r.connect(db_url, "user")[0] for _ in range(users)]
+    lat, errors = [], [0]
+    lock = threading.Lock()
+
+    def user(i):
+        for n in range(requests):
+            dt, ok = r.chat(sids[i], f"show t{(i + n) % n_tables}")
+            with lock:
+                lat.append(dt)
+                errors[0] += not ok
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(user, range(users)))
+    return summarize(lat, time.perf_counter() - t0, errors[0])
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        return None
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        base = json.load(f)["results"]
+    print(f"\nvs {baseline_path}:")
+    for key, cur in results.items():
+        old = base.get(key)
+        if not old:
+            continue
+        parts = []
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "rss_mb"):
+            a, b = old.get(metric), cur.get(metric)
+            if a and b is not None:
+                parts.append(f"{metric} {(b - a) / a * 100:+.1f}%")
+        print(f"  {key:<24} " + ", ".join(parts))
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--tables", default="20,200,1000", help="comma-separated schema sizes")
+    p.add_argument("--rows", type=int, default=100, help="rows per table")
+    p.add_argument("--users", type=int, default=8)
+    p.add_argument("--requests", type=int, default=20, help="reads per user (concurrent) / total (single_read)")
+    p.add_argument("--sessions", type=int, default=16, help="multi_turn sessions")
+    p.add_argument("--connect-repeats", type=int, default=3)
+    p.add_argument("--llm-latency-ms", type=float, default=50)
+    p.add_argument("--llm-jitter-ms", type=float, default=10)
+    p.add_argument("--scenarios", default="connect,single_read,multi_turn,concurrent")
+    p.add_argument("--json", help="write results to this file")
+    p.add_argument("--compare", help="earlier --json output to diff against")
+    args = p.parse_args()
+
+    sizes = [int(x) for x in args.tables.split(",") if x]
+    scenarios = set(args.scenarios.split(","))
+
+    stub = StubLLM(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms).start()
+    # Must be set before the app (and its settings) are imported
+    os.environ.update({"GROQ_API_KEY": "stub", "GROQ_BASE_URL": stub.base_url, "OPENAI_API_KEY": ""})
+    os.environ.setdefault("STATS_REFRESH_SECONDS", "0")
+    os.environ.setdefault("STATE_STORE", "inmemory")
+
+    import httpx
+    port = free_port()
+    server = start_app(port)
+    client = httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=120,
+                          limits=httpx.Limits(max_connections=max(args.users, 8) * 2))
+    r = Runner(client)
+
+    results = {}
+    tmp = tempfile.mkdtemp(prefix="phasewise-bench-")
+    try:
+        for n in sizes:
+            t0 = time.perf_counter()
+            db_url = make_sqlite_schema(os.path.join(tmp, f"schema_{n}.db"), n, args.rows)
+            print(f"schema: {n} tables x {args.rows} rows ({time.perf_counter() - t0:.1f}s to generate)")
+            if "connect" in scenarios:
+                results[f"connect@{n}"] = run_connect(r, db_url, args.connect_repeats)
+            if "single_read" in scenarios:
+                results[f"single_read@{n}"] = run_single_read(r, db_url, n, args.requests)
+            if "multi_turn" in scenarios:
+                results[f"multi_turn@{n}"] = run_multi_turn(r, db_url, n, args.sessions, args.users)
+            if "concurrent" in scenarios:
+                results[f"concurrent@{n}"] = run_concurrent(r, db_url, n, args.users, args.requests)
+    finally:
+        client.close()
+        server.should_exit = True
+        stub.stop()
+
+    print(f"\n{'scenario':<24} {'n':>5} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8} {'rss MB':>8}")
+    for key, s in results.items():
+        print(f"{key:<24} {s['requests']:>5} {s['errors']:>4} {s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9} {s['throughput_rps']:>8} {s['rss_mb']:>8}")
+    print(f"stub LLM requests: {stub.requests}")
+
+    if args.compare:
+        compare(results, args.compare)
+    if args.json:
+        out = {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "args": vars(args),
+            },
+            "results": results,
+        }
+        with open(args.json, "w") as f:
+            json.dump(out, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+State store benchmark: legacy JSON-blob read-modify-write vs hash + Lua merge.
+
+    python benchmarks/bench_state_store.py [--redis-url redis://localhost:6379/15] [--updates 2000] [--threads 8]
+
+Without --redis-url it runs against fakeredis (pip install "fakeredis[lua]"),
+which shows round trips and lost updates but not real network latency.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.state_store import RedisStateStore
+
+class LegacyJSONStore:
+    """The pre-hash RedisStateStore + StateManager.update_state: GET, merge, SET"""
+    def __init__(self, client):
+        self.r = client
+
+    def update(self, key, fields):
+        val = self.r.get(key)
+        cur = json.loads(val) if val else {}
+        cur.update(fields)
+        self.r.set(key, json.dumps(cur))
+        return cur
+
+def make_client(url):
+    if url:
+        import redis
+        return redis.Redis.from_url(url, decode_responses=True)
+    import fakeredis
+    return fakeredis.FakeRedis(decode_responses=True)
+
+def count_round_trips(client):
+    calls = {"n": 0}
+    orig = client.execute_command
+    def counted(*a, **k):
+        calls["n"] += 1
+        return orig(*a, **k)
+    client.execute_command = counted
+    return calls
+
+def run(name, store, calls, updates, threads):
+    key = f"bench:{name}"
+    store.r.delete(key)
+    per_thread = updates // threads
+
+    def worker(i):
+        for n in range(per_thread):
+            store.update(key, {f"f{i}": n, "stage": "idle"})
+
+    calls["n"] = 0
+    t0 = time.perf_counter()
+    ts = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    if isinstance(store, LegacyJSONStore):
+        final = json.loads(store.r.get(key))
+    else:
+        final = store.get(key)
+    lost = sum(1 for i in range(threads) if final.get(f"f{i}") != per_thread - 1)
+    total = per_thread * threads
+    return {
+        "updates": total,
+        "round_trips_per_update": round(calls["n"] / total, 2),
+        "updates_per_sec": round(total / elapsed, 1),
+        "threads_with_lost_final_write": lost,
+    }
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--redis-url", default=None)
+    ap.add_argument("--updates", type=int, default=2000)
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--json", action="store_true")
+    a = ap.parse_args()
+
+    results = {}
+    client = make_client(a.redis_url)
+    calls = count_round_trips(client)
+    results["legacy_json"] = run("legacy", LegacyJSONStore(client), calls, a.updates, a.threads)
+
+    client = make_client(a.redis_url)
+    calls = count_round_trips(client)
+    results["hash_lua"] = run("hash", RedisStateStore(a.redis_url or "", ttl_seconds=3600, client=client), calls, a.updates, a.threads)
+
+    if a.json:
+        print(json.dumps({"backend": a.redis_url or "fakeredis", "results": results}))
+        return
+    print(f"backend={a.redis_url or 'fakeredis'} threads={a.threads}")
+    for name, r in results.items():
+        print(f"{name:<12} {r}")
+
+if __name__ == "__main__":
+    main()
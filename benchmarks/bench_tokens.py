@@ -0,0 +1,92 @@
+"""
+Per-request cost of x-user-context verification.
+
+    python benchmarks/bench_tokens.py [--iterations 20000] [--distinct 1000]
+
+Compares the unsigned base64 header with signed tokens (HS256, and RS256 /
+ES256 / EdDSA from a JWKS file when `cryptography` is installed), each with
+the verified-token cache disabled (every request verifies the signature) and
+enabled (a rotating set of --distinct tokens, as from that many active users).
+Reports microseconds per get_user_context call.
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core import tokens
+from app.core.context import get_user_context
+from app.core.tokens import KeySet, TokenVerifier, sign_token, _b64encode
+
+def claims(i):
+    return {"user_id": f"user-{i}", "user_role": "analyst", "company_id": i % 50, "exp": time.time() + 3600}
+
+def asymmetric_keys():
+    try:
+        from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+        from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+    except ImportError:
+        return [], {"keys": []}
+
+    def b64int(n):
+        return _b64encode(n.to_bytes((n.bit_length() + 7) // 8, "big"))
+
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ec_key = ec.generate_private_key(ec.SECP256R1())
+    ed_key = ed25519.Ed25519PrivateKey.generate()
+    rn, en = rsa_key.public_key().public_numbers(), ec_key.public_key().public_numbers()
+    jwks = {"keys": [
+        {"kid": "rsa", "kty": "RSA", "n": b64int(rn.n), "e": b64int(rn.e)},
+        {"kid": "ec", "kty": "EC", "crv": "P-256", "x": _b64encode(en.x.to_bytes(32, "big")), "y": _b64encode(en.y.to_bytes(32, "big"))},
+        {"kid": "ed", "kty": "OKP", "crv": "Ed25519", "x": _b64encode(ed_key.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw))},
+    ]}
+    return [("RS256", rsa_key, "rsa"), ("ES256", ec_key, "ec"), ("EdDSA", ed_key, "ed")], jwks
+
+def measure(headers, iterations):
+    t0 = time.perf_counter()
+    for i in range(iterations):
+        get_user_context(headers[i % len(headers)])
+    return (time.perf_counter() - t0) / iterations * 1e6
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--iterations", type=int, default=20000)
+    p.add_argument("--distinct", type=int, default=1000, help="distinct tokens in rotation")
+    args = p.parse_args()
+
+    secret = b"bench-secret"
+    signers, jwks = asymmetric_keys()
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(jwks, f)
+        jwks_path = f.name
+    keys = KeySet(secret=secret.decode(), jwks_path=jwks_path, reload_seconds=30)
+
+    rows = []
+    tokens.token_verifier = None
+    unsigned = [base64.b64encode(json.dumps(claims(i)).encode()).decode() for i in range(args.distinct)]
+    rows.append(("unsigned base64", "-", measure(unsigned, args.iterations)))
+
+    for alg, key, kid in [("HS256", secret, None)] + signers:
+        signed = [sign_token(claims(i), key, alg=alg, kid=kid) for i in range(args.distinct)]
+        # Asymmetric verification is slow; fewer uncached iterations keep the run short
+        n = args.iterations if alg == "HS256" else max(args.distinct, args.iterations // 10)
+        tokens.token_verifier = TokenVerifier(keys, cache_size=0)
+        rows.append((alg, "off", measure(signed, n)))
+        tokens.token_verifier = TokenVerifier(keys, cache_size=args.distinct * 2)
+        measure(signed, args.distinct)  # warm
+        rows.append((alg, "on", measure(signed, args.iterations)))
+    os.unlink(jwks_path)
+
+    print(f"{'header':<16} {'cache':<6} {'us/request':>11}")
+    for name, cache, us in rows:
+        print(f"{name:<16} {cache:<6} {us:>11.1f}")
+    if not signers:
+        print("(install `cryptography` for RS256/ES256/EdDSA)")
+
+if __name__ == "__main__":
+    main()
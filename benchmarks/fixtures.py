@@ -0,0 +1,68 @@
+"""
+Generated SQLite schemas for benchmarks.
+
+    python benchmarks/fixtures.py out.db --tables 500 --rows 200
+
+Tables are named t0..tN-1 with a mix of column types, an index, a foreign key
+to the previous table and deterministic data, so runs are comparable.
+"""
+import argparse
+import os
+import random
+import sqlite3
+
+COLUMNS = [
+    ("status", "VARCHAR(20) NOT NULL"),
+    ("name", "VARCHAR(120)"),
+    ("email", "VARCHAR(80)"),
+    ("amount", "NUMERIC(12,2)"),
+    ("qty", "INTEGER"),
+    ("created_at", "TIMESTAMP"),
+    ("notes", "TEXT"),
+]
+STATUSES = ("PAID", "PENDING", "VOID")
+
+def make_sqlite_schema(path: str, n_tables: int, rows: int = 100, n_cols: int = len(COLUMNS), seed: int = 0) -> str:
+    """(Re)creates the database at path and returns its SQLAlchemy URL"""
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(seed)
+    cols = COLUMNS[:n_cols]
+    con = sqlite3.connect(path)
+    try:
+        for t in range(n_tables):
+            fk = f", parent_id INTEGER REFERENCES t{t - 1}(id)" if t else ""
+            ddl = ", ".join(f"{name} {typ}" for name, typ in cols)
+            con.execute(f"CREATE TABLE t{t} (id INTEGER PRIMARY KEY, {ddl}{fk})")
+            con.execute(f"CREATE INDEX ix_t{t}_status ON t{t} (status)")
+            names = [name for name, _ in cols] + (["parent_id"] if t else [])
+            data = []
+            for i in range(rows):
+                values = {
+                    "status": STATUSES[i % 3],
+                    "name": f"name {i}",
+                    "email": f"user{i}@example.com",
+                    "amount": round(rng.uniform(1, 1000), 2),
+                    "qty": rng.randint(1, 50),
+                    "created_at": f"2024-01-{i % 28 + 1:02d} 12:00:00",
+                    "notes": "lorem ipsum " * rng.randint(0, 20),
+                    "parent_id": i + 1,
+                }
+                data.append(tuple(values[n] for n in names))
+            con.executemany(f"INSERT INTO t{t} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})", data)
+        con.execute("ANALYZE")
+        con.commit()
+    finally:
+        con.close()
+    return f"sqlite:///{os.path.abspath(path)}"
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("path")
+    p.add_argument("--tables", type=int, default=50)
+    p.add_argument("--rows", type=int, default=100)
+    args = p.parse_args()
+    print(make_sqlite_schema(args.path, args.tables, args.rows))
+
+if __name__ == "__main__":
+    main()
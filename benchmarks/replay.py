@@ -0,0 +1,251 @@
+"""
+Replay captured /connect + /chat traffic (CAPTURE_PATH=...) against an instance.
+
+    # against a running build; the recorded-LLM server must be its GROQ_BASE_URL
+    python benchmarks/replay.py capture.jsonl --target http://127.0.0.1:8000 \\
+        --db sqlite:///staging.db --recorded-llm --llm-port 8765 --json new.json --compare old.json
+
+    # or start the current tree in-process, wired to the recorded LLM
+    python benchmarks/replay.py capture.jsonl --local --db sqlite:///staging.db --recorded-llm
+
+Sessions are replayed concurrently, each in captured order, at the captured
+pace divided by --speed (0 = no pauses). --db maps captured DB hashes to
+URLs ("HASH=URL", repeatable) or gives one URL for every session. With
+--recorded-llm, LLM calls are answered from the responses stored in the
+capture (keyed on the schema prompt + anonymized message) instead of a live
+provider; misses fall back to the canned stub replies and are counted.
+
+The report compares latency (p50/p95/p99) and errors per request kind with
+the captured timings and, with --compare, with an earlier --json run,
+listing the largest per-request regressions and status changes.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from bench_load import percentile, free_port, start_app, git_commit
+from stub_llm import StubLLM
+
+class RecordedLLM(StubLLM):
+    """Serves LLM responses recorded in a capture file"""
+    def __init__(self, records, **kwargs):
+        super().__init__(**kwargs)
+        self.by_key = defaultdict(deque)
+        self.by_message = defaultdict(deque)
+        for rec in records:
+            for call in rec.get("llm") or []:
+                self.by_key[call["key"]].append(call["response"])
+                self.by_message[call["key"].split("|", 1)[1]].append(call["response"])
+        self.hits = self.misses = 0
+        self._replay_lock = threading.Lock()
+
+    def reply(self, system, user):
+        # Imported late: app settings are read on import, after --local sets the env
+        from app.core.capture import llm_key
+        key = llm_key(system, user)
+        with self._replay_lock:
+            # Exact prompt first; the system prompt can differ if the replay
+            # database has different value stats, so fall back to the message
+            for table, k in ((self.by_key, key), (self.by_message, key.split("|", 1)[1])):
+                q = table.get(k)
+                if q:
+                    self.hits += 1
+                    resp = q[0]
+                    q.rotate(-1)
+                    return resp
+            self.misses += 1
+        return super().reply(system, user)
+
+def load_capture(path):
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    records.sort(key=lambda r: r["t"])
+    for i, r in enumerate(records):
+        r["i"] = i
+    return records
+
+def resolve_db(db_args):
+    default, mapping = None, {}
+    for d in db_args or []:
+        if "=" in d.split("://", 1)[0]:
+            h, url = d.split("=", 1)
+            mapping[h] = url
+        else:
+            default = d
+    return lambda h: mapping.get(h, default)
+
+def replay(client, records, db_for, speed, workers, run_id):
+    sessions = defaultdict(list)
+    for r in records:
+        sessions[r["session"]].append(r)
+    t_first = records[0]["t"] if records else 0
+    results, lock = [], threading.Lock()
+    start = time.perf_counter()
+
+    def run_session(session, recs):
+        sid = f"replay-{run_id}-{session}"
+        connected = False
+        for r in recs:
+            if speed > 0:
+                delay = (r["t"] - t_first) / speed - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            if r["kind"] == "chat" and not connected:
+                # Session was connected before the capture started
+                url = db_for(None)
+                if url:
+                    client.post("/connect", json={"session_id": sid, "db_url": url})
+                connected = True
+            if r["kind"] == "connect":
+                url = db_for(r.get("db"))
+                if not url:
+                    raise SystemExit(f"no --db for captured database {r.get('db')}")
+                body, path = {"session_id": sid, "db_url": url}, "/connect"
+                connected = True
+            else:
+                body, path = {"session_id": sid, "message": r["message"]}, "/chat"
+            t0 = time.perf_counter()
+            try:
+                status = client.post(path, json=body).status_code
+            except Exception:
+                status = 599
+            ms = (time.perf_counter() - t0) * 1000
+            with lock:
+                results.append({
+                    "i": r["i"], "kind": r["kind"], "session": session,
+                    "ms": round(ms, 3), "status": status,
+                    "captured_ms": r.get("ms"), "captured_status": r.get("status"),
+                })
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(sessions)))) as pool:
+        list(pool.map(lambda kv: run_session(*kv), sessions.items()))
+    results.sort(key=lambda x: x["i"])
+    return results, time.perf_counter() - start
+
+def summarize(results, field="ms", status_field="status"):
+    out = {}
+    for kind in sorted({r["kind"] for r in results}):
+        rs = [r for r in results if r["kind"] == kind and r.get(field) is not None]
+        lat = sorted(r[field] for r in rs)
+        out[kind] = {
+            "requests": len(rs),
+            "errors": sum(1 for r in rs if (r.get(status_field) or 0) >= 400),
+            "p50_ms": round(percentile(lat, 50), 2) if lat else None,
+            "p95_ms": round(percentile(lat, 95), 2) if lat else None,
+            "p99_ms": round(percentile(lat, 99), 2) if lat else None,
+        }
+    return out
+
+def print_diff(title, base, cur):
+    print(f"\n{title}")
+    print(f"  {'kind':<10} {'metric':<8} {'before':>10} {'after':>10} {'change':>9}")
+    for kind, c in cur.items():
+        b = base.get(kind)
+        if not b:
+            continue
+        for m in ("p50_ms", "p95_ms", "p99_ms", "errors"):
+            a, z = b.get(m), c.get(m)
+            if a is None or z is None:
+                continue
+            change = f"{(z - a) / a * 100:+.1f}%" if a else ("" if z == a else "new")
+            print(f"  {kind:<10} {m:<8} {a:>10} {z:>10} {change:>9}")
+
+def diff_requests(base_results, results, top):
+    """Largest per-request slowdowns and status changes vs an earlier run"""
+    by_i = {r["i"]: r for r in base_results}
+    pairs = [(by_i[r["i"]], r) for r in results if r["i"] in by_i]
+    slower = sorted(pairs, key=lambda p: p[1]["ms"] - p[0]["ms"], reverse=True)[:top]
+    changed = [(b, r) for b, r in pairs if (b["status"] >= 400) != (r["status"] >= 400)]
+    return {
+        "slowest": [{"i": r["i"], "kind": r["kind"], "before_ms": b["ms"], "after_ms": r["ms"]} for b, r in slower if r["ms"] > b["ms"]],
+        "status_changes": [{"i": r["i"], "kind": r["kind"], "before": b["status"], "after": r["status"]} for b, r in changed],
+    }
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("capture")
+    p.add_argument("--target", help="base URL of the instance under test")
+    p.add_argument("--local", action="store_true", help="start this tree in-process instead of --target")
+    p.add_argument("--db", action="append", help="URL for all sessions, or HASH=URL per captured database")
+    p.add_argument("--speed", type=float, default=1.0, help="1 = captured pace, 2 = twice as fast, 0 = no pauses")
+    p.add_argument("--workers", type=int, default=64, help="max sessions replayed at once")
+    p.add_argument("--recorded-llm", action="store_true", help="answer LLM calls from the capture")
+    p.add_argument("--llm-port", type=int, default=0)
+    p.add_argument("--llm-latency-ms", type=float, default=0, help="delay added to recorded LLM replies")
+    p.add_argument("--top", type=int, default=10)
+    p.add_argument("--json", help="write this run's results")
+    p.add_argument("--compare", help="earlier --json run to diff against")
+    args = p.parse_args()
+    if bool(args.target) == args.local:
+        p.error("give exactly one of --target or --local")
+
+    records = load_capture(args.capture)
+    llm = None
+    if args.recorded_llm:
+        llm = RecordedLLM(records, port=args.llm_port, latency_ms=args.llm_latency_ms).start()
+        print(f"recorded LLM on {llm.base_url}")
+
+    import httpx
+    server = None
+    if args.local:
+        if llm is not None:
+            os.environ.update({"GROQ_API_KEY": "replay", "GROQ_BASE_URL": llm.base_url, "OPENAI_API_KEY": ""})
+        os.environ.setdefault("STATS_REFRESH_SECONDS", "0")
+        os.environ["CAPTURE_PATH"] = ""
+        port = free_port()
+        server = start_app(port)
+        target = f"http://127.0.0.1:{port}"
+    else:
+        target = args.target.rstrip("/")
+
+    client = httpx.Client(base_url=target, timeout=300, limits=httpx.Limits(max_connections=args.workers * 2))
+    try:
+        results, wall = replay(client, records, resolve_db(args.db), args.speed, args.workers, run_id=int(time.time()))
+    finally:
+        client.close()
+        if server is not None:
+            server.should_exit = True
+        if llm is not None:
+            llm.stop()
+
+    summary = summarize(results)
+    captured = summarize(results, field="captured_ms", status_field="captured_status")
+    print(f"replayed {len(results)} requests from {len({r['session'] for r in results})} sessions in {wall:.1f}s (speed {args.speed})")
+    if llm is not None:
+        print(f"recorded LLM: {llm.hits} hits, {llm.misses} misses")
+    print_diff("vs captured:", captured, summary)
+
+    report = {}
+    if args.compare:
+        with open(args.compare) as f:
+            base = json.load(f)
+        print_diff(f"vs {args.compare}:", base["summary"], summary)
+        report = diff_requests(base["results"], results, args.top)
+        if report["slowest"]:
+            print(f"\n  largest slowdowns (request #, kind, before -> after ms):")
+            for r in report["slowest"]:
+                print(f"    #{r['i']:<6} {r['kind']:<8} {r['before_ms']:>9} -> {r['after_ms']}")
+        for r in report["status_changes"]:
+            print(f"  status change #{r['i']} {r['kind']}: {r['before']} -> {r['after']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "meta": {"commit": git_commit(), "capture": args.capture, "speed": args.speed, "target": target,
+                         "llm_hits": llm.hits if llm else None, "llm_misses": llm.misses if llm else None},
+                "summary": summary,
+                "captured": captured,
+                "diff": report,
+                "results": results,
+            }, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Offline stand-in for an OpenAI-compatible chat completions API.
+
+    python benchmarks/stub_llm.py [--port 8765] [--latency-ms 150] [--jitter-ms 50]
+
+Answers POST /v1/chat/completions with canned JSON derived from the system
+prompt (detect_intent / read / create / update plans), so the full /chat
+pipeline runs without network access. Point the app at it with:
+
+    GROQ_API_KEY=stub GROQ_BASE_URL=http://127.0.0.1:8765/v1
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_TABLES_RE = re.compile(r"Choose entity ONLY from this list: [\[(](.*?)[\])]$", re.M)
+_PROFILE_TABLE_RE = re.compile(r"'table': '([^']+)'")
+
+def _pick_table(tables, message):
+    for t in sorted(tables, key=len, reverse=True):
+        if re.search(rf"\b{re.escape(t)}\b", message):
+            return t
+    return tables[0] if tables else None
+
+def canned_reply(system: str, user: str) -> dict:
+    """The JSON object a well-behaved model would return for this prompt"""
+    m = _TABLES_RE.search(system)
+    if m:
+        tables = re.findall(r"'([^']+)'", m.group(1))
+        words = user.lower()
+        if any(w in words for w in ("add ", "create ", "insert ")):
+            intent = "create"
+        elif any(w in words for w in ("update ", "set ", "change ")):
+            intent = "update"
+        else:
+            intent = "read"
+        return {"intent": intent, "entity": _pick_table(tables, user)}
+
+    table = _PROFILE_TABLE_RE.search(system)
+    entity = table.group(1) if table else "unknown"
+    if "READ plan" in system:
+        return {"entity": entity, "columns": None, "filters": [], "order_by": None, "order_dir": "desc", "limit": 25}
+    if "UPDATE plan" in system:
+        return {"entity": entity, "fields": {}, "filters": []}
+    return {"entity": entity, "fields": {}}
+
+class StubLLM:
+    """Threaded stub server; latency is slept per request to model LLM round trips"""
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0, jitter_ms: float = 0, seed: int = 0):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                self._send(stub.complete(body))
+
+            def _send(self, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def complete(self, body: dict) -> dict:
+        msgs = body.get("messages") or []
+        system = next((m["content"] for m in msgs if m.get("role") == "system"), "")
+        user = next((m["content"] for m in msgs if m.get("role") == "user"), "")
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + (self._rng.uniform(-self.jitter, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+        content = self.reply(system, user)
+        return {
+            "id": f"stub-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(system + user) // 4, "completion_tokens": len(content) // 4, "total_tokens": (len(system + user) + len(content)) // 4},
+        }
+
+    def reply(self, system: str, user: str) -> str:
+        """JSON text returned as the assistant message"""
+        return json.dumps(canned_reply(system, user))
+
+    def start(self) -> "StubLLM":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="stub-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--latency-ms", type=float, default=150)
+    p.add_argument("--jitter-ms", type=float, default=50)
+    args = p.parse_args()
+    stub = StubLLM(port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+    print(f"stub LLM on {stub.base_url} (latency {args.latency_ms}±{args.jitter_ms} ms)")
+    stub.server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api import routes
+from app.core.admission import Gate, SessionGate, Overloaded, SessionBusy
+
+client = TestClient(app)
+
+class _Peak:
+    """Tracks the highest number of callers inside at once"""
+    def __init__(self):
+        self.now = self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.now += 1
+            self.peak = max(self.peak, self.now)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.now -= 1
+
+def test_gate_caps_concurrency_and_sheds_when_queue_full():
+    gate = Gate("llm", limit=2, max_queue=2, timeout=5)
+    peak = _Peak()
+    release = threading.Event()
+
+    def work():
+        with gate.slot(), peak:
+            release.wait(5)
+        return "ok"
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        futures = [pool.submit(work) for _ in range(4)]
+        # 2 running + 2 queued -> the next one is rejected without waiting
+        deadline = time.time() + 2
+        while gate.stats()["waiting"] < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        t0 = time.perf_counter()
+        with pytest.raises(Overloaded):
+            gate.acquire()
+        assert time.perf_counter() - t0 < 0.1
+        release.set()
+        assert [f.result() for f in futures] == ["ok"] * 4
+
+    assert peak.peak == 2
+    assert gate.stats() == {"limit": 2, "inflight": 0, "waiting": 0, "rejected": 1}
+
+def test_gate_wait_timeout():
+    gate = Gate("db", limit=1, max_queue=4, timeout=0.05)
+    gate.acquire()
+    with pytest.raises(Overloaded):
+        gate.acquire()
+    gate.release()
+    with gate.slot():
+        pass
+
+def test_session_gate_serializes_or_rejects():
+    gate = SessionGate("queue", max_queue=8, timeout=5)
+    peaks = {"a": _Peak(), "b": _Peak()}
+
+    def message(sid):
+        with gate.hold(sid), peaks[sid]:
+            time.sleep(0.02)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(message, ["a", "b"] * 4))
+    assert peaks["a"].peak == 1 and peaks["b"].peak == 1
+    assert gate._sessions == {}
+
+    strict = SessionGate("reject", max_queue=8, timeout=5)
+    strict.acquire("a")
+    with pytest.raises(SessionBusy):
+        strict.acquire("a")
+    strict.acquire("b")  # other sessions are unaffected
+    strict.release("a")
+    strict.release("b")
+
+def test_chat_overlap_is_shed_with_429(monkeypatch):
+    monkeypatch.setattr(routes, "session_gate", SessionGate("reject", max_queue=0, timeout=1))
+    monkeypatch.setattr(routes, "_get_session", lambda sid: (None, {"exposed_tables": [], "tables": {}}, None))
+    started = threading.Event()
+
+    def slow_handle(session_id, message, *args, **kwargs):
+        started.set()
+        time.sleep(0.3)
+        return {"reply": "Done.", "data": None}
+
+    monkeypatch.setattr(routes, "handle_message", slow_handle)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(client.post, "/chat", json={"session_id": "busy", "message": "show orders"})
+        assert started.wait(2)
+        second = client.post("/chat", json={"session_id": "busy", "message": "show orders"})
+        other = pool.submit(client.post, "/chat", json={"session_id": "idle", "message": "show orders"})
+        assert first.result().status_code == 200
+        assert other.result().status_code == 200
+
+    assert second.status_code == 429
+    assert second.headers["retry-after"] == "1"
+
+def test_chat_llm_overload_is_503(monkeypatch):
+    monkeypatch.setattr(routes, "_get_session", lambda sid: (None, {"exposed_tables": [], "tables": {}}, None))
+
+    def overloaded(*args, **kwargs):
+        raise Overloaded("Too many concurrent llm requests (queue_full); retry shortly.")
+
+    monkeypatch.setattr(routes, "handle_message", overloaded)
+    r = client.post("/chat", json={"session_id": "shed", "message": "show orders"})
+    assert r.status_code == 503
+    assert "retry shortly" in r.json()["detail"]
+
+    print("✅ Admission control verification passed!")
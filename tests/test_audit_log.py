@@ -0,0 +1,146 @@
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import sqlite3
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, MetaData
+from app.main import app
+from app.core import audit
+from app.core.audit import AuditLog, JsonlSink, SQLiteSink, audit_message, audit_note
+from app.core.executor import run_read_columnar
+
+class MemorySink:
+    def __init__(self, gate: threading.Event = None):
+        self.batches = []
+        self.gate = gate
+
+    def write_batch(self, events):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.batches.append(list(events))
+
+    def close(self):
+        pass
+
+def test_group_commit_to_sqlite(tmp_path):
+    path = str(tmp_path / "audit.db")
+    log = AuditLog(SQLiteSink(path), max_queue=1000, batch_size=100, flush_interval=5)
+    for i in range(450):
+        assert log.record({"ts": f"t{i}", "session_id": "s1", "message": f"m{i}", "statements": [{"sql": "SELECT 1"}]})
+    assert log.flush()
+    log.close()
+
+    con = sqlite3.connect(path)
+    assert con.execute("SELECT COUNT(*) FROM ai_audit_log").fetchone()[0] == 450
+    stmts = con.execute("SELECT statements FROM ai_audit_log WHERE message = 'm7'").fetchone()[0]
+    assert json.loads(stmts) == [{"sql": "SELECT 1"}]
+    assert log.stats()["written"] == 450
+
+def test_batches_are_bounded_by_batch_size():
+    sink = MemorySink()
+    log = AuditLog(sink, max_queue=1000, batch_size=50, flush_interval=5)
+    for i in range(120):
+        log.record({"n": i})
+    log.flush()
+    assert [len(b) for b in sink.batches] == [50, 50, 20]
+    assert [e["n"] for b in sink.batches for e in b] == list(range(120))
+    log.close()
+
+@pytest.mark.parametrize("policy,kept", [("drop_new", [0, 1, 2, 3]), ("drop_oldest", [0, 3, 4, 5])])
+def test_overflow_policy(policy, kept):
+    gate = threading.Event()
+    sink = MemorySink(gate)
+    log = AuditLog(sink, max_queue=3, batch_size=1, flush_interval=0.01, overflow=policy)
+    log.record({"n": 0})
+    # Writer is now stuck on event 0; the queue holds at most 3 more
+    while log.stats()["queued"]:
+        time.sleep(0.001)
+    for i in range(1, 6):
+        log.record({"n": i})
+    assert log.stats()["dropped"] == 2
+    gate.set()
+    log.flush()
+    assert [e["n"] for b in sink.batches for e in b] == kept
+    log.close()
+
+def test_block_policy_waits_then_drops():
+    gate = threading.Event()
+    log = AuditLog(MemorySink(gate), max_queue=1, batch_size=1, flush_interval=0.01, overflow="block", block_seconds=0.05)
+    log.record({"n": 0})
+    while log.stats()["queued"]:
+        time.sleep(0.001)
+    assert log.record({"n": 1})
+    assert not log.record({"n": 2}), "queue full for longer than block_seconds"
+    gate.set()
+    log.close()
+
+def test_close_drains_queue(tmp_path):
+    path = tmp_path / "audit.jsonl"
+    log = AuditLog(JsonlSink(str(path)), batch_size=1000, flush_interval=60)
+    for i in range(10):
+        log.record({"n": i})
+    log.close()
+    assert [json.loads(line)["n"] for line in path.read_text().splitlines()] == list(range(10))
+    assert not log.record({"n": 11})
+
+def test_chat_message_event(monkeypatch):
+    sink = MemorySink()
+    monkeypatch.setattr(audit, "audit_log", AuditLog(sink, flush_interval=0.01))
+    engine = create_engine("sqlite:///:memory:")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE orders (id INTEGER PRIMARY KEY, status TEXT)")
+        conn.exec_driver_sql("INSERT INTO orders (status) VALUES ('open'), ('paid'), ('open')")
+    md = MetaData()
+    md.reflect(bind=engine)
+
+    with audit_message("s1", "show open orders", {"user_id": "u1"}):
+        audit_note(intent="read", entity="orders")
+        run_read_columnar(engine, md, "orders", None, [{"field": "status", "op": "=", "value": "open"}], "id", "asc", 10)
+    with pytest.raises(RuntimeError):
+        with audit_message("s1", "boom"):
+            raise RuntimeError("planner failed")
+
+    audit.audit_log.flush()
+    ok, failed = [e for b in sink.batches for e in b]
+    assert ok["user_id"] == "u1" and ok["intent"] == "read"
+    assert ok["rows"] == 2
+    stmt = ok["statements"][0]
+    assert "FROM orders" in stmt["sql"] and "open" in stmt["params"].values()
+    assert ok["duration_ms"] >= stmt["ms"] >= 0
+    assert "planner failed" in failed["error"]
+    audit.audit_log.close()
+
+def test_bulk_create_and_value_events(tmp_path, monkeypatch):
+    sink = MemorySink()
+    monkeypatch.setattr(audit, "audit_log", AuditLog(sink, flush_interval=0.01))
+    url = f"sqlite:///{tmp_path / 'notes.db'}"
+    with create_engine(url).begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE notes (id INTEGER PRIMARY KEY, code VARCHAR(10), body TEXT)")
+        conn.exec_driver_sql("INSERT INTO notes (code, body) VALUES ('a', 'first')")
+    client = TestClient(app)
+    assert client.post("/connect", json={"session_id": "audit-ep", "db_url": url}).status_code == 200
+
+    rows = [{"code": "b", "body": "x"}, {"code": "c", "body": "y"}, {"code": "d"}]
+    r = client.post("/bulk_create", json={"session_id": "audit-ep", "entity": "notes", "rows": rows, "confirm": True})
+    assert r.status_code == 200 and r.json()["inserted"] == 3
+    assert client.post("/value", json={"session_id": "audit-ep", "entity": "notes", "column": "body", "pk": {"id": 1}}).json()["value"] == "first"
+    assert client.post("/value", json={"session_id": "audit-ep", "entity": "notes", "column": "body", "pk": {"id": 99}}).status_code == 400
+
+    audit.audit_log.flush()
+    bulk, value, missing = [e for b in sink.batches for e in b]
+    assert bulk["intent"] == "bulk_create" and bulk["entity"] == "notes" and bulk["rows"] == 3
+    # One statement per column set, rows not copied
+    assert [s["rows"] for s in bulk["statements"]] == [2, 1]
+    assert all("INSERT INTO notes" in s["sql"] and s["params"] is None for s in bulk["statements"])
+    assert value["intent"] == "value" and value["rows"] == 1 and "FROM notes" in value["statements"][0]["sql"]
+    assert "Row not found" in missing["error"]
+    audit.audit_log.close()
+
+    print("✅ Audit log verification passed!")
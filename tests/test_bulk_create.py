@@ -0,0 +1,78 @@
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, MetaData
+from app.main import app
+from app.core.executor import validate_bulk_rows, run_bulk_create
+
+client = TestClient(app)
+
+def _make_db(path):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE invoices (id INTEGER PRIMARY KEY, number TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'open', note TEXT)"
+        )
+    md = MetaData()
+    md.reflect(bind=engine)
+    return engine, md
+
+def test_validate_bulk_rows(tmp_path):
+    engine, md = _make_db(tmp_path / "bulk.db")
+    rows = [
+        {"number": "A1"},
+        {"note": "missing number"},
+        {"number": "A2", "bogus": 1, "id": 99},  # unknown + autoincrement PK dropped
+    ]
+    out = validate_bulk_rows(md, "invoices", rows, ["number"])
+    assert out["rows"] == [{"number": "A1"}, {"number": "A2"}]
+    assert out["errors"][0]["row"] == 1
+
+    with pytest.raises(ValueError, match="Unknown entity/table"):
+        validate_bulk_rows(md, "nope", rows, [])
+
+def test_run_bulk_create_batches(tmp_path):
+    engine, md = _make_db(tmp_path / "bulk.db")
+    rows = [{"number": f"N{i}"} for i in range(7)] + [{"number": "X", "status": "paid"}]
+    out = run_bulk_create(engine, md, "invoices", rows, batch_size=3)
+    assert out["inserted"] == 8
+    assert [b["rows"] for b in out["batches"]] == [3, 3, 2]
+
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT count(*) FROM invoices").scalar() == 8
+        # Omitted optional columns keep their server default
+        assert conn.exec_driver_sql("SELECT status FROM invoices WHERE number='N0'").scalar() == "open"
+        assert conn.exec_driver_sql("SELECT status FROM invoices WHERE number='X'").scalar() == "paid"
+
+def test_bulk_create_endpoint_preview_then_confirm(tmp_path):
+    path = tmp_path / "bulk.db"
+    _make_db(path)
+    session_id = "test_bulk_session"
+    r = client.post("/connect", json={"session_id": session_id, "db_url": f"sqlite:///{path}"})
+    assert r.status_code == 200
+
+    body = {"session_id": session_id, "entity": "invoices", "rows": [{"number": "B1"}, {"number": "B2"}]}
+
+    # Preview only: nothing written
+    r = client.post("/bulk_create", json=body)
+    assert r.status_code == 200
+    assert r.json()["status"] == "preview"
+    assert r.json()["valid_rows"] == 2
+
+    # Invalid rows block the whole insert even when confirmed
+    bad = dict(body, rows=body["rows"] + [{"note": "x"}], confirm=True)
+    r = client.post("/bulk_create", json=bad)
+    assert r.json()["status"] == "invalid"
+    assert r.json()["inserted"] == 0
+
+    r = client.post("/bulk_create", json=dict(body, confirm=True, batch_size=1))
+    assert r.json()["status"] == "inserted"
+    assert r.json()["inserted"] == 2
+    assert len(r.json()["batches"]) == 2
+
+    print("✅ Bulk create verification passed!")
@@ -0,0 +1,63 @@
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import pytest
+from sqlalchemy import create_engine
+from app.db.catalog import Catalog, TableProfile, as_plain
+from app.db.introspect import build_catalog
+
+def _make_engine():
+    engine = create_engine("sqlite:///:memory:")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE invoices (id INTEGER PRIMARY KEY, number VARCHAR(20) NOT NULL, status VARCHAR(20))")
+        conn.exec_driver_sql("CREATE INDEX ix_status ON invoices (status)")
+        conn.exec_driver_sql("CREATE TABLE lines (id INTEGER PRIMARY KEY, invoice_id INTEGER REFERENCES invoices(id), qty INTEGER NOT NULL)")
+    return engine
+
+def test_catalog_is_immutable_with_dict_access():
+    catalog = build_catalog(_make_engine())
+    assert isinstance(catalog, Catalog)
+    profile = catalog["tables"]["invoices"]
+    assert isinstance(profile, TableProfile)
+
+    # Existing dict-style consumers keep working
+    assert profile["primary_key"] == ("id",)
+    assert "number" in profile["create_fields"]
+    assert profile.get("deferred_fields") == {}
+    assert profile["columns"][1]["name"] == "number"
+    assert catalog["tables"]["lines"]["foreign_keys"][0]["referred_table"] == "invoices"
+
+    with pytest.raises(AttributeError):
+        profile.table = "other"
+    with pytest.raises(TypeError):
+        profile["table"] = "other"
+
+def test_dict_view_is_json_ready():
+    catalog = build_catalog(_make_engine())
+    plain = as_plain(catalog)
+    assert isinstance(plain["tables"]["invoices"]["columns"][0], dict)
+    assert plain["tables"]["invoices"]["primary_key"] == ["id"]
+    # Round trip through JSON (registry snapshot) gives an equal catalog
+    assert Catalog.from_dict(json.loads(json.dumps(plain))) == catalog
+
+def test_sessions_on_same_database_share_profiles():
+    engine = _make_engine()
+    a = build_catalog(engine)
+    b = build_catalog(engine)
+    assert a["tables"]["invoices"] is b["tables"]["invoices"]
+
+    # Columns with identical definitions are shared across tables too
+    id_a = a["tables"]["invoices"]["columns"][0]
+    id_b = a["tables"]["lines"]["columns"][0]
+    assert id_a is id_b
+
+    # Stats swaps are per catalog and leave the shared schema parts in place
+    a["tables"]["invoices"] = a["tables"]["invoices"].with_stats({"status": {"values": ["open"], "distinct": 1}}, 10)
+    assert b["tables"]["invoices"]["value_stats"] == {}
+    assert a["tables"]["invoices"]["columns"] is b["tables"]["invoices"]["columns"]
+
+    print("✅ Catalog model verification passed!")
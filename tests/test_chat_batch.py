@@ -0,0 +1,81 @@
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+import time
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from app.main import app
+from app.core import chat_engine as ce
+from app.core.admission import Overloaded
+from app.core.state_manager import state_manager
+
+client = TestClient(app)
+
+def connect(tmp_path, session_id):
+    url = f"sqlite:///{tmp_path / 'shop.db'}"
+    with create_engine(url).begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY, name VARCHAR(20))")
+        conn.exec_driver_sql("INSERT OR IGNORE INTO items (id, name) VALUES (1, 'pen'), (2, 'cup'), (3, 'ink')")
+    assert client.post("/connect", json={"session_id": session_id, "db_url": url}).status_code == 200
+
+def test_batch_runs_concurrently_in_order_with_per_item_errors(tmp_path, monkeypatch):
+    connect(tmp_path, "cb-1")
+    connect(tmp_path, "cb-2")
+    planned, lock = [], threading.Lock()
+
+    def slow_plan(message, entity, profile):
+        time.sleep(0.2)  # one LLM round trip
+        with lock:
+            planned.append(message)
+        if message == "busy":
+            raise Overloaded("Too many concurrent llm requests (queue_full); retry shortly.")
+        limit = int(message.split()[-1])
+        return SimpleNamespace(entity="items", columns=["id"], filters=[], order_by="id", order_dir="asc", limit=limit)
+
+    monkeypatch.setattr(ce, "detect_intent", lambda m, t: SimpleNamespace(intent="read", entity="items"))
+    monkeypatch.setattr(ce, "make_read_plan", slow_plan)
+    state_manager.clear_state("cb-1")
+    before = state_manager.get_state("cb-1")
+
+    items = [
+        {"session_id": "cb-1", "message": "first 1"},
+        {"session_id": "cb-1", "message": "first 2"},
+        {"session_id": "cb-2", "message": "first 3"},
+        {"session_id": "cb-1", "message": "first  1"},  # duplicate of item 0
+        {"session_id": "nope", "message": "first 1"},
+        {"session_id": "cb-2", "message": "busy"},
+    ]
+    t0 = time.perf_counter()
+    r = client.post("/chat/batch", json={"items": items})
+    elapsed = time.perf_counter() - t0
+    assert r.status_code == 200
+    body = r.json()
+
+    # Four planner calls of 0.2s each, run side by side
+    assert elapsed < 0.6 and sorted(planned) == ["busy", "first 1", "first 2", "first 3"]
+    assert body["unique"] == 5
+    results = body["results"]
+    assert [x["index"] for x in results] == list(range(6))
+    assert [x["status"] for x in results] == [200, 200, 200, 200, 400, 503]
+    assert [x["data"]["rows"] for x in results[:4]] == [[[1]], [[1], [2]], [[1], [2], [3]], [[1]]]
+    assert results[3]["session_id"] == "cb-1" and "Not connected" in results[4]["error"]
+    assert "retry shortly" in results[5]["error"] and results[5]["reply"] is None
+    # Item stages run on batch threads but still land in this request's trace
+    timing = r.headers["server-timing"]
+    assert "handle_message" in timing and "db_read" in timing
+
+    # Batch answers don't move the conversation state
+    after = state_manager.get_state("cb-1")
+    assert (after.version, after.intent, after.entity) == (before.version, before.intent, before.entity)
+
+def test_batch_limits():
+    assert client.post("/chat/batch", json={"items": []}).status_code == 422
+    too_many = [{"session_id": "s", "message": "hi"}] * 501
+    assert client.post("/chat/batch", json={"items": too_many}).status_code == 400
+
+    print("✅ Chat batch verification passed!")
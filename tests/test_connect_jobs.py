@@ -0,0 +1,83 @@
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+import time
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from app.main import app
+from app.api import routes
+from app.config import settings
+
+client = TestClient(app)
+
+def make_db(path, n_tables):
+    url = f"sqlite:///{path}"
+    with create_engine(url).begin() as conn:
+        for i in range(n_tables):
+            parent = f", parent_id INTEGER REFERENCES t{i - 1}(id)" if i else ""
+            conn.exec_driver_sql(f"CREATE TABLE t{i} (id INTEGER PRIMARY KEY, name VARCHAR(20){parent})")
+    return url
+
+def wait_for(job_id, status, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        body = client.get(f"/connect/jobs/{job_id}").json()
+        if body["status"] == status:
+            return body
+        time.sleep(0.01)
+    raise AssertionError(f"job never reached {status}: {body}")
+
+def test_chat_on_partial_catalog_while_job_runs(tmp_path, monkeypatch):
+    url = make_db(tmp_path / "big.db", 12)
+    monkeypatch.setattr(settings, "connect_job_chunk", 5)
+
+    # Hold introspection after the first chunk
+    gate, first_chunk = threading.Event(), threading.Event()
+    real_build = routes.build_catalog
+
+    def paused_build(engine, progress=None, every=50):
+        def wrapped(new, done, total):
+            progress(new, done, total)
+            first_chunk.set()
+            gate.wait(5)
+        return real_build(engine, progress=wrapped, every=every)
+
+    monkeypatch.setattr(routes, "build_catalog", paused_build)
+    seen = []
+    monkeypatch.setattr(routes, "handle_message", lambda sid, msg, engine, catalog, metadata, **kw: seen.append((list(catalog["exposed_tables"]), set(metadata.tables))) or {"reply": "ok", "data": None})
+
+    resp = client.post("/connect/jobs", json={"session_id": "job-1", "db_url": url})
+    assert resp.status_code == 202
+    job_id = resp.json()["job_id"]
+    # Same session and URL while in flight: the same job comes back
+    assert client.post("/connect/jobs", json={"session_id": "job-1", "db_url": url}).json()["job_id"] == job_id
+
+    assert first_chunk.wait(5)
+    status = client.get(f"/connect/jobs/{job_id}").json()
+    assert status["status"] == "running" and status["usable"]
+    assert (status["tables_done"], status["tables_total"], status["exposed_tables"]) == (5, 12, 5)
+
+    assert client.post("/chat", json={"session_id": "job-1", "message": "show t3"}).status_code == 200
+    exposed, reflected = seen[-1]
+    assert exposed == sorted(f"t{i}" for i in range(12))[:5]
+    assert set(exposed) <= reflected
+    assert len(client.get("/schema", params={"session_id": "job-1"}).json()["exposed_tables"]) == 5
+
+    gate.set()
+    done = wait_for(job_id, "done")
+    assert (done["tables_done"], done["exposed_tables"]) == (12, 12)
+    assert client.post("/chat", json={"session_id": "job-1", "message": "show t11"}).status_code == 200
+    assert len(seen[-1][0]) == 12 and "t11" in seen[-1][1]
+
+def test_failed_and_unknown_jobs():
+    resp = client.post("/connect/jobs", json={"session_id": "job-bad", "db_url": "sqlite:////nonexistent/dir/x.db"})
+    failed = wait_for(resp.json()["job_id"], "failed")
+    assert "unable to open database file" in failed["error"]
+    assert client.post("/chat", json={"session_id": "job-bad", "message": "hi"}).status_code == 400
+    assert client.get("/connect/jobs/nope").status_code == 404
+
+    print("✅ Background connect job verification passed!")
@@ -0,0 +1,79 @@
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import datetime
+import decimal
+import json
+import pytest
+from sqlalchemy import create_engine, MetaData
+from app.api.encoding import negotiate, render_chat, JSON, COLUMNAR_JSON, ARROW_STREAM
+from app.core.executor import run_read, run_read_columnar
+from app.core.formatter import columnar_to_table, format_table
+
+def _make_db():
+    engine = create_engine("sqlite:///:memory:")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE invoices (id INTEGER PRIMARY KEY, number TEXT, total NUMERIC)")
+        conn.exec_driver_sql("INSERT INTO invoices (number, total) VALUES ('A', 10.5), ('B', 20), ('C', NULL)")
+    md = MetaData()
+    md.reflect(bind=engine)
+    return engine, md
+
+def test_negotiate():
+    assert negotiate(None) == JSON
+    assert negotiate("*/*") == JSON
+    assert negotiate(f"{COLUMNAR_JSON}, application/json;q=0.5") == COLUMNAR_JSON
+    assert negotiate(f"application/json;q=0.5, {COLUMNAR_JSON}") == COLUMNAR_JSON
+    assert negotiate(f"{COLUMNAR_JSON};q=0.1, application/json") == JSON
+    # Unknown media types (browsers, generic clients) fall through to JSON
+    assert negotiate("text/csv") == JSON
+    assert negotiate("text/html") == JSON
+    assert negotiate("text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8") == JSON
+
+def test_columnar_matches_row_read():
+    engine, md = _make_db()
+    args = dict(entity="invoices", columns=None, filters=[], order_by="id", order_dir="asc", limit=10)
+    rows = run_read(engine, md, **args)
+    table = run_read_columnar(engine, md, **args)
+
+    assert table["columns"] == ["id", "number", "total"]
+    assert table["count"] == 3
+    assert columnar_to_table(table) == format_table(rows, table["columns"])
+
+    # Empty result still carries the column names from the cursor
+    empty = run_read_columnar(engine, md, **dict(args, filters=[{"field": "id", "op": "=", "value": -1}]))
+    assert empty["columns"] == ["id", "number", "total"]
+    assert columnar_to_table(empty)["rows"] == []
+
+def test_render_chat_json_and_columnar():
+    table = {
+        "type": "columnar",
+        "columns": ["id", "total", "at"],
+        "data": [[1, 2], [decimal.Decimal("1.5"), None], [datetime.date(2024, 1, 2), None]],
+        "count": 2,
+    }
+    out = {"reply": "Done.", "data": table}
+
+    body = json.loads(render_chat("s1", out, JSON).body)
+    assert body["data"]["type"] == "table"
+    # Same value encoding as the pydantic ChatResponse path (Decimal -> str)
+    assert body["data"]["rows"] == [[1, "1.5", "2024-01-02"], [2, None, None]]
+
+    resp = render_chat("s1", out, COLUMNAR_JSON)
+    assert resp.media_type == COLUMNAR_JSON
+    assert json.loads(resp.body)["data"]["data"][0] == [1, 2]
+
+def test_render_chat_arrow():
+    pa = pytest.importorskip("pyarrow")
+    table = {"type": "columnar", "columns": ["id", "name"], "data": [[1, 2], ["a", None]], "count": 2}
+    resp = render_chat("s1", {"reply": "Done.", "data": table}, ARROW_STREAM)
+
+    tbl = pa.ipc.open_stream(resp.body).read_all()
+    assert tbl.column_names == ["id", "name"]
+    assert tbl.column("name").to_pylist() == ["a", None]
+    assert tbl.schema.metadata[b"reply"] == b"Done."
+
+    print("✅ Response encoding verification passed!")
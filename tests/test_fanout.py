@@ -0,0 +1,106 @@
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+import pytest
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from app.main import app
+from app.config import settings
+from app.core import chat_engine as ce
+from app.core import executor
+from app.core.admission import db_gate
+from app.db.manager import db_manager
+from app.llm.schemas import ReadPlanOut
+
+client = TestClient(app)
+
+SHARDS = {
+    "eu": [(1, "open", 30), (2, "open", 5), (3, "closed", 90)],
+    "us": [(11, "open", 50), (12, "open", None), (13, "open", 20)],
+    "ap": [(21, "open", 40), (22, "closed", 70)],
+}
+
+def make_shard(tmp_path, region, rows):
+    url = f"sqlite:///{tmp_path / (region + '.db')}"
+    with create_engine(url).begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE orders (id INTEGER PRIMARY KEY, status VARCHAR(10), total INTEGER)")
+        conn.exec_driver_sql(f"CREATE TABLE notes_{region} (id INTEGER PRIMARY KEY)")
+        for row in rows:
+            conn.exec_driver_sql("INSERT INTO orders (id, status, total) VALUES (?, ?, ?)", row)
+    assert client.post("/connect", json={"session_id": f"fo-{region}", "db_url": url}).status_code == 200
+
+def plan(monkeypatch, **kw):
+    p = dict(entity="orders", columns=["id"], filters=[{"field": "status", "op": "=", "value": "open"}],
+             order_by="total", order_dir="desc", limit=4)
+    p.update(kw)
+    monkeypatch.setattr(ce, "detect_intent", lambda m, t: SimpleNamespace(intent="read", entity="orders"))
+    monkeypatch.setattr(ce, "make_read_plan", lambda m, e, prof: ReadPlanOut(**p))
+
+def test_fanout_merges_ordered_results_across_shards(tmp_path, monkeypatch):
+    for region, rows in SHARDS.items():
+        make_shard(tmp_path, region, rows)
+    r = client.post("/connect/fanout", json={"session_id": "fo-all", "members": ["fo-eu", "fo-us", "fo-ap"]})
+    assert r.status_code == 200
+    # Per-shard tables are not offered
+    assert r.json()["exposed_tables"] == ["orders"]
+
+    # Sorted by a column the plan doesn't return; NULL totals sort last
+    plan(monkeypatch)
+    data = client.post("/chat", json={"session_id": "fo-all", "message": "open orders everywhere"}).json()["data"]
+    assert data["columns"] == ["id"]
+    assert data["rows"] == [[11], [21], [1], [13]] and data["count"] == 4
+    assert [(s["session_id"], s["status"], s["rows"]) for s in data["shards"]] == [("fo-eu", "ok", 2), ("fo-us", "ok", 3), ("fo-ap", "ok", 1)]
+    assert all(s["ms"] >= 0 for s in data["shards"])
+
+    plan(monkeypatch, columns=["id", "total"], order_dir="asc", limit=10)
+    data = client.post("/chat", json={"session_id": "fo-all", "message": "cheapest first"}).json()["data"]
+    assert data["rows"] == [[2, 5], [13, 20], [1, 30], [21, 40], [11, 50], [12, None]]
+
+    # Read-only; /value finds the shard that has the row
+    body = {"session_id": "fo-all", "entity": "orders", "rows": [{"status": "open", "total": 1}], "confirm": True}
+    assert client.post("/bulk_create", json=body).status_code == 400
+    r = client.post("/value", json={"session_id": "fo-all", "entity": "orders", "column": "total", "pk": {"id": 22}})
+    assert r.status_code == 200 and r.json()["value"] == 70
+
+def test_slow_shard_times_out_and_is_reported(tmp_path, monkeypatch):
+    for region, rows in SHARDS.items():
+        make_shard(tmp_path, region, rows)
+    assert client.post("/connect/fanout", json={"session_id": "fo-slow", "members": ["fo-eu", "fo-us", "fo-ap"]}).status_code == 200
+
+    @event.listens_for(db_manager.get_engine("fo-us"), "before_cursor_execute")
+    def _slow(*args):
+        time.sleep(0.5)
+
+    monkeypatch.setattr(settings, "fanout_shard_timeout_seconds", 0.2)
+    plan(monkeypatch)
+    t0 = time.perf_counter()
+    body = client.post("/chat", json={"session_id": "fo-slow", "message": "open orders"}).json()
+    assert time.perf_counter() - t0 < 0.45
+    assert body["data"]["rows"] == [[21], [1], [2]]
+    assert [s["status"] for s in body["data"]["shards"]] == ["ok", "timeout", "ok"]
+    assert "2 of 3 shards" in body["reply"]
+
+def test_read_deadline_is_enforced_by_the_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'spin.db'}")
+    endless = text("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c")
+    t0 = time.perf_counter()
+    with pytest.raises(OperationalError, match="interrupted"), executor.read_deadline(0.2):
+        executor._fetch(engine, endless)
+    # The abandoned query stops on its own and gives back its slot
+    assert time.perf_counter() - t0 < 1.0
+    assert db_gate(engine).stats()["inflight"] == 0
+    assert executor._fetch(engine, text("SELECT 1"))[1][0][0] == 1
+
+def test_fanout_needs_connected_members_with_common_tables(tmp_path):
+    make_shard(tmp_path, "eu", [])
+    r = client.post("/connect/fanout", json={"session_id": "fo-bad", "members": ["fo-eu", "fo-missing"]})
+    assert r.status_code == 400
+    assert client.post("/connect/fanout", json={"session_id": "fo-eu", "members": ["fo-eu", "fo-eu"]}).status_code == 400
+
+    print("✅ Fan-out session verification passed!")
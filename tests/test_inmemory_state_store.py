@@ -0,0 +1,127 @@
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import random
+import threading
+import app.state_store as ss
+from app.state_store import InMemoryStateStore
+
+def test_lru_eviction_by_entries():
+    store = InMemoryStateStore(shards=1, max_entries=3)
+    for k in "abc":
+        store.set(k, {"k": k})
+    store.get("a")  # a is now most recently used
+    store.set("d", {"k": "d"})
+
+    assert store.get("b") is None, "least recently used entry should be evicted"
+    assert store.get("a") == {"k": "a"}
+    stats = store.stats()
+    assert stats["entries"] == 3
+    assert stats["evicted_lru"] == 1
+
+def test_byte_budget_and_accounting():
+    store = InMemoryStateStore(shards=1, max_bytes=200)
+    for i in range(20):
+        store.set(f"s{i}", {"payload": "x" * 30})
+    stats = store.stats()
+    assert 0 < stats["bytes"] <= 200
+    assert stats["entries"] < 20
+
+    for i in range(20):
+        store.delete(f"s{i}")
+    assert store.stats()["bytes"] == 0
+
+def test_idle_ttl_expiry(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(ss.time, "monotonic", lambda: clock[0])
+    store = InMemoryStateStore(shards=1, idle_ttl=60)
+
+    store.set("idle", {"n": 1})
+    store.set("busy", {"n": 2})
+    clock[0] += 45
+    assert store.get("busy") == {"n": 2}  # access refreshes idle time
+    clock[0] += 45
+    assert store.get("busy") == {"n": 2}
+    assert store.get("idle") is None
+    assert store.stats()["expired"] == 1
+
+def test_values_are_copies():
+    store = InMemoryStateStore()
+    v = {"filters": []}
+    store.set("k", v)
+    v["filters"].append(1)
+    got = store.get("k")
+    got["filters"].append(2)
+    assert store.get("k") == {"filters": []}
+
+def test_registry_entries_have_their_own_budget(monkeypatch):
+    from app.db.registry import SessionRegistry
+    monkeypatch.setattr(ss.settings, "state_store", "inmemory")
+    monkeypatch.setattr(ss.settings, "registry_max_bytes", 64 * 1024)
+    state = InMemoryStateStore(shards=1, max_bytes=8 * 1024)
+    monkeypatch.setattr(ss, "state_store", state)
+    registry_store = ss.make_registry_store()
+    assert registry_store is not state
+
+    state.set("state:s1", {"stage": "idle", "history": ["hi"]})
+    catalog = {"tables": {f"t{i}": {"columns": [{"name": "x" * 200}]} for i in range(20)}, "exposed_tables": []}
+    for i in range(30):
+        SessionRegistry(registry_store).publish(f"s{i}", "sqlite:///big.db", catalog)
+
+    assert state.get("state:s1")["history"] == ["hi"]
+    assert state.stats()["evicted_lru"] == 0
+    assert registry_store.stats()["evicted_lru"] > 0
+    assert registry_store.stats()["bytes"] <= 64 * 1024
+
+def test_concurrent_sessions_stress():
+    store = InMemoryStateStore(shards=8, max_entries=400)
+    errors = []
+    n_threads, n_ops = 16, 1500
+
+    def worker(seed):
+        rnd = random.Random(seed)
+        try:
+            for i in range(n_ops):
+                key = f"state:s{rnd.randrange(2000)}"
+                op = rnd.random()
+                if op < 0.4:
+                    store.update(key, {"stage": "idle", f"t{seed}": i})
+                elif op < 0.8:
+                    store.get(key)
+                elif op < 0.95:
+                    cur = store.get(key) or {}
+                    store.commit(key, cur.get("version", 0), {"version": cur.get("version", 0) + 1})
+                else:
+                    store.delete(key)
+        except Exception as e:  # pragma: no cover - surfaced by the assert below
+            errors.append(e)
+
+    # Shared counter session: concurrent version-checked increments never double-apply
+    counter_store = InMemoryStateStore(shards=2)
+    def incrementer(results):
+        done = 0
+        while done < 200:
+            cur = counter_store.get("state:counter") or {}
+            if counter_store.commit("state:counter", cur.get("version", 0), {"version": cur.get("version", 0) + 1}):
+                done += 1
+        results.append(done)
+
+    results = []
+    threads = [threading.Thread(target=worker, args=(s,)) for s in range(n_threads)]
+    threads += [threading.Thread(target=incrementer, args=(results,)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    stats = store.stats()
+    assert stats["entries"] <= 400
+    assert stats["bytes"] == sum(len(raw) for sh in store._shards for raw, _ in sh.data.values())
+    assert stats["evicted_lru"] > 0
+    assert counter_store.get("state:counter")["version"] == sum(results) == 800
+
+    print("✅ In-memory state store verification passed!")
@@ -6,7 +6,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from sqlalchemy import create_engine, Column, Integer, String, ForeignKey
 from sqlalchemy.orm import declarative_base
-from app.db.introspect import build_catalog
+from app.db.introspect import build_catalog, reflect_metadata
+from app.db.catalog import as_plain
 
 Base = declarative_base()
 
@@ -64,5 +65,46 @@ def test_phase2_introspect():
 
     print("✅ Phase 2 Introspection Verification Passed!")
 
+def test_parallel_introspection_matches_sequential(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'wide.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE no_pk_table (name TEXT)")
+        conn.exec_driver_sql("CREATE TABLE grants (id INTEGER PRIMARY KEY, secret_id INTEGER REFERENCES secret_table(id))")
+        for i in range(30):
+            parent = f", parent_id INTEGER REFERENCES t{i - 1}(id)" if i else ""
+            conn.exec_driver_sql(f"CREATE TABLE t{i} (id INTEGER PRIMARY KEY, status VARCHAR(10) NOT NULL{parent})")
+            conn.exec_driver_sql(f"CREATE INDEX ix_t{i} ON t{i} (status)")
+
+    def run(threads):
+        calls = []
+        catalog = build_catalog(engine, progress=lambda new, done, total: calls.append((list(new), done, total)), every=7, threads=threads)
+        return as_plain(catalog), calls
+
+    sequential, seq_calls = run(1)
+    parallel, par_calls = run(8)
+    assert parallel == sequential
+    assert par_calls == seq_calls
+    assert [c[1] for c in par_calls] == [7, 14, 21, 28, 34]
+    assert len(sequential["exposed_tables"]) == 33
+
+    def shape(md):
+        return {
+            name: ([(c.name, str(c.type), c.primary_key) for c in t.columns], sorted(fk.target_fullname for fk in t.foreign_keys), sorted(i.name for i in t.indexes))
+            for name, t in md.tables.items()
+        }
+
+    exposed = list(sequential["exposed_tables"])
+    md_seq, md_par = reflect_metadata(engine, exposed, threads=1), reflect_metadata(engine, exposed, threads=8)
+    assert shape(md_par) == shape(md_seq)
+    # secret_table isn't exposed but is reflected as the target of grants.secret_id
+    assert "secret_table" in md_par.tables
+    assert md_par.tables["t5"].c.parent_id.references(md_par.tables["t4"].c.id)
+
+    # In-memory SQLite can't be shared across threads; falls back to sequential
+    mem = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(mem)
+    assert list(build_catalog(mem, threads=8)["exposed_tables"]) == ["orders", "valid_table"]
+
 if __name__ == "__main__":
     test_phase2_introspect()
@@ -52,5 +52,59 @@ def test_phase4_state():
 
     print("✅ Phase 4 State Management Verification Passed!")
 
+def test_unit_of_work_single_write():
+    from app.core.state_manager import StateConflictError
+    import pytest
+    session_id = "test_uow_session"
+    state_manager.clear_state(session_id)
+
+    with state_manager.unit_of_work(session_id) as uow:
+        uow.update_state(intent="read", entity="orders")
+        uow.update_state(stage="collecting")
+        assert uow.get_state().entity == "orders"
+        # Nothing persisted until the unit of work exits
+        assert state_store.get(f"state:{session_id}") is None
+
+    s = state_manager.get_state(session_id)
+    assert (s.intent, s.entity, s.stage, s.version) == ("read", "orders", "collecting", 1)
+
+    # A concurrent flush in between makes the stale unit of work fail
+    with pytest.raises(StateConflictError):
+        with state_manager.unit_of_work(session_id) as stale:
+            with state_manager.unit_of_work(session_id) as other:
+                other.update_state(stage="idle")
+            stale.update_state(entity="invoices")
+    assert state_manager.get_state(session_id).entity == "orders"
+
+    # Clear keeps the version chain
+    with state_manager.unit_of_work(session_id) as uow:
+        uow.clear_state()
+    s = state_manager.get_state(session_id)
+    assert (s.intent, s.entity, s.version) == ("unknown", None, 3)
+    state_manager.clear_state(session_id)
+    print("✅ Unit of work verification passed!")
+
+def test_handle_message_state_round_trips(monkeypatch):
+    """One state read + one write per message (was 4 store calls, 7 Redis round trips)"""
+    import app.core.state_manager as sm
+    import app.core.chat_engine as ce
+    from app.state_store import InMemoryStateStore
+
+    calls = []
+    inner = InMemoryStateStore()
+    class CountingStore:
+        def __getattr__(self, name):
+            calls.append(name)
+            return getattr(inner, name)
+
+    monkeypatch.setattr(sm, "state_store", CountingStore())
+    monkeypatch.setattr(ce, "detect_intent", lambda m, t: type('obj', (object,), {'intent': 'read', 'entity': 'items'})())
+    monkeypatch.setattr(ce, "make_read_plan", lambda m, e, p: type('obj', (object,), {'entity': 'items', 'columns': None, 'filters': [], 'order_by': None, 'order_dir': 'asc', 'limit': 5})())
+    monkeypatch.setattr(ce, "run_read_columnar", lambda **k: {"type": "columnar", "columns": ["id"], "data": [[1]], "count": 1})
+
+    catalog = {"exposed_tables": ["items"], "tables": {"items": {}}}
+    ce.handle_message("test_rt_session", "show items", None, catalog, None, user_context={"user_id": "1"})
+    assert calls == ["get", "commit"]
+
 if __name__ == "__main__":
     test_phase4_state()
@@ -59,7 +59,7 @@ def test_chat_with_context(monkeypatch):
     
     monkeypatch.setattr("app.core.chat_engine.detect_intent", lambda msg, tbls: type('obj', (object,), {'intent': 'read', 'entity': 'users'})())
     monkeypatch.setattr("app.core.chat_engine.make_read_plan", lambda msg, ent, prof: type('obj', (object,), {'entity': 'users', 'columns': [], 'filters': [], 'order_by': None, 'order_dir': 'asc', 'limit': 10})())
-    monkeypatch.setattr("app.core.chat_engine.run_read", lambda **kwargs: [{"id": 1, "name": "Alice"}])
+    monkeypatch.setattr("app.core.chat_engine.run_read_columnar", lambda **kwargs: {"type": "columnar", "columns": ["id", "name"], "data": [[1], ["Alice"]], "count": 1})
     
     # Prepare header
     ctx = {"user_id": "u555", "user_role": "editor"}
@@ -73,6 +73,7 @@ def test_chat_with_context(monkeypatch):
     )
     
     assert response.status_code == 200
+    assert response.json()["data"]["rows"] == [[1, "Alice"]]
     
     # VERIFY STATE
     state = state_manager.get_state(session_id)
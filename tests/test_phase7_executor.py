@@ -58,6 +58,43 @@ def test_preview_update_requires_filters():
     
     print("✅ preview_update filter requirement passed!")
 
+def _make_items_db(path, n):
+    from sqlalchemy import create_engine, MetaData
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE items (id INTEGER PRIMARY KEY, status TEXT NOT NULL)")
+        for i in range(n):
+            conn.exec_driver_sql(f"INSERT INTO items (status) VALUES ('{'open' if i % 2 == 0 else 'closed'}')")
+    md = MetaData()
+    md.reflect(bind=engine)
+    return engine, md
+
+def test_run_update_returns_preview_from_same_pass(tmp_path):
+    """Test run_update updates by PK and returns the pre-update rows"""
+    engine, md = _make_items_db(tmp_path / "items.db", 6)
+
+    out = run_update(engine, md, "items", {"status": "archived", "id": 1000}, [{"field": "status", "op": "=", "value": "open"}])
+    assert out["updated"] == 3
+    assert out["fields"] == {"status": "archived"}, "PK must not be updateable"
+    assert sorted(r["id"] for r in out["preview"]) == [1, 3, 5]
+    assert all(r["status"] == "open" for r in out["preview"])
+
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT count(*) FROM items WHERE status='archived'").scalar() == 3
+    print("✅ run_update single-pass passed!")
+
+def test_run_update_enforces_cap_before_write(tmp_path):
+    """Test the row cap aborts before anything is written"""
+    from app.db.guards import MAX_UPDATE_ROWS
+    engine, md = _make_items_db(tmp_path / "items.db", MAX_UPDATE_ROWS + 5)
+
+    with pytest.raises(ValueError, match="more than"):
+        run_update(engine, md, "items", {"status": "x"}, [{"field": "id", "op": ">", "value": 0}])
+
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT count(*) FROM items WHERE status='x'").scalar() == 0
+    print("✅ run_update cap enforcement passed!")
+
 if __name__ == "__main__":
     print("Testing Phase 7: Executor Layer (Guardrails)")
     print("=" * 60)
@@ -0,0 +1,65 @@
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import threading
+import pytest
+from app.state_store import RedisStateStore
+
+fakeredis = pytest.importorskip("fakeredis")
+
+def _store(ttl=60):
+    return RedisStateStore("redis://unused", ttl_seconds=ttl, client=fakeredis.FakeRedis(decode_responses=True))
+
+def test_hash_roundtrip_and_ttl():
+    store = _store()
+    store.set("state:a", {"intent": "read", "filters": [], "user_context": None})
+    assert store.r.type("state:a") == "hash"
+    assert store.get("state:a") == {"intent": "read", "filters": [], "user_context": None}
+    assert 0 < store.r.ttl("state:a") <= 60
+
+    merged = store.update("state:a", {"entity": "invoices", "draft_payload": {"n": 1}})
+    assert merged == {"intent": "read", "filters": [], "user_context": None, "entity": "invoices", "draft_payload": {"n": 1}}
+    assert store.r.hget("state:a", "entity") == '"invoices"'
+
+    store.delete("state:a")
+    assert store.get("state:a") is None
+
+def test_update_migrates_legacy_json_blob():
+    store = _store()
+    store.r.set("state:old", json.dumps({"intent": "create", "entity": "orders"}))
+    assert store.get("state:old")["entity"] == "orders"
+
+    merged = store.update("state:old", {"stage": "preview"})
+    assert merged == {"intent": "create", "entity": "orders", "stage": "preview"}
+    assert store.r.type("state:old") == "hash"
+
+def test_commit_checks_version():
+    store = _store()
+    assert store.commit("state:v", 0, {"entity": "orders", "version": 1})
+    assert not store.commit("state:v", 0, {"entity": "stale", "version": 1})
+    assert store.commit("state:v", 1, {"stage": "idle", "version": 2}, replace=True)
+    assert store.get("state:v") == {"stage": "idle", "version": 2}
+
+def test_concurrent_field_updates_do_not_lose_writes():
+    store = _store(ttl=0)
+    fields = [f"f{i}" for i in range(20)]
+
+    def worker(name):
+        for n in range(25):
+            store.update("state:race", {name: n})
+
+    threads = [threading.Thread(target=worker, args=(f,)) for f in fields]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    final = store.get("state:race")
+    assert final == {f: 24 for f in fields}
+    assert store.r.ttl("state:race") == -1, "ttl=0 means no expiry"
+
+    print("✅ Redis state store verification passed!")
@@ -0,0 +1,94 @@
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from app.main import app
+from app.api import routes
+from app.core import executor
+from app.db.replicas import ReplicaRouter, ReplicaSet, replica_router
+
+client = TestClient(app)
+
+def make_db(path, source):
+    """Same schema everywhere; the single row says which copy answered"""
+    url = f"sqlite:///{path}"
+    with create_engine(url).begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE items (id INTEGER PRIMARY KEY, src VARCHAR(20))")
+        conn.exec_driver_sql(f"INSERT INTO items (id, src) VALUES (1, '{source}')")
+    return url
+
+def sources(engine, metadata):
+    return [r["src"] for r in executor.run_read(engine, metadata, "items", ["src"], [], "id", "asc", 10)]
+
+def test_reads_rotate_over_replicas_and_follow_writes(tmp_path, monkeypatch):
+    primary = make_db(tmp_path / "primary.db", "primary")
+    r1, r2 = make_db(tmp_path / "r1.db", "r1"), make_db(tmp_path / "r2.db", "r2")
+    down = "sqlite:////nonexistent/replica.db"
+    body = {"session_id": "rep-1", "db_url": primary, "replica_urls": [r1, down, r2]}
+    assert client.post("/connect", json=body).status_code == 200
+    engine, _, metadata = routes._get_session("rep-1")
+
+    # Probed by the health thread, not by /connect; reads stay on the primary until then
+    rs = replica_router.replicas(engine)
+    assert rs.checked.wait(5)
+    assert [r["healthy"] for r in rs.stats()] == [True, False, True]
+    seen = [sources(engine, metadata)[0] for _ in range(4)]
+    assert sorted(seen) == ["r1", "r1", "r2", "r2"] and seen[0] != seen[1]
+
+    # Read-your-writes: the session's own insert is visible right away
+    monkeypatch.setattr(replica_router, "read_your_writes", 60)
+    executor.run_create(engine, metadata, "items", {"id": 2, "src": "primary"})
+    assert sources(engine, metadata) == ["primary", "primary"]
+    monkeypatch.setattr(replica_router, "read_your_writes", 0)
+    assert sources(engine, metadata)[0] in ("r1", "r2")
+
+def test_failed_replica_falls_back_to_primary(tmp_path):
+    primary = create_engine(make_db(tmp_path / "p.db", "primary"))
+    r1 = make_db(tmp_path / "r1.db", "r1")
+    router = ReplicaRouter(health_interval=0, read_your_writes=0)
+    rs = router.register(primary, [r1])
+
+    def read(engine):
+        with engine.connect() as conn:
+            return conn.exec_driver_sql("SELECT src FROM items").scalar()
+
+    assert router.read(primary, read) == "r1"
+    with create_engine(r1).begin() as conn:
+        conn.exec_driver_sql("DROP TABLE items")
+    assert router.read(primary, read) == "primary"
+    assert rs.stats()[0]["healthy"] is False
+    assert router.read(primary, read) == "primary"
+    # The next health check brings it back
+    rs.check()
+    assert rs.stats()[0]["healthy"] is True
+
+def test_register_does_not_probe_in_the_request(tmp_path, monkeypatch):
+    primary = create_engine(make_db(tmp_path / "p.db", "primary"))
+    router = ReplicaRouter(health_interval=3600, read_your_writes=0)
+    probed = []
+    monkeypatch.setattr(ReplicaSet, "check", lambda self: probed.append(self))
+    rs = router.register(primary, [make_db(tmp_path / "r1.db", "r1")])
+    assert rs.stats()[0]["healthy"] is None
+    assert router.read(primary, lambda e: e.url) == primary.url
+
+    # The health thread picks it up
+    deadline = time.time() + 5
+    while not probed and time.time() < deadline:
+        time.sleep(0.01)
+    assert probed == [rs]
+
+def test_least_latency_prefers_faster_replica(tmp_path):
+    primary = create_engine(make_db(tmp_path / "p.db", "primary"))
+    router = ReplicaRouter(policy="least_latency", health_interval=0, read_your_writes=0)
+    rs = router.register(primary, [make_db(tmp_path / "slow.db", "slow"), make_db(tmp_path / "fast.db", "fast")])
+    rs.replicas[0].latency, rs.replicas[1].latency = 0.050, 0.001
+    assert rs.pick() is rs.replicas[1]
+    rs.mark_down(rs.replicas[1], RuntimeError("gone"))
+    assert rs.pick() is rs.replicas[0]
+
+    print("✅ Read replica routing verification passed!")
@@ -0,0 +1,106 @@
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from app.main import app
+from app.api import routes
+from app.core import executor
+from app.db.introspect import build_catalog, reflect_metadata
+from app.db.manager import db_manager
+from app.db.registry import session_registry
+from app.db.schema_watch import SchemaWatcher, ddl_fingerprint, schema_watcher
+
+client = TestClient(app)
+
+def test_fingerprint_tracks_table_and_index_ddl():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE a (id INTEGER PRIMARY KEY)")
+        conn.exec_driver_sql("CREATE TABLE b (id INTEGER PRIMARY KEY, x TEXT)")
+        before = ddl_fingerprint(conn)
+        conn.exec_driver_sql("CREATE INDEX ix_b_x ON b (x)")
+        after = ddl_fingerprint(conn)
+    assert set(before) == {"a", "b"}
+    assert before["a"] == after["a"] and before["b"] != after["b"]
+
+def test_migration_is_swapped_in_for_connected_sessions(tmp_path):
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    with create_engine(url).begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE orders (id INTEGER PRIMARY KEY, status VARCHAR(20))")
+        conn.exec_driver_sql("CREATE TABLE customers (id INTEGER PRIMARY KEY, name VARCHAR(40))")
+        conn.exec_driver_sql("CREATE TABLE legacy (id INTEGER PRIMARY KEY)")
+
+    for sid in ("sw-1", "sw-2"):
+        assert client.post("/connect", json={"session_id": sid, "db_url": url}).status_code == 200
+    old_catalog, old_md = routes._catalog_by_session["sw-1"], routes._metadata_by_session["sw-1"]
+    engine = db_manager.get_engine("sw-1")
+    gen = executor._write_gen.get(engine.url, 0)
+    version = schema_watcher.version(engine)
+    assert schema_watcher.check() == 0
+
+    with create_engine(url).begin() as conn:
+        conn.exec_driver_sql("ALTER TABLE orders ADD COLUMN total NUMERIC")
+        conn.exec_driver_sql("CREATE TABLE invoices (id INTEGER PRIMARY KEY, order_id INTEGER REFERENCES orders(id))")
+        conn.exec_driver_sql("DROP TABLE legacy")
+    assert schema_watcher.check() == 1
+    assert schema_watcher.version(engine) == version + 1
+
+    for sid in ("sw-1", "sw-2"):
+        catalog, md = routes._catalog_by_session[sid], routes._metadata_by_session[sid]
+        assert list(catalog["exposed_tables"]) == ["customers", "orders", "invoices"]
+        assert "total" in [c["name"] for c in catalog["tables"]["orders"]["columns"]]
+        assert "total" in md.tables["orders"].c and "legacy" not in md.tables
+        assert md.tables["invoices"].c.order_id.references(md.tables["orders"].c.id)
+        # Untouched tables keep their profile
+        assert catalog["tables"]["customers"] is old_catalog["tables"]["customers"]
+
+    # Requests already holding the old version are unaffected
+    assert "legacy" in old_catalog["exposed_tables"] and "total" not in old_md.tables["orders"].c
+    assert list(session_registry.load("sw-1")["catalog"]["exposed_tables"]) == ["customers", "orders", "invoices"]
+    assert executor._write_gen[engine.url] > gen
+    assert schema_watcher.check() == 0
+
+def test_irrelevant_change_does_not_notify(tmp_path):
+    url = f"sqlite:///{tmp_path / 'other.db'}"
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE orders (id INTEGER PRIMARY KEY)")
+    watcher = SchemaWatcher(interval=3600)
+    calls = []
+    watcher.add_listener(lambda *args: calls.append(args))
+    catalog = build_catalog(engine)
+    watcher.watch("s", engine, catalog, reflect_metadata(engine, list(catalog["exposed_tables"])))
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE scratch (name TEXT)")  # no primary key: never exposed
+    assert watcher.check() == 0 and not calls
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE refunds (id INTEGER PRIMARY KEY)")
+    assert watcher.check() == 1
+    sessions, new_catalog, _, changed = calls[0]
+    assert sessions == ["s"] and changed == {"refunds"}
+    assert list(new_catalog["exposed_tables"]) == ["orders", "refunds"]
+
+def test_reconnected_session_leaves_its_old_database(tmp_path):
+    watcher = SchemaWatcher(interval=3600)
+    engines = []
+    for name in ("a", "b"):
+        engine = create_engine(f"sqlite:///{tmp_path / name}.db")
+        with engine.begin() as conn:
+            conn.exec_driver_sql("CREATE TABLE orders (id INTEGER PRIMARY KEY)")
+        engines.append(engine)
+    catalog = build_catalog(engines[0])
+    metadata = reflect_metadata(engines[0], list(catalog["exposed_tables"]))
+
+    watcher.watch("s1", engines[0], catalog, metadata)
+    watcher.watch("s2", engines[0], catalog, metadata)
+    watcher.watch("s1", engines[1], catalog, metadata)
+    assert watcher.version(engines[0]) == 1  # s2 still there
+    watcher.watch("s2", engines[1], catalog, metadata)
+    assert watcher.version(engines[0]) == 0 and len(watcher._targets) == 1
+
+    print("✅ Schema watcher verification passed!")
@@ -0,0 +1,176 @@
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from sqlalchemy import create_engine, event, MetaData
+from app.config import settings
+from app.core import executor
+from app.core.singleflight import SingleFlight
+from app.core.executor import run_read_columnar, run_create
+from app.db.replicas import ReplicaRouter
+from app.llm import utils
+
+def _together(n, fn):
+    """Run fn from n threads released at the same moment"""
+    barrier = threading.Barrier(n)
+
+    def call(_):
+        barrier.wait()
+        return fn()
+
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        return list(pool.map(call, range(n)))
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight("test")
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"answer": 42}
+
+    results = _together(5, lambda: flight.do("k", slow))
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+
+    # Finished calls are not reused
+    flight.do("k", slow)
+    assert len(calls) == 2
+    assert flight.inflight() == 0
+
+def test_errors_are_shared():
+    flight = SingleFlight("test")
+
+    def boom():
+        time.sleep(0.1)
+        raise ValueError("db down")
+
+    def call():
+        try:
+            flight.do("k", boom)
+        except ValueError as e:
+            return str(e)
+
+    assert _together(3, call) == ["db down"] * 3
+
+def test_identical_prompts_share_one_llm_call(monkeypatch):
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs["messages"][1]["content"])
+        time.sleep(0.2)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content='{"intent": "read", "entity": "orders"}'))],
+            usage=None,
+        )
+
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(utils, "get_client", lambda: fake)
+
+    prompts = iter(["show  orders", "show orders ", "show orders", "show orders"])
+    lock = threading.Lock()
+
+    def ask():
+        with lock:
+            user = next(prompts)
+        return utils.call_llm_json("m", "system", user)
+
+    results = _together(4, ask)
+    assert len(calls) == 1, "whitespace differences normalize to one key"
+    assert results == [{"intent": "read", "entity": "orders"}] * 4
+    # Each caller gets its own parsed object
+    assert results[0] is not results[1]
+
+    utils.call_llm_json("m", "system", "show invoices")
+    assert len(calls) == 2
+
+def _slow_db(path):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE orders (id INTEGER PRIMARY KEY, status VARCHAR(20))")
+        conn.exec_driver_sql("INSERT INTO orders (status) VALUES ('open'), ('paid')")
+    md = MetaData()
+    md.reflect(bind=engine)
+    selects = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def slow(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+            time.sleep(0.2)
+
+    return engine, md, selects
+
+def test_identical_reads_share_one_query(tmp_path):
+    engine, md, selects = _slow_db(tmp_path / "shop.db")
+    args = dict(entity="orders", columns=None, filters=[{"field": "status", "op": "=", "value": "open"}], order_by="id", order_dir="asc", limit=10)
+
+    results = _together(4, lambda: run_read_columnar(engine, md, **args))
+    assert len(selects) == 1
+    assert all(r["data"] == results[0]["data"] for r in results)
+    # Post-processing is per caller, so one caller's changes don't leak
+    results[0]["deferred"] = ["x"]
+    assert "deferred" not in results[1]
+
+    # Different parameters are different queries
+    other = dict(args, filters=[{"field": "status", "op": "=", "value": "paid"}])
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        paid = pool.submit(run_read_columnar, engine, md, **other)
+        open_ = pool.submit(run_read_columnar, engine, md, **args)
+        assert paid.result()["data"][1] == ["paid"]
+        assert open_.result()["data"][1] == ["open"]
+    assert len(selects) == 3
+
+def test_read_after_write_does_not_join_older_flight(tmp_path):
+    engine, md, selects = _slow_db(tmp_path / "shop.db")
+    args = dict(entity="orders", columns=None, filters=[], order_by="id", order_dir="asc", limit=10)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        before = pool.submit(run_read_columnar, engine, md, **args)
+        time.sleep(0.05)  # first read is in flight
+        run_create(engine, md, "orders", {"status": "new"})
+        after = run_read_columnar(engine, md, **args)
+        before.result()
+    assert len(selects) == 2, "the post-write read ran its own query"
+    assert after["count"] == 3
+
+def test_read_your_writes_does_not_join_a_replica_flight(tmp_path, monkeypatch):
+    writer, md, selects = _slow_db(tmp_path / "shop.db")
+    shutil.copy(tmp_path / "shop.db", tmp_path / "replica.db")
+    reader = create_engine(str(writer.url))  # another session on the same primary
+    router = ReplicaRouter(health_interval=0, read_your_writes=60)
+    router.register(writer, [f"sqlite:///{tmp_path / 'replica.db'}"])
+    lagging = router.register(reader, [f"sqlite:///{tmp_path / 'replica.db'}"]).replicas[0].engine
+    event.listen(lagging, "before_cursor_execute", lambda *a: time.sleep(0.2))
+    monkeypatch.setattr(executor, "replica_router", router)
+    args = dict(entity="orders", columns=None, filters=[], order_by="id", order_dir="asc", limit=10)
+
+    run_create(writer, md, "orders", {"status": "new"})
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        stale = pool.submit(run_read_columnar, reader, md, **args)
+        time.sleep(0.05)  # the other session's replica read is in flight
+        own = run_read_columnar(writer, md, **args)
+        assert stale.result()["count"] == 2
+    assert own["count"] == 3, "the writer read its own insert from the primary"
+
+def test_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "single_flight", False)
+    flight = SingleFlight("test")
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.05)
+
+    _together(3, lambda: flight.do("k", slow))
+    assert len(calls) == 3
+
+    print("✅ Single-flight verification passed!")
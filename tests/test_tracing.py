@@ -0,0 +1,66 @@
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, MetaData
+from sqlalchemy.pool import StaticPool
+from app.core import tracing
+from app.core.executor import run_read
+from app.core.tracing import TimingMiddleware, stage, record_llm_usage, render_metrics
+
+def _make_app():
+    engine = create_engine("sqlite:///:memory:", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE invoices (id INTEGER PRIMARY KEY, number TEXT)")
+        conn.exec_driver_sql("INSERT INTO invoices (number) VALUES ('A'), ('B')")
+    md = MetaData()
+    md.reflect(bind=engine)
+
+    app = FastAPI()
+    app.add_middleware(TimingMiddleware)
+
+    @app.get("/probe")
+    def probe():
+        with stage("read_plan"):
+            record_llm_usage(120, 30)
+        rows = run_read(engine, md, "invoices", None, [], "id", "asc", 10)
+        return {"n": len(rows)}
+
+    return app
+
+def test_server_timing_header():
+    client = TestClient(_make_app())
+    resp = client.get("/probe")
+    assert resp.status_code == 200
+    timing = resp.headers["server-timing"]
+    for name in ("read_plan;dur=", "pool_wait;dur=", "db_read;dur=", "total;dur="):
+        assert name in timing, timing
+    assert 'rows;desc="2"' in timing
+    assert 'llm_prompt_tokens;desc="120"' in timing
+
+def test_metrics_exposition():
+    TestClient(_make_app()).get("/probe")
+    text = render_metrics()
+    assert '# TYPE phasewise_stage_seconds histogram' in text
+    assert 'phasewise_stage_seconds_bucket{stage="db_read",le="+Inf"}' in text
+    assert 'phasewise_request_seconds_count{path="/probe",status="200"}' in text
+    assert 'phasewise_llm_tokens_total{kind="completion"}' in text
+
+    from app.main import app
+    resp = TestClient(app).get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert "phasewise_rows_returned" in resp.text
+
+def test_disabled_is_noop(monkeypatch):
+    monkeypatch.setattr(tracing, "enabled", False)
+    assert stage("db_read") is tracing._NOOP
+    resp = TestClient(_make_app()).get("/probe")
+    assert resp.status_code == 200
+    assert "server-timing" not in resp.headers
+
+    print("✅ Tracing verification passed!")
@@ -0,0 +1,112 @@
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import time
+import pytest
+from fastapi import HTTPException
+from app.core import tokens
+from app.core.context import get_user_context
+from app.core.tokens import KeySet, TokenError, TokenVerifier, sign_token, _b64encode
+
+SECRET = "s3cret"
+
+def hs_verifier(**kwargs):
+    return TokenVerifier(KeySet(secret=SECRET), **kwargs)
+
+def test_hmac_token_is_verified_once_then_cached():
+    v = hs_verifier()
+    token = sign_token({"sub": "u1", "user_role": "admin", "exp": time.time() + 60}, SECRET.encode())
+    first = v.verify(token)
+    assert first.user_id == "u1" and first.user_role == "admin"
+    assert v.verify(token) is first
+    assert v.stats()["hits"] == 1 and v.stats()["misses"] == 1
+
+def test_rejects_bad_tokens():
+    v = hs_verifier(leeway=0)
+    good = sign_token({"user_id": "u1", "exp": time.time() + 60}, SECRET.encode())
+    head, body, sig = good.split(".")
+    forged = _b64encode(json.dumps({"user_id": "admin", "exp": time.time() + 60}).encode())
+    for bad in (
+        sign_token({"user_id": "u1"}, b"wrong"),
+        sign_token({"user_id": "u1", "exp": time.time() - 1}, SECRET.encode()),
+        sign_token({"user_id": "u1", "nbf": time.time() + 60}, SECRET.encode()),
+        sign_token({"user_role": "admin"}, SECRET.encode()),
+        f"{head}.{forged}.{sig}",
+        _b64encode(b'{"alg": "none"}') + "." + body + ".",
+        "not-a-token",
+    ):
+        with pytest.raises(TokenError):
+            v.verify(bad)
+    assert v.stats()["cached"] == 0
+
+def test_cache_is_bounded_lru_and_respects_expiry():
+    v = hs_verifier(cache_size=2, leeway=0)
+    a, b, c = (sign_token({"user_id": u}, SECRET.encode()) for u in "abc")
+    v.verify(a), v.verify(b), v.verify(a), v.verify(c)
+    assert v.stats()["cached"] == 2
+    v.verify(a)
+    assert v.stats()["hits"] == 2, "a was used recently and survived; b was evicted"
+
+    short = sign_token({"user_id": "d", "exp": time.time() + 0.05}, SECRET.encode())
+    v.verify(short)
+    time.sleep(0.1)
+    with pytest.raises(TokenError):
+        v.verify(short)
+
+def test_jwks_keys_and_rotation(tmp_path):
+    pytest.importorskip("cryptography")
+    from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+    from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ec_key = ec.generate_private_key(ec.SECP256R1())
+    ed_key = ed25519.Ed25519PrivateKey.generate()
+
+    def b64int(n):
+        return _b64encode(n.to_bytes((n.bit_length() + 7) // 8, "big"))
+
+    rn = rsa_key.public_key().public_numbers()
+    en = ec_key.public_key().public_numbers()
+    jwks = {"keys": [
+        {"kid": "rsa-1", "kty": "RSA", "alg": "RS256", "n": b64int(rn.n), "e": b64int(rn.e)},
+        {"kid": "ec-1", "kty": "EC", "crv": "P-256", "x": _b64encode(en.x.to_bytes(32, "big")), "y": _b64encode(en.y.to_bytes(32, "big"))},
+        {"kid": "ed-1", "kty": "OKP", "crv": "Ed25519", "x": _b64encode(ed_key.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw))},
+        {"kid": "hs-1", "kty": "oct", "k": _b64encode(b"jwks-secret")},
+    ]}
+    path = tmp_path / "jwks.json"
+    path.write_text(json.dumps(jwks))
+    v = TokenVerifier(KeySet(jwks_path=str(path), reload_seconds=0))
+
+    rs = sign_token({"user_id": "r"}, rsa_key, alg="RS256", kid="rsa-1")
+    assert v.verify(rs).user_id == "r"
+    assert v.verify(sign_token({"user_id": "e"}, ec_key, alg="ES256", kid="ec-1")).user_id == "e"
+    assert v.verify(sign_token({"user_id": "d"}, ed_key, alg="EdDSA", kid="ed-1")).user_id == "d"
+    assert v.verify(sign_token({"user_id": "h"}, b"jwks-secret", kid="hs-1")).user_id == "h"
+    with pytest.raises(TokenError):
+        # Key type must match the algorithm family
+        v.verify(sign_token({"user_id": "x"}, b"jwks-secret", alg="HS256", kid="rsa-1"))
+
+    # Rotate: rsa-1 is retired, rsa-2 is introduced
+    new_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    nn = new_key.public_key().public_numbers()
+    jwks["keys"][0] = {"kid": "rsa-2", "kty": "RSA", "n": b64int(nn.n), "e": b64int(nn.e)}
+    path.write_text(json.dumps(jwks))
+    os.utime(path, (time.time() + 5, time.time() + 5))
+
+    assert v.verify(sign_token({"user_id": "r2"}, new_key, alg="RS256", kid="rsa-2")).user_id == "r2"
+    with pytest.raises(TokenError):
+        v.verify(rs)
+
+def test_dependency_requires_signed_header(monkeypatch):
+    monkeypatch.setattr(tokens, "token_verifier", hs_verifier())
+    ctx = get_user_context(sign_token({"user_id": "u9", "company_id": 3}, SECRET.encode()))
+    assert ctx.user_id == "u9" and ctx.company_id == 3
+    with pytest.raises(HTTPException) as e:
+        get_user_context("eyJ1c2VyX2lkIjogInU5In0=")  # unsigned base64 JSON
+    assert e.value.status_code == 401
+
+    print("✅ Signed user-context token verification passed!")
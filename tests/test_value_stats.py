@@ -0,0 +1,85 @@
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from contextlib import contextmanager
+from sqlalchemy import create_engine, text
+from app.core.admission import db_slot
+from app.db import stats
+from app.db.introspect import build_catalog, reflect_metadata
+from app.db.replicas import ReplicaRouter
+from app.db.stats import collect_stats, stats_candidates, STATS_MAX_VALUES
+from app.llm.prompts import read_plan_prompt
+
+def _make_db():
+    engine = create_engine("sqlite:///:memory:")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE invoices (id INTEGER PRIMARY KEY, status VARCHAR(20), email VARCHAR(80), amount INTEGER, created_at TIMESTAMP)"
+        )
+        conn.execute(
+            text("INSERT INTO invoices (status, email, amount) VALUES (:s, :e, :a)"),
+            [{"s": ["PAID", "PENDING", "VOID"][i % 3], "e": f"u{i}@x.io", "a": i} for i in range(100)],
+        )
+        conn.exec_driver_sql("ANALYZE")
+    return engine
+
+def test_collect_value_stats():
+    engine = _make_db()
+    catalog = build_catalog(engine)
+    md = reflect_metadata(engine, catalog["exposed_tables"])
+    profile = catalog["tables"]["invoices"]
+
+    # Only textual, non-PK filter fields are sampled
+    assert stats_candidates(profile) == ["email", "status"]
+
+    collect_stats(engine, md, catalog)
+    # Profiles are immutable: refreshed stats arrive as a swapped-in entry
+    profile = catalog["tables"]["invoices"]
+    stats = profile["value_stats"]
+    assert stats["status"] == {"values": ["PAID", "PENDING", "VOID"], "distinct": 3}
+    assert "email" not in stats, f"more than {STATS_MAX_VALUES} distinct values is high-cardinality"
+    assert profile["row_estimate"] == 100
+
+def test_prompt_includes_known_values():
+    engine = _make_db()
+    catalog = build_catalog(engine)
+    md = reflect_metadata(engine, catalog["exposed_tables"])
+    collect_stats(engine, md, catalog)
+
+    prompt = read_plan_prompt(catalog["tables"]["invoices"])
+    assert "KNOWN VALUES" in prompt
+    assert "- status: 'PAID', 'PENDING', 'VOID'" in prompt
+    assert "APPROX ROWS: 100" in prompt
+    assert "value_stats" not in prompt, "stats should not be dumped raw into the profile"
+
+def test_sampling_goes_through_the_gate_and_replicas(tmp_path, monkeypatch):
+    urls = {}
+    for name, status in (("primary", "PAID"), ("replica", "VOID")):
+        urls[name] = f"sqlite:///{tmp_path / name}.db"
+        with create_engine(urls[name]).begin() as conn:
+            conn.exec_driver_sql("CREATE TABLE invoices (id INTEGER PRIMARY KEY, status VARCHAR(20))")
+            conn.exec_driver_sql(f"INSERT INTO invoices (status) VALUES ('{status}')")
+    engine = create_engine(urls["primary"])
+    catalog = build_catalog(engine)
+    md = reflect_metadata(engine, catalog["exposed_tables"])
+
+    router = ReplicaRouter(health_interval=0)
+    router.register(engine, [urls["replica"]])
+    monkeypatch.setattr(stats, "replica_router", router)
+    slots = []
+
+    @contextmanager
+    def counting_slot(target):
+        slots.append(str(target.url))
+        with db_slot(target):
+            yield
+
+    monkeypatch.setattr(stats, "db_slot", counting_slot)
+    collect_stats(engine, md, catalog)
+    assert catalog["tables"]["invoices"]["value_stats"]["status"]["values"] == ["VOID"]
+    assert slots == [urls["replica"]]
+
+    print("✅ Value stats verification passed!")
@@ -0,0 +1,79 @@
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import threading
+import time
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from app.main import app
+from app.api import routes
+from app.core import warmup as warmup_module
+from app.core.warmup import Warmup, load_manifest
+from app.db.manager import db_manager
+
+client = TestClient(app)
+
+def make_db(path):
+    url = f"sqlite:///{path}"
+    with create_engine(url).begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE orders (id INTEGER PRIMARY KEY, status VARCHAR(20))")
+    return url
+
+def test_manifest_tenants_are_preloaded(tmp_path, monkeypatch):
+    manifest = tmp_path / "tenants.json"
+    tenants = [{"session_id": f"warm-{i}", "db_url": make_db(tmp_path / f"t{i}.db")} for i in range(4)]
+    tenants.append({"session_id": "warm-broken", "db_url": "sqlite:////nonexistent/dir/x.db"})
+    manifest.write_text(json.dumps({"tenants": tenants}))
+
+    w = Warmup(concurrency=2, budget_seconds=30)
+    monkeypatch.setattr(routes, "warmup", w)
+    # warm-0 was connected by an earlier process: its catalog comes from the registry
+    routes._open_session("warm-0", tenants[0]["db_url"])
+    routes._catalog_by_session.pop("warm-0")
+    routes._metadata_by_session.pop("warm-0")
+
+    w.start(load_manifest(str(manifest)), routes.warm_session)
+    w.join(10)
+
+    resp = client.get("/ready")
+    assert resp.status_code == 200
+    status = resp.json()
+    assert status["ready"] and status["total"] == 5
+    assert status["ready_tenants"] == 4 and status["failed"] == 1
+    assert "warm-broken" in status["errors"]
+    assert w._tenants["warm-0"]["source"] == "cache"
+    assert w._tenants["warm-1"]["source"] == "introspected"
+    for t in tenants[:4]:
+        assert list(routes._catalog_by_session[t["session_id"]]["exposed_tables"]) == ["orders"]
+        assert db_manager.get_engine(t["session_id"]).pool.checkedin() >= 1
+
+def test_budget_skips_tenants_not_started(monkeypatch):
+    release = threading.Event()
+    started = []
+
+    def slow_prepare(session_id, db_url):
+        started.append(session_id)
+        release.wait(5)
+        return "introspected"
+
+    w = Warmup(concurrency=1, budget_seconds=0.1)
+    monkeypatch.setattr(routes, "warmup", w)
+    w.start([{"session_id": f"s{i}", "db_url": "sqlite://"} for i in range(3)], slow_prepare)
+
+    assert client.get("/ready").status_code == 503
+    w.join(5)
+    status = client.get("/ready").json()
+    assert status["ready"] and status["warming"] == 1 and status["skipped"] == 2
+    release.set()
+    time.sleep(0.05)
+    assert w.status()["ready_tenants"] == 1 and started == ["s0"]
+
+def test_ready_without_manifest():
+    assert warmup_module.warmup.status()["ready"]
+    assert client.get("/ready").status_code == 200
+
+    print("✅ Warm start verification passed!")
@@ -0,0 +1,71 @@
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from app.main import app
+from app.api import routes
+from app.core import capture
+from app.core.capture import WorkloadCapture, anonymize, capture_llm, capture_note, llm_key
+
+client = TestClient(app)
+
+def test_anonymize_masks_literals_and_is_idempotent():
+    msg = "show invoices for jane.doe@acme.io over 1,200.50 with status 'PAID' in t2"
+    out = anonymize(msg)
+    assert out == "show invoices for <email> over <n> with status <str> in t2"
+    assert anonymize(out) == out
+    # Replay sends the anonymized message; the recorded-response key still matches
+    assert llm_key("sys", msg) == llm_key("sys", out)
+
+def test_connect_and_chat_are_captured(tmp_path, monkeypatch):
+    path = tmp_path / "capture.jsonl"
+    cap = WorkloadCapture(str(path), salt="test")
+    monkeypatch.setattr(capture, "workload_capture", cap)
+
+    db_url = f"sqlite:///{tmp_path / 'shop.db'}"
+    with create_engine(db_url).begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE orders (id INTEGER PRIMARY KEY, email VARCHAR(80))")
+
+    def fake_handle(session_id, message, *args, **kwargs):
+        capture_llm("system prompt", message, json.dumps({"intent": "read", "entity": "orders"}))
+        capture_llm("plan prompt", message, json.dumps({"entity": "orders", "filters": [{"field": "email", "op": "=", "value": "bob@x.io"}]}))
+        capture_llm("clarify prompt", message, json.dumps({"question": "Which Jane Smith, the one in Springfield?"}))
+        capture_note(intent="read", entity="orders")
+        return {"reply": "Done.", "data": None}
+
+    monkeypatch.setattr(routes, "handle_message", fake_handle)
+
+    assert client.post("/connect", json={"session_id": "cap-1", "db_url": db_url}).status_code == 200
+    assert client.post("/chat", json={"session_id": "cap-1", "message": "orders for bob@x.io"}).status_code == 200
+    assert client.post("/chat", json={"session_id": "cap-1", "message": "show the last order email of Jane Smith from Springfield"}).status_code == 200
+    assert client.post("/chat", json={"session_id": "never-connected", "message": "hi"}).status_code == 400
+    cap.close()
+
+    text = path.read_text()
+    assert "bob@x.io" not in text and "shop.db" not in text and "cap-1" not in text
+    assert not any(word in text for word in ("Jane", "Smith", "Springfield"))
+    connect, chat, named, failed = [json.loads(line) for line in text.splitlines()]
+
+    assert connect["kind"] == "connect" and connect["status"] == 200 and connect["db"]
+    assert chat["session"] == connect["session"]
+    assert chat["message"] == "orders for <email>"
+    assert chat["intent"] == "read" and chat["ms"] > 0
+    assert [c["key"] for c in chat["llm"]] == [llm_key(p, "orders for <email>") for p in ("system prompt", "plan prompt", "clarify prompt")]
+    assert json.loads(chat["llm"][1]["response"])["filters"][0]["value"] == "<email>"
+    assert failed["status"] == 400
+
+    # Words outside the schema and the stop-list get the same pseudonym everywhere
+    words = named["message"].split()
+    assert words[:5] == ["show", "the", "last", "order", "email"] and words[6].startswith("<w_")
+    question = json.loads(named["llm"][2]["response"])["question"]
+    assert question.startswith(f"Which {words[6]} {words[7]},") and question.endswith(f"{words[-1]}?")
+    # Replay sends the masked message, which masks to itself
+    assert named["llm"][0]["key"] == llm_key("system prompt", named["message"])
+    assert cap.mask(named["message"], frozenset({"email"})) == named["message"]
+
+    print("✅ Workload capture verification passed!")